@@ -0,0 +1,33 @@
+"""add user search indexes
+
+Revision ID: 3f6a2d9e8b15
+Revises: 8d41f0a6c2b7
+Create Date: 2026-10-17 11:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from app.models.user_model import SEARCH_DOCUMENT_SQL
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3f6a2d9e8b15'
+down_revision: Union[str, None] = '8d41f0a6c2b7'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    op.execute(f"CREATE INDEX ix_users_search_trgm ON users USING gin (({SEARCH_DOCUMENT_SQL}) gin_trgm_ops)")
+    op.create_index('ix_users_nickname_prefix', 'users', [sa.text('lower(nickname) COLLATE "C"')], unique=False)
+    op.create_index('ix_users_email_prefix', 'users', [sa.text('lower(email) COLLATE "C"')], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_users_email_prefix', table_name='users')
+    op.drop_index('ix_users_nickname_prefix', table_name='users')
+    op.drop_index('ix_users_search_trgm', table_name='users')
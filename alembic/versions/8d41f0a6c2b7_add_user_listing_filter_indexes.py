@@ -0,0 +1,37 @@
+"""add user listing filter indexes
+
+Revision ID: 8d41f0a6c2b7
+Revises: 5b2e9c1f7a40
+Create Date: 2026-10-17 10:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8d41f0a6c2b7'
+down_revision: Union[str, None] = '5b2e9c1f7a40'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index('ix_users_role_created_at_id', 'users', ['role', 'created_at', 'id'], unique=False)
+    op.create_index('ix_users_locked_created_at_id', 'users', ['created_at', 'id'], unique=False,
+                    postgresql_where=sa.text('is_locked'))
+    op.create_index('ix_users_unverified_created_at_id', 'users', ['created_at', 'id'], unique=False,
+                    postgresql_where=sa.text('NOT email_verified'))
+    op.create_index('ix_users_professional_created_at_id', 'users', ['created_at', 'id'], unique=False,
+                    postgresql_where=sa.text('is_professional'))
+    op.create_index('ix_users_last_login_at', 'users', ['last_login_at'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_users_last_login_at', table_name='users')
+    op.drop_index('ix_users_professional_created_at_id', table_name='users')
+    op.drop_index('ix_users_unverified_created_at_id', table_name='users')
+    op.drop_index('ix_users_locked_created_at_id', table_name='users')
+    op.drop_index('ix_users_role_created_at_id', table_name='users')
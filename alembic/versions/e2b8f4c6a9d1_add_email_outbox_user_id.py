@@ -0,0 +1,30 @@
+"""add email outbox user id
+
+Revision ID: e2b8f4c6a9d1
+Revises: c4e7a1b9d2f3
+Create Date: 2026-10-17 18:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e2b8f4c6a9d1'
+down_revision: Union[str, None] = 'c4e7a1b9d2f3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('email_outbox', sa.Column('user_id', sa.UUID(), nullable=True))
+    op.create_foreign_key('email_outbox_user_id_fkey', 'email_outbox', 'users', ['user_id'], ['id'], ondelete='CASCADE')
+    op.create_index('ix_email_outbox_user_id_created_at', 'email_outbox', ['user_id', 'created_at'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_email_outbox_user_id_created_at', table_name='email_outbox')
+    op.drop_constraint('email_outbox_user_id_fkey', 'email_outbox', type_='foreignkey')
+    op.drop_column('email_outbox', 'user_id')
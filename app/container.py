@@ -0,0 +1,70 @@
+from typing import Optional
+from app.database import Database
+from app.services.email_service import EmailService
+from app.services.jwt_service import verified_tokens
+from app.utils.password_policy import configure_password_policy
+from app.utils.template_manager import TemplateManager
+from settings.config import Settings, reload_settings, settings
+
+class ServiceContainer:
+    """
+    Application-scoped services, built once and shared by every request.
+
+    The FastAPI lifespan creates the container at startup and closes it at shutdown; outside
+    the app (tests, scripts) ``get_container`` builds one on first use.
+    """
+
+    def __init__(self, app_settings: Settings = settings):
+        self.settings = app_settings
+        Database.initialize(
+            app_settings.database_url, app_settings.debug,
+            pool_size=app_settings.db_pool_size,
+            max_overflow=app_settings.db_max_overflow,
+            pool_timeout=app_settings.db_pool_timeout_seconds,
+            pool_recycle=app_settings.db_pool_recycle_seconds,
+            pool_pre_ping=app_settings.db_pool_pre_ping,
+            statement_cache_size=app_settings.db_statement_cache_size,
+            pgbouncer=app_settings.db_pgbouncer,
+            replica_urls=app_settings.db_replica_urls,
+            replica_strategy=app_settings.db_replica_strategy,
+            replica_eject_seconds=app_settings.db_replica_eject_seconds,
+            replica_max_lag_seconds=app_settings.db_replica_max_lag_seconds,
+            sticky_seconds=app_settings.db_replica_sticky_seconds,
+        )
+        self.engine = Database.get_engine()
+        self.session_factory = Database.get_session_factory()
+        self.template_manager = TemplateManager()
+        self.email_service = EmailService(template_manager=self.template_manager)
+
+    async def reload_settings(self) -> Settings:
+        """
+        Re-read settings from the environment and ``.env`` and rebuild what depends on them.
+
+        The email service is rebuilt for new SMTP settings and its old connections closed,
+        verified tokens are forgotten in case the signing key changed, and the password policy
+        is rebuilt. The database engine is kept; a new ``database_url`` takes effect on restart.
+        """
+        reload_settings()
+        previous, self.email_service = self.email_service, EmailService(template_manager=self.template_manager)
+        await previous.close()
+        verified_tokens.clear()
+        configure_password_policy(self.settings)
+        return self.settings
+
+    async def close(self) -> None:
+        await self.email_service.close()
+        await Database.dispose()
+
+_container: Optional[ServiceContainer] = None
+
+def get_container() -> ServiceContainer:
+    """Returns the application's service container, creating it on first use."""
+    global _container
+    if _container is None:
+        _container = ServiceContainer()
+    return _container
+
+def set_container(container: Optional[ServiceContainer]) -> None:
+    """Replaces the application's service container; None makes the next use build a new one."""
+    global _container
+    _container = container
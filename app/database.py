@@ -1,21 +1,374 @@
+import asyncio
+from contextlib import asynccontextmanager
+import itertools
+import logging
+import time
+from typing import AsyncIterator, Awaitable, Callable, Dict, List, Optional, Sequence
+from uuid import uuid4
+from sqlalchemy import exc, text
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
 from sqlalchemy.orm import declarative_base, sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 
 Base = declarative_base()
 
+logger = logging.getLogger(__name__)
+
+# Read replica balancing strategies.
+ROUND_ROBIN = "round_robin"
+LEAST_LOADED = "least_loaded"
+# Set in the ``info`` of sessions on a read replica.
+REPLICA = "replica"
+# Set in the ``info`` of a session whose transaction is committed by the request it serves.
+UNIT_OF_WORK = "unit_of_work"
+# In a session's ``info`` while it has writes waiting for the request's commit: what to run after it.
+AFTER_COMMIT = "after_commit"
+# Execution options that begin the transaction with BEGIN READ ONLY.
+READ_ONLY = {"postgresql_readonly": True}
+# Errors meaning a database could not be reached, as opposed to a failing statement.
+CONNECTION_ERRORS = (OSError, exc.InterfaceError, exc.OperationalError, exc.TimeoutError)
+# Seconds a replica is behind the primary; zero when it has replayed everything it received
+# (an idle primary sends nothing, so the last replay time alone would look like growing lag),
+# and on a server that is not a replica.
+REPLICATION_LAG_SQL = text(
+    "SELECT CASE WHEN pg_last_wal_receive_lsn() IS NOT DISTINCT FROM pg_last_wal_replay_lsn() THEN 0 "
+    "ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0) END"
+)
+
+# Upper bounds, in seconds, of the buckets pool checkout wait times are counted in.
+POOL_WAIT_BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0)
+
+class PoolStats:
+    """Counts of connection checkouts from one pool: in progress, completed, timed out, and how long they took."""
+
+    def __init__(self):
+        self.waiting = 0
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_seconds_total = 0.0
+        self.wait_buckets = [0] * (len(POOL_WAIT_BUCKETS) + 1)
+
+    def record(self, seconds: float) -> None:
+        self.checkouts += 1
+        self.wait_seconds_total += seconds
+        for index, bound in enumerate(POOL_WAIT_BUCKETS):
+            if seconds <= bound:
+                self.wait_buckets[index] += 1
+                return
+        self.wait_buckets[-1] += 1
+
+    def histogram(self) -> Dict[str, int]:
+        """Cumulative checkout counts per bucket upper bound in seconds, Prometheus style, ending with ``+Inf``."""
+        histogram, total = {}, 0
+        for bound, count in zip([*map(str, POOL_WAIT_BUCKETS), "+Inf"], self.wait_buckets):
+            total += count
+            histogram[bound] = total
+        return histogram
+
+class InstrumentedQueuePool(AsyncAdaptedQueuePool):
+    """
+    The async engine's default pool, recording checkout waits in ``stats``.
+
+    A checkout is timed from the request for a connection until it is handed out, which covers
+    queueing for a free connection, opening a new one and the pre-ping. Checkouts that fail,
+    e.g. by timing out, are not counted as checkouts; timeouts are counted on their own.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.stats = PoolStats()
+
+    def connect(self):
+        self.stats.waiting += 1
+        started = time.perf_counter()
+        try:
+            connection = super().connect()
+        except exc.TimeoutError:
+            self.stats.timeouts += 1
+            raise
+        finally:
+            self.stats.waiting -= 1
+        self.stats.record(time.perf_counter() - started)
+        return connection
+
+async def commit(session: AsyncSession, *after: Callable[[], Awaitable[None]], now: bool = False) -> None:
+    """
+    Commit the writes made through ``session``, then run the ``after`` callbacks, e.g. cache
+    invalidation that must not happen before the writes are visible.
+
+    In a request's ``unit_of_work`` the commit waits for the end of the request, so a request
+    commits once however many writes it makes: the writes are flushed, so later statements in
+    the transaction see them, and the callbacks are kept until the request commits. Outside one,
+    or with ``now``, the session commits here.
+    """
+    if session.info.get(UNIT_OF_WORK) and not now:
+        await session.flush()
+        session.info.setdefault(AFTER_COMMIT, []).extend(after)
+        return
+    await session.commit()
+    for callback in [*session.info.pop(AFTER_COMMIT, []), *after]:
+        await callback()
+
+def has_pending_writes(session: AsyncSession) -> bool:
+    """Whether ``session`` has writes waiting for its request's commit."""
+    return AFTER_COMMIT in session.info
+
+@asynccontextmanager
+async def unit_of_work(session_factory) -> AsyncIterator[AsyncSession]:
+    """
+    A session whose reads share one transaction and whose writes are committed once, when the
+    block exits; if it raises, the transaction is rolled back and the error propagates.
+    """
+    async with session_factory(info={UNIT_OF_WORK: True}) as session:
+        try:
+            yield session
+        except BaseException:
+            session.info.pop(AFTER_COMMIT, None)
+            await session.rollback()
+            raise
+        await commit(session, now=True)
+
+def pool_snapshot(pool: InstrumentedQueuePool) -> dict:
+    """
+    Current counts from ``pool``.
+
+    ``checked_out`` connections are in use and ``idle`` ones wait in the pool; ``overflow`` is how
+    far beyond ``size`` the pool has grown (negative while it has not yet opened ``size``
+    connections). ``waiting`` checkouts are in progress right now, and ``timeouts`` counts
+    checkouts that gave up after the pool timeout.
+    """
+    stats = pool.stats
+    return {
+        "size": pool.size(),
+        "checked_out": pool.checkedout(),
+        "idle": pool.checkedin(),
+        "overflow": pool.overflow(),
+        "waiting": stats.waiting,
+        "checkouts": stats.checkouts,
+        "timeouts": stats.timeouts,
+        "wait_seconds_total": stats.wait_seconds_total,
+        "wait_histogram": stats.histogram(),
+    }
+
+class Replica:
+    """A read replica's engine and sessions, and whether it is in rotation."""
+
+    def __init__(self, engine):
+        self.engine = engine
+        self.session_factory = sessionmaker(
+            bind=engine, class_=AsyncSession, expire_on_commit=False, future=True, info={REPLICA: True}
+        )
+        self.ejected_until = 0.0
+        self.lag_seconds: Optional[float] = None
+        self.last_error: Optional[str] = None
+
+    @property
+    def name(self) -> str:
+        return self.engine.url.render_as_string(hide_password=True)
+
+    @property
+    def load(self) -> int:
+        """Connections in use plus checkouts waiting for one."""
+        return self.engine.pool.checkedout() + self.engine.pool.stats.waiting
+
+class ReplicaSet:
+    """
+    Spreads reads over replicas, ``round_robin`` or to the ``least_loaded`` by pool usage.
+
+    A replica that cannot be reached, or lags more than ``max_lag_seconds`` behind the primary,
+    is ejected: it gets no reads for ``eject_seconds``, or until ``check`` finds it healthy again.
+    """
+
+    def __init__(self, replicas: Sequence[Replica], strategy: str = ROUND_ROBIN, eject_seconds: float = 30,
+                 max_lag_seconds: float = 10, clock: Callable[[], float] = time.monotonic):
+        if strategy not in (ROUND_ROBIN, LEAST_LOADED):
+            raise ValueError(f"Unknown replica strategy: {strategy}")
+        self.replicas = list(replicas)
+        self.strategy = strategy
+        self.eject_seconds = eject_seconds
+        self.max_lag_seconds = max_lag_seconds
+        self.clock = clock
+        self._turn = itertools.count()
+        self._checks: Optional[asyncio.Task] = None
+
+    def healthy(self) -> List[Replica]:
+        now = self.clock()
+        return [replica for replica in self.replicas if replica.ejected_until <= now]
+
+    def choose(self) -> Optional[Replica]:
+        """The replica to read from next; None when every replica is ejected."""
+        healthy = self.healthy()
+        if not healthy:
+            return None
+        turn = next(self._turn) % len(healthy)
+        if self.strategy == ROUND_ROBIN:
+            return healthy[turn]
+        # Starting the scan at the next turn spreads ties instead of always picking the first replica.
+        return min(healthy[turn:] + healthy[:turn], key=lambda replica: replica.load)
+
+    def eject(self, replica: Replica, reason: str) -> None:
+        if replica.ejected_until <= self.clock():
+            logger.warning(f"Taking read replica {replica.name} out of rotation: {reason}")
+        replica.ejected_until = self.clock() + self.eject_seconds
+        replica.last_error = reason
+
+    async def open_session(self, replica: Replica) -> Optional[AsyncSession]:
+        """
+        A session connected to ``replica`` in a read-only transaction; None, with the replica
+        ejected, if it cannot be reached.
+        """
+        session = replica.session_factory()
+        try:
+            await session.connection(execution_options=READ_ONLY)
+        except CONNECTION_ERRORS as e:
+            await session.close()
+            self.eject(replica, str(e) or type(e).__name__)
+            return None
+        return session
+
+    async def check(self) -> None:
+        """Measure every replica's lag, ejecting unreachable or lagging replicas and readmitting healthy ones."""
+        await asyncio.gather(*(self._check(replica) for replica in self.replicas))
+
+    async def _check(self, replica: Replica) -> None:
+        try:
+            async with replica.engine.connect() as connection:
+                replica.lag_seconds = float((await connection.execute(REPLICATION_LAG_SQL)).scalar())
+        except CONNECTION_ERRORS as e:
+            self.eject(replica, str(e) or type(e).__name__)
+            return
+        if replica.lag_seconds > self.max_lag_seconds:
+            self.eject(replica, f"{replica.lag_seconds:.1f}s behind the primary")
+        elif replica.ejected_until:
+            logger.info(f"Read replica {replica.name} is back in rotation")
+            replica.ejected_until = 0.0
+            replica.last_error = None
+
+    def start(self, interval: float) -> None:
+        """Run ``check`` every ``interval`` seconds."""
+        async def run():
+            while True:
+                await asyncio.sleep(interval)
+                try:
+                    await self.check()
+                except Exception as e:
+                    logger.error(f"Read replica check failed: {e}")
+
+        self._checks = asyncio.create_task(run())
+
+    async def stop(self) -> None:
+        if self._checks is not None:
+            self._checks.cancel()
+            await asyncio.gather(self._checks, return_exceptions=True)
+            self._checks = None
+
+    def stats(self) -> List[dict]:
+        now = self.clock()
+        return [
+            {"url": replica.name, "healthy": replica.ejected_until <= now, "lag_seconds": replica.lag_seconds,
+             "last_error": replica.last_error, "pool": pool_snapshot(replica.engine.pool)}
+            for replica in self.replicas
+        ]
+
+class StickyClients:
+    """
+    Clients that wrote within the last ``seconds``, whose reads go to the primary so they see
+    their own writes however far behind the replicas are.
+
+    The clients marked here are only known to this process. With several app processes, a
+    client's next read may be served by another one, so clients also carry the time of their
+    last write (see ``app.dependencies.LAST_WRITE_COOKIE``), which any process checks with
+    ``wrote_recently``.
+
+    Entries are kept in expiry order, so expired ones are dropped from the front as new ones come in.
+    """
+
+    def __init__(self, seconds: float, clock: Callable[[], float] = time.monotonic,
+                 wall_clock: Callable[[], float] = time.time):
+        self.seconds = seconds
+        self.clock = clock
+        self.wall_clock = wall_clock
+        self._until: Dict[str, float] = {}
+
+    def mark(self, client: str) -> None:
+        now = self.clock()
+        self._until.pop(client, None)
+        self._until[client] = now + self.seconds
+        while self._until:
+            oldest = next(iter(self._until))
+            if self._until[oldest] > now:
+                break
+            del self._until[oldest]
+
+    def __contains__(self, client: str) -> bool:
+        return self._until.get(client, 0.0) > self.clock()
+
+    def wrote_recently(self, written_at: float) -> bool:
+        """
+        Whether a write at ``written_at``, a Unix time the client reported, is within the window.
+        Times more than ``seconds`` ahead are ignored too. This bounds how long one report counts,
+        not how often a client reports: the time is only trustworthy if it cannot be forged, which
+        is why ``app.dependencies`` signs it, and a client that keeps writing stays on the primary.
+        """
+        return abs(self.wall_clock() - written_at) < self.seconds
+
+    def __len__(self) -> int:
+        return len(self._until)
+
 class Database:
     """Handles database connections and sessions."""
     _engine = None
     _session_factory = None
+    _replicas: Optional[ReplicaSet] = None
+    _sticky: Optional[StickyClients] = None
 
     @classmethod
-    def initialize(cls, database_url: str, echo: bool = False):
-        """Initialize the async engine and sessionmaker."""
+    def initialize(cls, database_url: str, echo: bool = False, pool_size: int = 5, max_overflow: int = 10,
+                   pool_timeout: float = 30, pool_recycle: int = -1, pool_pre_ping: bool = False,
+                   statement_cache_size: int = 100, pgbouncer: bool = False, replica_urls: Sequence[str] = (),
+                   replica_strategy: str = ROUND_ROBIN, replica_eject_seconds: float = 30,
+                   replica_max_lag_seconds: float = 10, sticky_seconds: float = 5):
+        """
+        Initialize the async engine and sessionmaker.
+
+        :param pool_size: Connections kept open in the pool.
+        :param max_overflow: Connections opened beyond ``pool_size`` under load, closed when returned.
+        :param pool_timeout: Seconds a checkout waits for a free connection before failing.
+        :param pool_recycle: Connections older than this many seconds are replaced; -1 never.
+        :param pool_pre_ping: Check each connection with a round trip on checkout and replace it if dead.
+        :param statement_cache_size: Prepared statements cached per connection.
+        :param pgbouncer: Connect through PgBouncer in transaction pooling mode, where a
+            connection may reach a different server session each transaction: prepared
+            statements are not cached and get unique names, so they never collide.
+        :param replica_urls: Read replicas, each given a pool configured like the primary's.
+        :param replica_strategy: ``round_robin`` or ``least_loaded``, see ``ReplicaSet``.
+        :param replica_eject_seconds: How long an unreachable or lagging replica gets no reads.
+        :param replica_max_lag_seconds: Replication lag beyond which a replica is ejected.
+        :param sticky_seconds: How long a client reads from the primary after writing.
+        """
         if cls._engine is None:  # Ensure engine is created once
-            cls._engine = create_async_engine(database_url, echo=echo, future=True)
+            connect_args = {}
+            if pgbouncer:
+                statement_cache_size = 0
+                connect_args = {"statement_cache_size": 0, "prepared_statement_name_func": lambda: f"__asyncpg_{uuid4()}__"}
+            def create_engine(url: str):
+                return create_async_engine(
+                    url, echo=echo, future=True, poolclass=InstrumentedQueuePool,
+                    pool_size=pool_size, max_overflow=max_overflow, pool_timeout=pool_timeout,
+                    pool_recycle=pool_recycle, pool_pre_ping=pool_pre_ping,
+                    connect_args={"prepared_statement_cache_size": statement_cache_size, **connect_args},
+                )
+
+            cls._engine = create_engine(database_url)
             cls._session_factory = sessionmaker(
                 bind=cls._engine, class_=AsyncSession, expire_on_commit=False, future=True
             )
+            if replica_urls:
+                cls._replicas = ReplicaSet(
+                    [Replica(create_engine(url)) for url in replica_urls], replica_strategy,
+                    eject_seconds=replica_eject_seconds, max_lag_seconds=replica_max_lag_seconds,
+                )
+                cls._sticky = StickyClients(sticky_seconds)
 
     @classmethod
     def get_session_factory(cls):
@@ -23,3 +376,58 @@ class Database:
         if cls._session_factory is None:
             raise ValueError("Database not initialized. Call `initialize()` first.")
         return cls._session_factory
+
+    @classmethod
+    def get_engine(cls):
+        """Returns the engine, ensuring it's initialized."""
+        if cls._engine is None:
+            raise ValueError("Database not initialized. Call `initialize()` first.")
+        return cls._engine
+
+    @classmethod
+    def get_replicas(cls) -> Optional[ReplicaSet]:
+        """Returns the read replicas, or None when reads all go to the primary."""
+        return cls._replicas
+
+    @classmethod
+    def choose_replica(cls, client: Optional[str] = None, last_write: Optional[float] = None) -> Optional[Replica]:
+        """
+        The replica ``client``'s next read should go to; None means the primary, because there
+        are no healthy replicas or ``client`` wrote too recently to be sure a replica has the write.
+
+        :param last_write: When the client says it last wrote, as a Unix time; this counts even
+            if the write was served by another process.
+        """
+        if cls._replicas is None or (client is not None and client in cls._sticky):
+            return None
+        if last_write is not None and cls._sticky.wrote_recently(last_write):
+            return None
+        return cls._replicas.choose()
+
+    @classmethod
+    def record_write(cls, client: str) -> None:
+        """Send ``client``'s reads in this process to the primary for the next ``sticky_seconds``."""
+        if cls._sticky is not None:
+            cls._sticky.mark(client)
+
+    @classmethod
+    def pool_stats(cls) -> Optional[dict]:
+        """A snapshot of the primary's connection pool and each replica's, or None before ``initialize()``."""
+        if cls._engine is None:
+            return None
+        replicas = cls._replicas.stats() if cls._replicas is not None else []
+        return {**pool_snapshot(cls._engine.pool), "replicas": replicas}
+
+    @classmethod
+    async def dispose(cls):
+        """Close the engines' pooled connections; the next `initialize()` creates new engines."""
+        if cls._replicas is not None:
+            await cls._replicas.stop()
+            for replica in cls._replicas.replicas:
+                await replica.engine.dispose()
+        if cls._engine is not None:
+            await cls._engine.dispose()
+        cls._engine = None
+        cls._session_factory = None
+        cls._replicas = None
+        cls._sticky = None
@@ -1,35 +1,56 @@
-from builtins import Exception, dict, str
-from fastapi import Depends, HTTPException
+from builtins import ValueError, dict, float, getattr, max, str
+import hashlib
+import hmac
+import math
+import time
+from typing import Optional
+from fastapi import Depends, HTTPException, Request
 from fastapi.security import OAuth2PasswordBearer
 from sqlalchemy.ext.asyncio import AsyncSession
-from app.database import Database
-from app.utils.template_manager import TemplateManager
+from app.container import get_container
+from app.database import READ_ONLY, UNIT_OF_WORK, Database, unit_of_work
 from app.services.email_service import EmailService
 from app.services.jwt_service import decode_token
-from settings.config import Settings
+from settings.config import Settings, settings
 from fastapi import Depends
 
 def get_settings() -> Settings:
-    """Return application settings."""
-    return Settings()
+    """Return application settings; ``ServiceContainer.reload_settings`` re-reads them."""
+    return settings
 
 def get_email_service() -> EmailService:
-    template_manager = TemplateManager()
-    return EmailService(template_manager=template_manager)
+    """Return the application's email service, built once by the service container."""
+    return get_container().email_service
 
 async def get_db() -> AsyncSession:
-    """Dependency that provides a database session for each request."""
-    async_session_factory = Database.get_session_factory()
-    async with async_session_factory() as session:
-        try:
-            yield session
-        except Exception as e:
-            raise HTTPException(status_code=500, detail=str(e))
-        
+    """
+    Dependency that provides a database session for each request, as one unit of work.
+
+    The request's reads share one transaction and its writes are committed once, after the route
+    returns; if the route raises, everything is rolled back and the error propagates.
+    """
+    async with unit_of_work(get_container().session_factory) as session:
+        yield session
+
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/login")
+# Requests that never write.
+SAFE_METHODS = ("GET", "HEAD", "OPTIONS")
+# Cookie holding the Unix time of the client's last write request, so that whichever app process
+# serves its next read keeps it on the primary; the processes' own records are not shared. The time
+# is signed for the caller (see last_write_cookie), so it cannot be made up or borrowed.
+LAST_WRITE_COOKIE = "last_write"
+
+def get_current_user(request: Request, token: str = Depends(oauth2_scheme)):
+    """
+    Resolve the caller from the bearer token, once per request.
 
-def get_current_user(token: str = Depends(oauth2_scheme)):
+    The result is kept on ``request.state.current_user`` for anything else in the request that
+    needs it; ``decode_token`` skips signature verification for tokens it has verified before.
+    """
+    current_user = getattr(request.state, "current_user", None)
+    if current_user is not None:
+        return current_user
     credentials_exception = HTTPException(
         status_code=401,
         detail="Could not validate credentials",
@@ -42,7 +63,70 @@ def get_current_user(token: str = Depends(oauth2_scheme)):
     user_role: str = payload.get("role")
     if user_id is None or user_role is None:
         raise credentials_exception
-    return {"user_id": user_id, "role": user_role}
+    request.state.current_user = {"user_id": user_id, "role": user_role}
+    return request.state.current_user
+
+def _write_signature(user_id: str, written_at: str) -> str:
+    return hmac.new(settings.secret_key.encode(), f"{user_id}:{written_at}".encode(), hashlib.sha256).hexdigest()
+
+def last_write_cookie(user_id: str, written_at: float) -> str:
+    """The ``LAST_WRITE_COOKIE`` value for a write by ``user_id`` at Unix time ``written_at``: the time and its HMAC."""
+    value = f"{written_at:.3f}"
+    return f"{value}.{_write_signature(user_id, value)}"
+
+def last_write(request: Request, user_id: str) -> Optional[float]:
+    """When ``user_id`` last wrote, from a ``LAST_WRITE_COOKIE`` signed for them; None if there is no valid one."""
+    value, _, signature = request.cookies.get(LAST_WRITE_COOKIE, "").rpartition(".")
+    if not value or not hmac.compare_digest(signature, _write_signature(user_id, value)):
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        return None
+
+async def get_read_db(request: Request, db: AsyncSession = Depends(get_db), current_user: dict = Depends(get_current_user)) -> AsyncSession:
+    """
+    Session for read-only queries, in a read-only transaction: on a read replica when any are
+    configured and healthy, else ``db``.
+
+    A caller that wrote within the last ``db_replica_sticky_seconds`` reads from the primary, so it
+    sees its own writes: this process remembers callers it served writes for, and the
+    ``LAST_WRITE_COOKIE`` covers writes served by other processes. A replica that cannot be
+    reached is taken out of rotation and the request reads from the primary instead.
+    """
+    replica = Database.choose_replica(current_user["user_id"], last_write(request, current_user["user_id"]))
+    session = await Database.get_replicas().open_session(replica) if replica is not None else None
+    if session is None:
+        if db.info.get(UNIT_OF_WORK) and not db.in_transaction():
+            await db.connection(execution_options=READ_ONLY)
+        yield db
+        return
+    async with session:
+        yield session
+
+async def record_client_writes(request: Request):
+    """
+    Router dependency that makes an authenticated caller's reads sticky to the primary after a
+    write request. The time of the write is left in ``request.state.last_write`` for
+    ``set_last_write_cookie`` to hand to the client.
+    """
+    yield
+    current_user = getattr(request.state, "current_user", None)
+    if request.method not in SAFE_METHODS and current_user is not None and Database.get_replicas() is not None:
+        Database.record_write(current_user["user_id"])
+        request.state.last_write = time.time()
+
+async def set_last_write_cookie(request: Request, call_next):
+    """
+    HTTP middleware that sets the ``LAST_WRITE_COOKIE`` after a write request. It runs as
+    middleware because a dependency cannot add headers once the route has built its response.
+    """
+    response = await call_next(request)
+    written_at = getattr(request.state, "last_write", None)
+    if written_at is not None:
+        response.set_cookie(LAST_WRITE_COOKIE, last_write_cookie(request.state.current_user["user_id"], written_at), max_age=max(1, math.ceil(settings.db_replica_sticky_seconds)),
+                            httponly=True, samesite="lax")
+    return response
 
 def require_role(role: str):
     def role_checker(current_user: dict = Depends(get_current_user)):
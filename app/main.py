@@ -1,11 +1,39 @@
 from builtins import Exception
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from starlette.responses import JSONResponse
 from starlette.middleware.cors import CORSMiddleware  # Import the CORSMiddleware
+from app.container import ServiceContainer, set_container
 from app.database import Database
-from app.dependencies import get_settings
+from app.dependencies import set_last_write_cookie
 from app.routers import user_routes
+from app.services.change_notification_service import build_change_bus, start_change_bus, stop_change_bus
+from app.services.email_outbox_service import build_outbox_workers, start_outbox_workers, stop_outbox_workers
 from app.utils.api_description import getDescription
+from app.utils.link_generation import UserLinkTemplates
+from app.utils.password_policy import configure_password_policy
+from app.utils.security import shutdown_password_executor
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Application-scoped services are built once here and handed out by app.dependencies.
+    container = ServiceContainer()
+    set_container(container)
+    app.state.container = container
+    configure_password_policy(container.settings)
+    app.state.user_link_templates = UserLinkTemplates(app.router)
+    await start_change_bus(build_change_bus(container.settings.change_bus_backend))
+    start_outbox_workers(build_outbox_workers(container.session_factory))
+    replicas = Database.get_replicas()
+    if replicas is not None and container.settings.db_replica_check_seconds > 0:
+        replicas.start(container.settings.db_replica_check_seconds)
+    yield
+    await stop_outbox_workers()
+    await stop_change_bus()
+    shutdown_password_executor()
+    await container.close()
+    set_container(None)
+
 app = FastAPI(
     title="User Management",
     description=getDescription(),
@@ -16,6 +44,7 @@ app = FastAPI(
         "email": "support@example.com",
     },
     license_info={"name": "MIT", "url": "https://opensource.org/licenses/MIT"},
+    lifespan=lifespan,
 )
 # CORS middleware configuration
 # This middleware will enable CORS and allow requests from any origin
@@ -27,11 +56,8 @@ app.add_middleware(
     allow_methods=["*"],  # Allowed HTTP methods
     allow_headers=["*"],  # Allowed HTTP headers
 )
-
-@app.on_event("startup")
-async def startup_event():
-    settings = get_settings()
-    Database.initialize(settings.database_url, settings.debug)
+# Tells whichever process serves a client's next read that it just wrote (see record_client_writes)
+app.middleware("http")(set_last_write_cookie)
 
 @app.exception_handler(Exception)
 async def exception_handler(request, exc):
@@ -0,0 +1,62 @@
+from builtins import dict, int, str
+from datetime import datetime
+from enum import Enum
+import uuid
+from sqlalchemy import Column, DateTime, ForeignKey, Index, Integer, String, Text, func, text, Enum as SQLAlchemyEnum
+from sqlalchemy.dialects.postgresql import JSONB, UUID
+from sqlalchemy.orm import Mapped, mapped_column
+from app.database import Base
+
+class OutboxStatus(Enum):
+    """Delivery state of an outbox email."""
+    PENDING = "PENDING"
+    SENT = "SENT"
+    DEAD = "DEAD"
+
+class EmailOutbox(Base):
+    """
+    An email waiting to be sent, written in the same transaction as the change that caused it.
+
+    The email only becomes visible to the delivery workers if that transaction commits, and
+    nothing is sent while it is still open. Workers claim ``PENDING`` rows whose
+    ``available_at`` has passed; claiming pushes ``available_at`` forward by a lease, so a row
+    claimed by a worker that dies is picked up again once the lease runs out.
+
+    Attributes:
+        id (UUID): Unique identifier for the email.
+        email_type (str): Template to render, e.g. ``email_verification``.
+        recipient (str): Address the email is sent to.
+        user_id (UUID): The user the email is about, if any; their emails go when they do.
+        context (dict): Values the template is rendered with; emptied once the email is sent.
+        status (OutboxStatus): ``PENDING`` until sent, or ``DEAD`` once it has failed for good.
+        attempts (int): Delivery attempts so far.
+        last_error (str): Why the last attempt failed, if it did.
+        created_at (datetime): When the email was queued.
+        available_at (datetime): When the email may next be claimed.
+        sent_at (datetime): When the email was accepted by the mail server.
+    """
+    __tablename__ = "email_outbox"
+    __table_args__ = (
+        # Workers' claim query: due pending rows, oldest first. Sent and dead rows are left out.
+        Index("ix_email_outbox_pending_available_at", "available_at", postgresql_where=text("status = 'PENDING'")),
+        # A user's emails and their delivery status, newest first.
+        Index("ix_email_outbox_user_id_created_at", "user_id", "created_at"),
+    )
+
+    id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    email_type: Mapped[str] = Column(String(50), nullable=False)
+    recipient: Mapped[str] = Column(String(255), nullable=False)
+    user_id: Mapped[uuid.UUID] = Column(UUID(as_uuid=True), ForeignKey("users.id", ondelete="CASCADE"), nullable=True)
+    context: Mapped[dict] = Column(JSONB, nullable=False)
+    status: Mapped[OutboxStatus] = Column(
+        SQLAlchemyEnum(OutboxStatus, name='OutboxStatus', create_constraint=True),
+        nullable=False, default=OutboxStatus.PENDING,
+    )
+    attempts: Mapped[int] = Column(Integer, nullable=False, default=0)
+    last_error: Mapped[str] = Column(Text, nullable=True)
+    created_at: Mapped[datetime] = Column(DateTime(timezone=True), nullable=False, server_default=func.now())
+    available_at: Mapped[datetime] = Column(DateTime(timezone=True), nullable=False, server_default=func.now())
+    sent_at: Mapped[datetime] = Column(DateTime(timezone=True), nullable=True)
+
+    def __repr__(self) -> str:
+        return f"<EmailOutbox {self.email_type} to {self.recipient}, Status: {self.status.name}>"
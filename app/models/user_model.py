@@ -3,12 +3,19 @@ from datetime import datetime
 from enum import Enum
 import uuid
 from sqlalchemy import (
-    Column, String, Integer, DateTime, Boolean, func, Enum as SQLAlchemyEnum
+    Column, String, Integer, DateTime, Boolean, Index, func, text, Enum as SQLAlchemyEnum
 )
 from sqlalchemy.dialects.postgresql import UUID, ENUM
-from sqlalchemy.orm import Mapped, mapped_column
+from sqlalchemy.orm import Mapped, deferred, mapped_column
 from app.database import Base
 
+# Lower-cased text that user search matches substrings against. The trigram index is built on
+# exactly this expression, so queries must use it verbatim for the planner to pick the index.
+SEARCH_DOCUMENT_SQL = (
+    "lower(coalesce(nickname, '') || ' ' || coalesce(email, '') || ' ' || "
+    "coalesce(first_name, '') || ' ' || coalesce(last_name, ''))"
+)
+
 class UserRole(Enum):
     """Enumeration of user roles within the application, stored as ENUM in the database."""
     ANONYMOUS = "ANONYMOUS"
@@ -52,6 +59,24 @@ class User(Base):
     """
     __tablename__ = "users"
     __mapper_args__ = {"eager_defaults": True}
+    __table_args__ = (
+        # Sort key for stable ordering and keyset pagination of user listings.
+        Index("ix_users_created_at_id", "created_at", "id"),
+        # Listing filters: role is low-cardinality, so it leads a composite that still serves the
+        # default sort; locked, unverified and professional users are minorities, so partial
+        # indexes keep those filters cheap without indexing the whole table.
+        Index("ix_users_role_created_at_id", "role", "created_at", "id"),
+        Index("ix_users_locked_created_at_id", "created_at", "id", postgresql_where=text("is_locked")),
+        Index("ix_users_unverified_created_at_id", "created_at", "id", postgresql_where=text("NOT email_verified")),
+        Index("ix_users_professional_created_at_id", "created_at", "id", postgresql_where=text("is_professional")),
+        Index("ix_users_last_login_at", "last_login_at"),
+        # Autocomplete: byte-ordered (C collation) keys turn a prefix match into an index range scan.
+        Index("ix_users_nickname_prefix", text('lower(nickname) COLLATE "C"')),
+        Index("ix_users_email_prefix", text('lower(email) COLLATE "C"')),
+        # The pg_trgm GIN index on SEARCH_DOCUMENT_SQL needs the pg_trgm extension, so it is
+        # created by the 3f6a2d9e8b15 migration rather than declared here; alembic/env.py keeps
+        # autogenerate from dropping it.
+    )
 
     id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     nickname: Mapped[str] = Column(String(50), unique=True, nullable=False, index=True)
@@ -70,9 +95,11 @@ class User(Base):
     is_locked: Mapped[bool] = Column(Boolean, default=False)
     created_at: Mapped[datetime] = Column(DateTime(timezone=True), server_default=func.now())
     updated_at: Mapped[datetime] = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
-    verification_token = Column(String, nullable=True)
+    # Secrets are deferred: reads leave them out unless a query undefers them, and touching one that
+    # was not loaded raises instead of issuing a hidden lazy load.
+    verification_token = deferred(Column(String, nullable=True), raiseload=True)
     email_verified: Mapped[bool] = Column(Boolean, default=False, nullable=False)
-    hashed_password: Mapped[str] = Column(String(255), nullable=False)
+    hashed_password: Mapped[str] = deferred(Column(String(255), nullable=False), raiseload=True)
 
 
     def __repr__(self) -> str:
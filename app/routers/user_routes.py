@@ -18,26 +18,94 @@ Key Highlights:
 - Utilizes OAuth2PasswordBearer for securing API endpoints, requiring valid access tokens for operations.
 """
 
-from builtins import dict, int, len, str
+from builtins import ValueError, dict, int, len, str
 from datetime import timedelta
+from typing import Callable, List, Optional
 from uuid import UUID
-from fastapi import APIRouter, Depends, HTTPException, Response, status, Request
-from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Response, status, Request
+
+from fastapi.security import OAuth2PasswordRequestForm
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
-from app.dependencies import get_current_user, get_db, get_email_service, require_role
+from app.database import Database
+from app.dependencies import get_current_user, get_db, get_email_service, get_read_db, record_client_writes, require_role
+from app.schemas.database_schema import DatabasePoolStats
+from app.schemas.email_outbox_schema import EmailOutboxStats, OutboxEmailList
+from app.schemas.email_schema import BulkEmailResponse
 from app.schemas.pagination_schema import EnhancedPagination
 from app.schemas.token_schema import TokenResponse
-from app.schemas.user_schemas import LoginRequest, UserBase, UserCreate, UserListResponse, UserResponse, UserUpdate
-from app.services.user_service import UserService
+from app.schemas.user_cache_schema import UserCacheStats
+from app.schemas.user_schemas import LoginRequest, UserBase, UserCreate, UserListFilters, UserListResponse, UserResponse, UserSuggestion, UserSuggestionResponse, UserUpdate
+from app.services.email_outbox_service import EmailOutboxService, get_outbox_workers
+from app.services.user_cache_service import get_user_cache
+from app.services.user_count_service import get_user_count_strategy
+from app.services.user_service import DEFAULT_SORT, SORT_KEYS, NicknamesExhaustedError, UserService
 from app.services.jwt_service import create_access_token
-from app.utils.link_generation import create_user_links, generate_pagination_links
+from app.utils.cursor import NEXT, PREV, decode_cursor, encode_cursor
+from app.utils.etag import etag_matches, page_etag, user_etag
+from app.utils.link_generation import generate_pagination_links, user_link_builder
+from app.utils.serialization import USER_RESPONSE_FIELDS, UserJSONResponse, user_list_payload, user_payload
 from app.dependencies import get_settings
 from app.services.email_service import EmailService
-router = APIRouter()
-oauth2_scheme = OAuth2PasswordBearer(tokenUrl="login")
+router = APIRouter(dependencies=[Depends(record_client_writes)])
+SORT_PATTERN = rf"^-?({'|'.join(SORT_KEYS)})$"
 settings = get_settings()
+USER_FIELDS = frozenset(USER_RESPONSE_FIELDS)
+
+def user_fields(fields: Optional[str] = Query(None, description="Comma-separated user fields to return, e.g. 'email,nickname'; id is always included.")) -> Optional[List[str]]:
+    """Parses the ``fields`` query parameter into the list of requested user fields, or None for all."""
+    if fields is None:
+        return None
+    requested = [name.strip() for name in fields.split(",") if name.strip()]
+    unknown = [name for name in requested if name not in USER_FIELDS]
+    if unknown or not requested:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Unknown fields: {', '.join(unknown) or fields}")
+    return requested
+
+def nicknames_exhausted() -> HTTPException:
+    """The 503 answered when a signup found no free nickname; retrying draws fresh candidates."""
+    return HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail="Could not allocate a nickname, please retry",
+                         headers={"Retry-After": "1"})
+
+def user_links(request: Request, links: bool = Query(True, description="Set to false to leave hypermedia links out of the response.")) -> Optional[Callable]:
+    """Returns the per-user link builder for this request, or None when links are switched off."""
+    return user_link_builder(request) if links else None
+
+
+# Registered before /users/{user_id} so the literal paths are not parsed as user ids.
+@router.get("/users/search", response_model=UserListResponse, name="search_users", tags=["User Management Requires (Admin or Manager Roles)"])
+async def search_users(
+    request: Request,
+    q: str = Query(..., min_length=settings.search_min_length, description="Case-insensitive text matched anywhere in nickname, email, first or last name."),
+    limit: int = Query(10, ge=1),
+    links: Optional[Callable] = Depends(user_links),
+    db: AsyncSession = Depends(get_read_db),
+    current_user: dict = Depends(require_role(["ADMIN", "MANAGER"]))
+):
+    """
+    Search users by nickname, email, first name or last name.
+
+    Matches are substrings, served by a trigram index; users whose nickname or email starts with
+    ``q`` come first. ``limit`` is capped at the server's maximum page size.
+    """
+    users = await UserService.search(db, q, min(limit, settings.max_page_size))
+    return UserJSONResponse(user_list_payload(users, links=links))
+
+@router.get("/users/autocomplete", response_model=UserSuggestionResponse, name="autocomplete_users", tags=["User Management Requires (Admin or Manager Roles)"])
+async def autocomplete_users(
+    q: str = Query(..., min_length=1, description="Prefix of a nickname or email address."),
+    limit: int = Query(settings.autocomplete_max_results, ge=1, le=settings.autocomplete_max_results),
+    db: AsyncSession = Depends(get_read_db),
+    current_user: dict = Depends(require_role(["ADMIN", "MANAGER"]))
+):
+    """
+    Suggest users as a nickname or email is typed, returning only id and nickname.
+    """
+    suggestions = await UserService.autocomplete(db, q, limit)
+    return UserSuggestionResponse(items=[UserSuggestion(id=user_id, nickname=nickname) for user_id, nickname in suggestions])
+
 @router.get("/users/{user_id}", response_model=UserResponse, name="get_user", tags=["User Management Requires (Admin or Manager Roles)"])
-async def get_user(user_id: UUID, request: Request, db: AsyncSession = Depends(get_db), token: str = Depends(oauth2_scheme), current_user: dict = Depends(require_role(["ADMIN", "MANAGER"]))):
+async def get_user(user_id: UUID, request: Request, fields: Optional[List[str]] = Depends(user_fields), links: Optional[Callable] = Depends(user_links), if_none_match: Optional[str] = Header(None), db: AsyncSession = Depends(get_read_db), current_user: dict = Depends(require_role(["ADMIN", "MANAGER"]))):
     """
     Endpoint to fetch a user by their unique identifier (UUID).
 
@@ -47,29 +115,26 @@ async def get_user(user_id: UUID, request: Request, db: AsyncSession = Depends(g
     Args:
         user_id: UUID of the user to fetch.
         request: The request object, used to generate full URLs in the response.
+        fields: Optional subset of fields to load and return (``?fields=email,nickname``).
+        links: Per-user link builder, or None with ``?links=false``.
+        if_none_match: ETag from an earlier response; answered with 304 if the user is unchanged.
         db: Dependency that provides an AsyncSession for database access.
-        token: The OAuth2 access token obtained through OAuth2PasswordBearer dependency.
+        current_user: The caller, resolved once per request from the OAuth2 bearer token.
     """
-    user = await UserService.get_by_id(db, user_id)
+    if if_none_match is not None:
+        # Only the version is read; an unchanged user costs one index lookup and no serialization.
+        version = await UserService.get_version(db, user_id)
+        if version is None:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
+        etag = user_etag(user_id, version)
+        if etag_matches(if_none_match, etag, weak=True):
+            return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
+
+    user = await UserService.get_by_id(db, user_id, fields)
     if not user:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
 
-    return UserResponse.model_construct(
-        id=user.id,
-        nickname=user.nickname,
-        first_name=user.first_name,
-        last_name=user.last_name,
-        bio=user.bio,
-        profile_picture_url=user.profile_picture_url,
-        github_profile_url=user.github_profile_url,
-        linkedin_profile_url=user.linkedin_profile_url,
-        role=user.role,
-        email=user.email,
-        last_login_at=user.last_login_at,
-        created_at=user.created_at,
-        updated_at=user.updated_at,
-        links=create_user_links(user.id, request)  
-    )
+    return UserJSONResponse(user_payload(user, fields, links), headers={"ETag": user_etag(user.id, user.updated_at)})
 
 # Additional endpoints for update, delete, create, and list users follow a similar pattern, using
 # asynchronous database operations, handling security with OAuth2PasswordBearer, and enhancing response
@@ -79,38 +144,36 @@ async def get_user(user_id: UUID, request: Request, db: AsyncSession = Depends(g
 # experience by adhering to REST principles and providing self-discoverable operations.
 
 @router.put("/users/{user_id}", response_model=UserResponse, name="update_user", tags=["User Management Requires (Admin or Manager Roles)"])
-async def update_user(user_id: UUID, user_update: UserUpdate, request: Request, db: AsyncSession = Depends(get_db), token: str = Depends(oauth2_scheme), current_user: dict = Depends(require_role(["ADMIN", "MANAGER"]))):
+async def update_user(user_id: UUID, user_update: UserUpdate, request: Request, links: Optional[Callable] = Depends(user_links), if_match: Optional[str] = Header(None), db: AsyncSession = Depends(get_db), current_user: dict = Depends(require_role(["ADMIN", "MANAGER"]))):
     """
     Update user information.
 
     - **user_id**: UUID of the user to update.
     - **user_update**: UserUpdate model with updated user information.
+    - **If-Match**: ETag the client last saw; the update is refused with 412 if the user changed since.
     """
+    if if_match is not None:
+        # The row stays locked until the update commits, so no other write can slip in between.
+        version = await UserService.get_version(db, user_id, for_update=True)
+        if version is None:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
+        if not etag_matches(if_match, user_etag(user_id, version)):
+            # The lock is released when the request's session closes.
+            raise HTTPException(status_code=status.HTTP_412_PRECONDITION_FAILED, detail="User was modified by another request")
+
     user_data = user_update.model_dump(exclude_unset=True)
-    updated_user = await UserService.update(db, user_id, user_data)
+    try:
+        updated_user = await UserService.update(db, user_id, user_data)
+    except IntegrityError:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Email or nickname already in use")
     if not updated_user:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
 
-    return UserResponse.model_construct(
-        id=updated_user.id,
-        bio=updated_user.bio,
-        first_name=updated_user.first_name,
-        last_name=updated_user.last_name,
-        nickname=updated_user.nickname,
-        email=updated_user.email,
-        role=updated_user.role,
-        last_login_at=updated_user.last_login_at,
-        profile_picture_url=updated_user.profile_picture_url,
-        github_profile_url=updated_user.github_profile_url,
-        linkedin_profile_url=updated_user.linkedin_profile_url,
-        created_at=updated_user.created_at,
-        updated_at=updated_user.updated_at,
-        links=create_user_links(updated_user.id, request)
-    )
+    return UserJSONResponse(user_payload(updated_user, links=links), headers={"ETag": user_etag(updated_user.id, updated_user.updated_at)})
 
 
 @router.delete("/users/{user_id}", status_code=status.HTTP_204_NO_CONTENT, name="delete_user", tags=["User Management Requires (Admin or Manager Roles)"])
-async def delete_user(user_id: UUID, db: AsyncSession = Depends(get_db), token: str = Depends(oauth2_scheme), current_user: dict = Depends(require_role(["ADMIN", "MANAGER"]))):
+async def delete_user(user_id: UUID, db: AsyncSession = Depends(get_db), current_user: dict = Depends(require_role(["ADMIN", "MANAGER"]))):
     """
     Delete a user by their ID.
 
@@ -124,7 +187,7 @@ async def delete_user(user_id: UUID, db: AsyncSession = Depends(get_db), token:
 
 
 @router.post("/users/", response_model=UserResponse, status_code=status.HTTP_201_CREATED, tags=["User Management Requires (Admin or Manager Roles)"], name="create_user")
-async def create_user(user: UserCreate, request: Request, db: AsyncSession = Depends(get_db), email_service: EmailService = Depends(get_email_service), token: str = Depends(oauth2_scheme), current_user: dict = Depends(require_role(["ADMIN", "MANAGER"]))):
+async def create_user(user: UserCreate, request: Request, links: Optional[Callable] = Depends(user_links), db: AsyncSession = Depends(get_db), current_user: dict = Depends(require_role(["ADMIN", "MANAGER"]))):
     """
     Create a new user.
 
@@ -140,61 +203,99 @@ async def create_user(user: UserCreate, request: Request, db: AsyncSession = Dep
     Returns:
     - UserResponse: The newly created user's information along with navigation links.
     """
-    existing_user = await UserService.get_by_email(db, user.email)
-    if existing_user:
-        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Email already exists")
-    
-    created_user = await UserService.create(db, user.model_dump(), email_service)
+    try:
+        created_user = await UserService.create(db, user.model_dump())
+    except NicknamesExhaustedError:
+        raise nicknames_exhausted()
     if not created_user:
-        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Failed to create user")
-    
-    
-    return UserResponse.model_construct(
-        id=created_user.id,
-        bio=created_user.bio,
-        first_name=created_user.first_name,
-        last_name=created_user.last_name,
-        profile_picture_url=created_user.profile_picture_url,
-        nickname=created_user.nickname,
-        email=created_user.email,
-        role=created_user.role,
-        last_login_at=created_user.last_login_at,
-        created_at=created_user.created_at,
-        updated_at=created_user.updated_at,
-        links=create_user_links(created_user.id, request)
-    )
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Email already exists")
+
+    return UserJSONResponse(user_payload(created_user, links=links), status_code=status.HTTP_201_CREATED)
 
 
 @router.get("/users/", response_model=UserListResponse, tags=["User Management Requires (Admin or Manager Roles)"])
 async def list_users(
     request: Request,
-    skip: int = 0,
-    limit: int = 10,
-    db: AsyncSession = Depends(get_db),
+    skip: int = Query(0, ge=0),
+    limit: int = Query(10, ge=1),
+    cursor: Optional[str] = Query(None, description="Opaque cursor from a previous page's next_cursor or prev_cursor; switches to keyset pagination."),
+    include_total: bool = Query(True, description="Set to false to skip counting users; total and the last link are then omitted."),
+    sort: str = Query(DEFAULT_SORT, pattern=SORT_PATTERN, description="Sort key: created_at, email or nickname; prefix with '-' for descending."),
+    filters: UserListFilters = Depends(),
+    fields: Optional[List[str]] = Depends(user_fields),
+    links: Optional[Callable] = Depends(user_links),
+    if_none_match: Optional[str] = Header(None),
+    db: AsyncSession = Depends(get_read_db),
     current_user: dict = Depends(require_role(["ADMIN", "MANAGER"]))
 ):
-    total_users = await UserService.count(db)
-    users = await UserService.list_users(db, skip, limit)
+    """
+    List users, optionally filtered and sorted.
 
-    user_responses = [
-        UserResponse.model_validate(user) for user in users
-    ]
-    
-    pagination_links = generate_pagination_links(request, skip, limit, total_users)
-    
-    # Construct the final response with pagination details
-    return UserListResponse(
-        items=user_responses,
-        total=total_users,
-        page=skip // limit + 1,
-        size=len(user_responses),
-        links=pagination_links  # Ensure you have appropriate logic to create these links
-    )
+    Pages can be addressed by offset (``skip``/``limit``) or, preferably, by the opaque ``cursor``
+    returned as ``next_cursor``/``prev_cursor`` on every page. Cursor pages cost the same at any
+    depth. ``limit`` is capped at the server's maximum page size.
+
+    Filters: ``role``, ``is_locked``, ``email_verified``, ``is_professional`` and the
+    ``created_after``/``created_before`` and ``last_login_after``/``last_login_before`` ranges.
+
+    ``total`` comes from the configured counting strategy (exact, cached or estimated) and can be
+    skipped entirely with ``include_total=false``. Filtered totals are always counted exactly.
+    Whether a next page exists is read from the page itself, never from ``total``.
+
+    ``fields`` (e.g. ``fields=email,nickname``) loads and returns only those columns of each user,
+    and ``links=false`` drops the per-user and pagination links.
+
+    Every page carries an ``ETag`` over its rows' ids and ``updated_at`` values, the total and
+    whether neighbouring pages exist. With a matching ``If-None-Match`` the page is answered with
+    304 after reading only those key columns.
+    """
+    limit = min(limit, settings.max_page_size)
+    if not include_total:
+        total_users = None
+    elif filters.is_empty():
+        total_users = await get_user_count_strategy().count(db)
+    else:
+        total_users = await UserService.count(db, filters)
+
+    async def read_page(columns):
+        if cursor is not None:
+            try:
+                users, has_next, has_prev = await UserService.list_users_by_cursor(db, limit, decode_cursor(cursor), filters, sort, columns)
+            except ValueError:
+                raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+            return users, has_next, has_prev
+        # One extra row tells whether a next page exists; the total may be estimated or stale.
+        users = await UserService.list_users(db, skip, limit + 1, filters, sort, columns)
+        return users[:limit], len(users) > limit, skip > 0
+
+    if if_none_match is not None:
+        # Versions only: ids, updated_at and sort keys, without building full rows or a body.
+        users, has_next, has_prev = await read_page(())
+        etag = page_etag(users, total_users, has_next, has_prev)
+        if etag_matches(if_none_match, etag, weak=True):
+            return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
+
+    users, has_next, has_prev = await read_page(fields)
+    page = skip // limit + 1 if cursor is None else None
+
+    next_cursor = encode_cursor(UserService.cursor_for(users[-1], sort, NEXT)) if users and has_next else None
+    prev_cursor = encode_cursor(UserService.cursor_for(users[0], sort, PREV)) if users and has_prev else None
+
+    pagination_links = generate_pagination_links(request, skip, limit, total_users, next_cursor, prev_cursor, cursor, has_next) if links else None
+
+    # Built straight from the rows and encoded with orjson; see app.utils.serialization.
+    return UserJSONResponse(user_list_payload(
+        users, fields, links, pagination_links,
+        total=total_users, page=page, next_cursor=next_cursor, prev_cursor=prev_cursor,
+    ), headers={"ETag": page_etag(users, total_users, has_next, has_prev)})
 
 
 @router.post("/register/", response_model=UserResponse, tags=["Login and Registration"])
-async def register(user_data: UserCreate, session: AsyncSession = Depends(get_db), email_service: EmailService = Depends(get_email_service)):
-    user = await UserService.register_user(session, user_data.model_dump(), email_service)
+async def register(user_data: UserCreate, session: AsyncSession = Depends(get_db)):
+    try:
+        user = await UserService.register_user(session, user_data.model_dump())
+    except NicknamesExhaustedError:
+        raise nicknames_exhausted()
     if user:
         return user
     raise HTTPException(status_code=400, detail="Email already exists")
@@ -251,6 +352,7 @@ async def update_user_profile(
     user_id: UUID,
     profile_data: UserUpdate,
     request: Request,
+    links: Optional[Callable] = Depends(user_links),
     db: AsyncSession = Depends(get_db),
     current_user: dict = Depends(require_role(["ADMIN", "MANAGER", "USER"]))
 ):
@@ -264,26 +366,14 @@ async def update_user_profile(
     if current_user["user_id"] != str(user_id) and current_user["role"] not in ["ADMIN", "MANAGER"]:
         raise HTTPException(status_code=403, detail="Permission denied.")
 
-    updated_user = await UserService.update(db, user_id, profile_data.model_dump(exclude_unset=True))
+    try:
+        updated_user = await UserService.update(db, user_id, profile_data.model_dump(exclude_unset=True))
+    except IntegrityError:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Email or nickname already in use")
     if not updated_user:
         raise HTTPException(status_code=404, detail="User not found.")
 
-    return UserResponse.model_construct(
-        id=updated_user.id,
-        nickname=updated_user.nickname,
-        first_name=updated_user.first_name,
-        last_name=updated_user.last_name,
-        bio=updated_user.bio,
-        profile_picture_url=updated_user.profile_picture_url,
-        github_profile_url=updated_user.github_profile_url,
-        linkedin_profile_url=updated_user.linkedin_profile_url,
-        role=updated_user.role,
-        email=updated_user.email,
-        last_login_at=updated_user.last_login_at,
-        created_at=updated_user.created_at,
-        updated_at=updated_user.updated_at,
-        links=create_user_links(updated_user.id, request)
-    )
+    return UserJSONResponse(user_payload(updated_user, links=links))
 @router.post("/users/{user_id}/professional-status", response_model=bool, tags=["User Management Requires (Admin or Manager Roles)"])
 async def upgrade_to_professional_status(
     user_id: UUID,
@@ -299,4 +389,74 @@ async def upgrade_to_professional_status(
     if not success:
         raise HTTPException(status_code=404, detail="User not found or action not permitted.")
 
-    return True
\ No newline at end of file
+    return True
+
+@router.get("/email-outbox/stats", response_model=EmailOutboxStats, name="email_outbox_stats", tags=["Email Requires (Admin Role)"])
+async def email_outbox_stats(db: AsyncSession = Depends(get_db), current_user: dict = Depends(require_role(["ADMIN"]))):
+    """
+    Email outbox depth, and delivery counts and latency for this process's workers.
+    """
+    stats = await EmailOutboxService.stats(db)
+    workers = get_outbox_workers()
+    if workers is not None:
+        stats.update(sent=workers.sent, retried=workers.retried, dead_lettered=workers.dead_lettered,
+                     latency_ms=workers.latency_stats())
+    return stats
+
+
+@router.get("/database/pool", response_model=DatabasePoolStats, name="database_pool_stats", tags=["Database Requires (Admin Role)"])
+async def database_pool_stats(current_user: dict = Depends(require_role(["ADMIN"]))):
+    """
+    This process's database connection pools, the primary's and each read replica's: connections in use,
+    requests waiting for one and how long they waited, and whether each replica is in rotation.
+    """
+    stats = Database.pool_stats()
+    if stats is None:
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail="Database not initialized")
+    return stats
+
+
+@router.get("/user-cache/stats", response_model=UserCacheStats, name="user_cache_stats", tags=["Database Requires (Admin Role)"])
+async def user_cache_stats(current_user: dict = Depends(require_role(["ADMIN"]))):
+    """
+    Hits, misses and invalidations of this process's user cache since it started.
+    """
+    cache = get_user_cache()
+    if cache is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User cache is disabled")
+    return cache.stats()
+
+
+@router.post("/email-outbox/retry-dead", response_model=int, name="retry_dead_emails", tags=["Email Requires (Admin Role)"])
+async def retry_dead_emails(db: AsyncSession = Depends(get_db), current_user: dict = Depends(require_role(["ADMIN"]))):
+    """
+    Queue every dead-lettered email for delivery again; returns how many were requeued.
+    """
+    return await EmailOutboxService.retry_dead(db)
+
+
+@router.get("/users/{user_id}/emails", response_model=OutboxEmailList, name="user_emails", tags=["Email Requires (Admin Role)"])
+async def user_emails(user_id: UUID, limit: int = Query(20, ge=1, le=100), db: AsyncSession = Depends(get_db),
+                      current_user: dict = Depends(require_role(["ADMIN"]))):
+    """
+    The emails queued for a user, newest first, and whether each was sent, is waiting for a
+    (re)try, or was given up on, with the last delivery error.
+    """
+    return {"items": await EmailOutboxService.for_user(db, user_id, limit)}
+
+
+@router.post("/users/resend-verification", response_model=BulkEmailResponse, status_code=status.HTTP_202_ACCEPTED, name="resend_verification_emails", tags=["Email Requires (Admin Role)"])
+async def resend_verification_emails(
+    filters: UserListFilters = Depends(),
+    db: AsyncSession = Depends(get_db),
+    current_user: dict = Depends(require_role(["ADMIN"]))
+):
+    """
+    Queue the verification email again for every unverified user matching the filters.
+
+    Takes the same filters as the user listing (``email_verified`` is always false). The emails
+    are queued in the email outbox and the request returns as soon as they are; the outbox
+    workers deliver them within the SMTP rate limit. ``GET /email-outbox/stats`` shows overall
+    progress and ``GET /users/{user_id}/emails`` whether a given user's email went out.
+    """
+    return {"queued": await UserService.resend_verification_emails(db, filters)}
@@ -0,0 +1,40 @@
+from typing import Dict, List, Optional
+from pydantic import BaseModel, Field
+
+class ConnectionPoolStats(BaseModel):
+    size: int = Field(..., description="Connections the pool keeps open.")
+    checked_out: int = Field(..., description="Connections in use by requests right now.")
+    idle: int = Field(..., description="Open connections waiting in the pool.")
+    overflow: int = Field(..., description="Connections beyond size opened under load; negative until the pool has opened size connections.")
+    waiting: int = Field(..., description="Requests waiting for a connection right now.")
+    checkouts: int = Field(..., description="Connections handed out since the process started.")
+    timeouts: int = Field(..., description="Requests that gave up waiting for a connection.")
+    wait_seconds_total: float = Field(..., description="Total time spent waiting for connections.")
+    wait_histogram: Dict[str, int] = Field(..., description="Checkouts that waited at most each number of seconds, cumulative, ending with +Inf.")
+
+class DatabaseReplicaStats(BaseModel):
+    url: str = Field(..., description="The replica's URL, password hidden.")
+    healthy: bool = Field(..., description="Whether the replica is in rotation for reads.")
+    lag_seconds: Optional[float] = Field(None, description="Replication lag at the last health check; null before the first.")
+    last_error: Optional[str] = Field(None, description="Why the replica was last taken out of rotation.")
+    pool: ConnectionPoolStats = Field(..., description="The replica's connection pool.")
+
+class DatabasePoolStats(ConnectionPoolStats):
+    replicas: List[DatabaseReplicaStats] = Field([], description="Read replicas, if any are configured.")
+
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "size": 5,
+                "checked_out": 7,
+                "idle": 0,
+                "overflow": 2,
+                "waiting": 3,
+                "checkouts": 1520,
+                "timeouts": 0,
+                "wait_seconds_total": 4.2,
+                "wait_histogram": {"0.001": 1400, "0.005": 1450, "0.01": 1480, "0.05": 1500, "0.1": 1510,
+                                   "0.5": 1518, "1.0": 1520, "5.0": 1520, "+Inf": 1520},
+                "replicas": []
+            }
+        }
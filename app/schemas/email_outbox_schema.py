@@ -0,0 +1,45 @@
+from datetime import datetime
+from typing import Dict, List, Optional
+import uuid
+from pydantic import BaseModel, Field
+from app.models.email_outbox_model import OutboxStatus
+
+class EmailOutboxStats(BaseModel):
+    pending: int = Field(..., description="Emails not yet sent, including ones waiting on a retry.")
+    due: int = Field(..., description="Pending emails ready to be claimed now; a growing number means delivery is falling behind.")
+    dead: int = Field(..., description="Emails that were given up on.")
+    oldest_pending_seconds: float = Field(..., description="Age of the oldest pending email.")
+    sent: Optional[int] = Field(None, description="Emails this process's workers sent since it started; null if it runs no workers.")
+    retried: Optional[int] = Field(None, description="Deliveries by this process's workers that failed and were rescheduled.")
+    dead_lettered: Optional[int] = Field(None, description="Emails this process's workers gave up on.")
+    latency_ms: Dict[str, float] = Field({}, description="Enqueue-to-delivery latency percentiles over recent emails sent by this process.")
+
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "pending": 3,
+                "due": 1,
+                "dead": 0,
+                "oldest_pending_seconds": 42.5,
+                "sent": 120,
+                "retried": 2,
+                "dead_lettered": 0,
+                "latency_ms": {"samples": 120, "p50_ms": 180.0, "p95_ms": 950.0, "p99_ms": 1400.0, "max_ms": 1800.0}
+            }
+        }
+
+class OutboxEmail(BaseModel):
+    id: uuid.UUID = Field(..., description="The queued email.")
+    email_type: str = Field(..., description="Template the email is rendered from.", example="email_verification")
+    recipient: str = Field(..., description="Address the email is sent to.", example="john.doe@example.com")
+    status: OutboxStatus = Field(..., description="PENDING until the mail server accepts it, SENT once it has, DEAD if it was given up on.")
+    attempts: int = Field(..., description="Delivery attempts so far.")
+    last_error: Optional[str] = Field(None, description="Why the last attempt failed, if it did.")
+    created_at: datetime = Field(..., description="When the email was queued.")
+    sent_at: Optional[datetime] = Field(None, description="When the mail server accepted the email.")
+
+    class Config:
+        from_attributes = True
+
+class OutboxEmailList(BaseModel):
+    items: List[OutboxEmail] = Field(..., description="The user's most recently queued emails, newest first.")
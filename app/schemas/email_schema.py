@@ -0,0 +1,4 @@
+from pydantic import BaseModel, Field
+
+class BulkEmailResponse(BaseModel):
+    queued: int = Field(..., description="Emails queued in the outbox for delivery.", example=120)
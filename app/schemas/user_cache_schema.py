@@ -0,0 +1,19 @@
+from pydantic import BaseModel, Field
+
+class UserCacheStats(BaseModel):
+    hits: int = Field(..., description="Lookups answered with a cached user.")
+    negative_hits: int = Field(..., description="Lookups answered with a cached 'no such user'.")
+    misses: int = Field(..., description="Lookups that had to ask the database.")
+    invalidations: int = Field(..., description="Writes that dropped cached entries.")
+    hit_ratio: float = Field(..., description="Share of lookups answered from the cache, negative hits included.")
+
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "hits": 9120,
+                "negative_hits": 35,
+                "misses": 845,
+                "invalidations": 310,
+                "hit_ratio": 0.9155
+            }
+        }
@@ -6,6 +6,8 @@ from enum import Enum
 import uuid
 import re
 from app.models.user_model import UserRole
+from app.schemas.link_schema import Link
+from app.schemas.pagination_schema import PaginationLink
 from app.utils.nickname_gen import generate_nickname
 
 
@@ -60,6 +62,27 @@ class UserResponse(UserBase):
     nickname: Optional[str] = Field(None, min_length=3, pattern=r'^[\w-]+$', example=generate_nickname())    
     is_professional: Optional[bool] = Field(default=False, example=True)
     role: UserRole
+    links: List[Link] = Field([], description="Actions on this user; omitted when links=false.")
+
+class UserListFilters(BaseModel):
+    role: Optional[UserRole] = Field(None, description="Only users with this role.")
+    is_locked: Optional[bool] = Field(None, description="Only locked (true) or unlocked (false) users.")
+    email_verified: Optional[bool] = Field(None, description="Only users whose email is (or is not) verified.")
+    is_professional: Optional[bool] = Field(None, description="Only professional (or non-professional) users.")
+    created_after: Optional[datetime] = Field(None, description="Only users created at or after this time.")
+    created_before: Optional[datetime] = Field(None, description="Only users created before this time.")
+    last_login_after: Optional[datetime] = Field(None, description="Only users who last logged in at or after this time.")
+    last_login_before: Optional[datetime] = Field(None, description="Only users who last logged in before this time.")
+
+    def is_empty(self) -> bool:
+        return not self.model_dump(exclude_none=True)
+
+class UserSuggestion(BaseModel):
+    id: uuid.UUID = Field(..., example=uuid.uuid4())
+    nickname: Optional[str] = Field(None, example=generate_nickname())
+
+class UserSuggestionResponse(BaseModel):
+    items: List[UserSuggestion] = Field(..., description="Users whose nickname or email starts with the query, by nickname.")
 
 class LoginRequest(BaseModel):
     email: str = Field(..., example="john.doe@example.com")
@@ -78,6 +101,9 @@ class UserListResponse(BaseModel):
         "linkedin_profile_url": "https://linkedin.com/in/johndoe", 
         "github_profile_url": "https://github.com/johndoe"
     }])
-    total: int = Field(..., example=100)
-    page: int = Field(..., example=1)
+    total: Optional[int] = Field(None, example=100, description="Total number of users; omitted when include_total=false.")
+    page: Optional[int] = Field(None, example=1, description="Page number in offset mode; not known in cursor mode.")
     size: int = Field(..., example=10)
+    next_cursor: Optional[str] = Field(None, description="Opaque cursor for the following page, if there is one.")
+    prev_cursor: Optional[str] = Field(None, description="Opaque cursor for the preceding page, if there is one.")
+    links: List[PaginationLink] = []
@@ -0,0 +1,295 @@
+from builtins import ConnectionError, Exception, NotImplementedError, ValueError, dict, float, int, len, list, set, str
+import asyncio
+from collections import deque
+import json
+import time
+from typing import Awaitable, Callable, Deque, Dict, List, Optional
+from uuid import UUID, uuid4
+import asyncpg
+from app.services.user_cache_service import get_user_cache
+from app.services.user_count_service import invalidate_user_count
+from app.utils.stats import latency_percentiles
+from settings.config import settings
+import logging
+
+logger = logging.getLogger(__name__)
+
+POSTGRES = "postgres"
+MEMORY = "memory"
+NONE = "none"
+
+# Kinds of user-row change a notification reports.
+CREATED = "created"
+UPDATED = "updated"
+DELETED = "deleted"
+
+# Handlers receive each decoded change notification, e.g. to drop a local cache entry.
+ChangeHandler = Callable[[dict], Awaitable[None]]
+
+class ChangeTransport:
+    """
+    Carries change notifications between workers.
+
+    ``publish`` sends a payload to every worker listening, including this one; ``start``
+    delivers received payloads to ``on_message`` and calls ``on_reset`` whenever notifications
+    may have been lost (e.g. the listening connection dropped), so caches can be cleared.
+    """
+
+    async def start(self, on_message: Callable[[str], Awaitable[None]], on_reset: Callable[[], Awaitable[None]]) -> None:
+        raise NotImplementedError
+
+    async def publish(self, payload: str) -> None:
+        raise NotImplementedError
+
+    async def stop(self) -> None:
+        raise NotImplementedError
+
+class PostgresNotifyTransport(ChangeTransport):
+    """
+    Change transport over PostgreSQL ``LISTEN``/``NOTIFY`` on ``channel``.
+
+    Each worker holds one dedicated connection (outside the SQLAlchemy pool) that listens and
+    also publishes; PostgreSQL delivers a ``NOTIFY`` to every listening session, this one
+    included. Payloads published while a send is in flight are queued and sent together in one
+    round trip, so concurrent writers do not queue up behind each other on the connection.
+    If the connection drops it is reopened, with a delay of ``reconnect_delay`` seconds between
+    attempts, and ``on_reset`` is called once listening resumes.
+    """
+
+    def __init__(self, database_url: str, channel: str, reconnect_delay: float = 1.0):
+        self.dsn = database_url.replace("postgresql+asyncpg://", "postgresql://")
+        self.channel = channel
+        self.reconnect_delay = reconnect_delay
+        self._connection = None
+        self._pending: List[str] = []
+        self._sending = False
+        self._tasks: set = set()
+        self._on_message = None
+        self._on_reset = None
+        self._stopped = False
+
+    async def start(self, on_message, on_reset) -> None:
+        self._on_message = on_message
+        self._on_reset = on_reset
+        self._stopped = False
+        await self._listen()
+
+    async def _listen(self) -> None:
+        connection = await asyncpg.connect(self.dsn)
+        await connection.add_listener(self.channel, self._notified)
+        connection.add_termination_listener(self._terminated)
+        self._connection = connection
+
+    def _notified(self, connection, pid: int, channel: str, payload: str) -> None:
+        self._spawn(self._on_message(payload))
+
+    def _terminated(self, connection) -> None:
+        if not self._stopped:
+            logger.warning(f"Lost the connection listening on {self.channel}; reconnecting.")
+            self._connection = None
+            self._spawn(self._reconnect())
+
+    async def _reconnect(self) -> None:
+        while not self._stopped:
+            try:
+                await self._listen()
+            except Exception as e:
+                logger.error(f"Could not listen on {self.channel}: {e}")
+                await asyncio.sleep(self.reconnect_delay)
+                continue
+            await self._on_reset()
+            return
+
+    def _spawn(self, coro) -> None:
+        task = asyncio.ensure_future(coro)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def publish(self, payload: str) -> None:
+        """Queues ``payload``; it is sent in the background, and send errors are logged."""
+        if self._connection is None:
+            raise ConnectionError(f"Not connected to {self.channel}")
+        self._pending.append(payload)
+        if not self._sending:
+            self._sending = True
+            self._spawn(self._send())
+
+    async def _send(self) -> None:
+        # asyncpg runs one statement per connection at a time, so a single sender drains the queue.
+        try:
+            while self._pending and self._connection is not None:
+                batch, self._pending = self._pending, []
+                try:
+                    await self._connection.execute(
+                        "SELECT pg_notify($1, payload) FROM unnest($2::text[]) AS payload", self.channel, batch
+                    )
+                except Exception as e:
+                    logger.error(f"Could not notify {len(batch)} change(s) on {self.channel}: {e}")
+        finally:
+            self._sending = False
+
+    async def stop(self) -> None:
+        self._stopped = True
+        if self._connection is not None:
+            await self._connection.close()
+            self._connection = None
+        for task in list(self._tasks):
+            task.cancel()
+
+class MemoryHub:
+    """Stands in for the database a set of ``MemoryTransport`` workers notify each other through."""
+
+    def __init__(self):
+        self.transports: List["MemoryTransport"] = []
+
+class MemoryTransport(ChangeTransport):
+    """
+    In-process change transport for tests and single-worker setups.
+
+    ``publish`` delivers the payload to every started transport on the same ``hub`` before it
+    returns, so the effect of a write on other (simulated) workers can be asserted right away.
+    """
+
+    def __init__(self, hub: Optional[MemoryHub] = None):
+        self.hub = hub or MemoryHub()
+        self._on_message = None
+        self._on_reset = None
+
+    async def start(self, on_message, on_reset) -> None:
+        self._on_message = on_message
+        self._on_reset = on_reset
+        self.hub.transports.append(self)
+
+    async def publish(self, payload: str) -> None:
+        for transport in list(self.hub.transports):
+            await transport._on_message(payload)
+
+    async def reset(self) -> None:
+        """Simulate losing notifications, as when a listening connection is reopened."""
+        await self._on_reset()
+
+    async def stop(self) -> None:
+        if self in self.hub.transports:
+            self.hub.transports.remove(self)
+
+class ChangeBus:
+    """
+    Publishes user-row changes and applies the changes other workers publish.
+
+    ``UserService`` publishes after each committed write. Every worker, on receipt, runs the
+    subscribed handlers (by default: drop the user from the local user cache and, for creates
+    and deletes, the cached user count). A worker skips its own notifications, having already
+    invalidated locally. The delay between publishing and receipt is kept for the last
+    ``lag_samples`` notifications received, see ``lag_stats``.
+    """
+
+    def __init__(self, transport: ChangeTransport, lag_samples: int = 1000):
+        self.transport = transport
+        self.origin = uuid4().hex
+        self.handlers: List[ChangeHandler] = [invalidate_local_caches]
+        self.published = 0
+        self.received = 0
+        self.resets = 0
+        self._lags: Deque[float] = deque(maxlen=lag_samples)
+
+    def subscribe(self, handler: ChangeHandler) -> None:
+        """Run ``handler`` for every change another worker publishes."""
+        self.handlers.append(handler)
+
+    async def start(self) -> None:
+        await self.transport.start(self._receive, self._reset)
+
+    async def stop(self) -> None:
+        await self.transport.stop()
+
+    async def publish(self, kind: str, user_id: UUID, email: Optional[str] = None, nickname: Optional[str] = None) -> None:
+        """
+        Tell the other workers a user was created, updated or deleted.
+
+        ``email`` and ``nickname`` are the values a write gave the user, for caches keyed by them.
+        Failures are logged, not raised: the write has committed, and peers' caches still expire.
+        """
+        change = {"kind": kind, "id": str(user_id), "email": email, "nickname": nickname,
+                  "origin": self.origin, "sent_at": time.time()}
+        try:
+            await self.transport.publish(json.dumps(change))
+            self.published += 1
+        except Exception as e:
+            logger.error(f"Could not publish {kind} of user {user_id}: {e}")
+
+    async def _receive(self, payload: str) -> None:
+        try:
+            change = json.loads(payload)
+        except ValueError:
+            logger.error(f"Ignoring malformed change notification: {payload!r}")
+            return
+        if change.get("origin") == self.origin:
+            return
+        self.received += 1
+        self._lags.append(time.time() - change["sent_at"])
+        for handler in self.handlers:
+            try:
+                await handler(change)
+            except Exception as e:
+                logger.error(f"Change handler {handler.__name__} failed: {e}")
+
+    async def _reset(self) -> None:
+        # Changes published while we were not listening are unknown; drop everything cached.
+        self.resets += 1
+        await handle_lost_changes()
+
+    def lag_stats(self) -> Dict[str, float]:
+        """Invalidation lag, publish to receipt, over recent notifications, in milliseconds."""
+        return latency_percentiles(self._lags)
+
+async def invalidate_local_caches(change: dict) -> None:
+    """Default change handler: drop what this worker caches about the changed user."""
+    cache = get_user_cache()
+    if cache is not None:
+        await cache.invalidate(UUID(change["id"]), change.get("email"), change.get("nickname"))
+    if change["kind"] in (CREATED, DELETED):
+        invalidate_user_count()
+
+async def handle_lost_changes() -> None:
+    """Drop everything this worker caches about users, after notifications may have been missed."""
+    cache = get_user_cache()
+    if cache is not None:
+        await cache.clear()
+    invalidate_user_count()
+
+def build_change_bus(backend: str) -> Optional[ChangeBus]:
+    """Builds the change bus named by ``backend`` from settings; None when disabled."""
+    if backend == NONE:
+        return None
+    if backend == MEMORY:
+        return ChangeBus(MemoryTransport())
+    if backend != POSTGRES:
+        raise ValueError(f"Unknown change bus backend: {backend}")
+    return ChangeBus(PostgresNotifyTransport(settings.change_bus_database_url or settings.database_url, settings.change_bus_channel))
+
+_bus: Optional[ChangeBus] = None
+
+def get_change_bus() -> Optional[ChangeBus]:
+    """Returns the running change bus, or None if none was started in this process."""
+    return _bus
+
+async def start_change_bus(bus: Optional[ChangeBus]) -> None:
+    """
+    Starts ``bus`` and makes it the one ``UserService`` publishes to.
+
+    If it cannot start, the worker runs without one and its caches are only as fresh as their TTL.
+    """
+    global _bus
+    if bus is not None:
+        try:
+            await bus.start()
+        except Exception as e:
+            logger.error(f"Could not start the change bus, caches will rely on expiry alone: {e}")
+            bus = None
+    _bus = bus
+
+async def stop_change_bus() -> None:
+    global _bus
+    if _bus is not None:
+        await _bus.stop()
+    _bus = None
@@ -0,0 +1,345 @@
+from builtins import Exception, KeyError, ValueError, bool, classmethod, dict, float, int, isinstance, len, list, min, range, str, zip
+import asyncio
+from collections import deque
+from datetime import datetime, timezone
+from typing import Callable, Deque, Dict, List, Optional, Sequence
+from uuid import UUID
+from sqlalchemy import Float, bindparam, delete, func, literal_column, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.database import commit
+from app.dependencies import get_email_service
+from app.models.email_outbox_model import EmailOutbox, OutboxStatus
+from app.models.user_model import User
+from app.services.email_service import EmailService, verification_email_data
+from app.utils.smtp_connection import SMTPError
+from app.utils.stats import latency_percentiles
+from settings.config import settings
+import logging
+
+logger = logging.getLogger(__name__)
+
+ONE_SECOND = literal_column("interval '1 second'")
+
+class EmailOutboxService:
+    @classmethod
+    def enqueue(cls, session: AsyncSession, email_type: str, user_data: Dict[str, str], user_id: Optional[UUID] = None) -> EmailOutbox:
+        """
+        Queue an email in ``session``'s transaction; it is sent only if the transaction commits.
+
+        :param email_type: Template to render, as accepted by ``EmailService.send_bulk``.
+        :param user_data: Values the template is rendered with; ``email`` is the recipient.
+        :param user_id: The user the email is about, so its delivery can be looked up by user.
+        """
+        email = EmailOutbox(email_type=email_type, recipient=user_data["email"], context=user_data, user_id=user_id)
+        session.add(email)
+        return email
+
+    @classmethod
+    def enqueue_verification_email(cls, session: AsyncSession, user: User) -> EmailOutbox:
+        return cls.enqueue(session, 'email_verification', verification_email_data(user), user.id)
+
+    @classmethod
+    async def for_user(cls, session: AsyncSession, user_id: UUID, limit: int = 20) -> List[EmailOutbox]:
+        """The ``limit`` most recently queued emails about ``user_id``, with their delivery status."""
+        result = await session.execute(
+            select(EmailOutbox)
+            .where(EmailOutbox.user_id == user_id)
+            .order_by(EmailOutbox.created_at.desc())
+            .limit(limit)
+        )
+        return list(result.scalars().all())
+
+    @classmethod
+    async def claim(cls, session: AsyncSession, batch_size: int, lease_seconds: float) -> List[EmailOutbox]:
+        """
+        Claim up to ``batch_size`` due emails for delivery, oldest first, and commit the claim.
+
+        Rows another worker is claiming at the same moment are skipped (``FOR UPDATE SKIP
+        LOCKED``) rather than waited for. A claim moves ``available_at`` ``lease_seconds`` ahead
+        and counts an attempt; if the claimant never reports back, the email becomes due again
+        when the lease runs out, so delivery is at least once.
+        """
+        due = (
+            select(EmailOutbox.id)
+            .where(EmailOutbox.status == OutboxStatus.PENDING, EmailOutbox.available_at <= func.now())
+            .order_by(EmailOutbox.available_at)
+            .limit(batch_size)
+            .with_for_update(skip_locked=True)
+        )
+        query = (
+            update(EmailOutbox)
+            .where(EmailOutbox.id.in_(due))
+            .values(available_at=func.now() + lease_seconds * ONE_SECOND, attempts=EmailOutbox.attempts + 1)
+            .returning(EmailOutbox)
+            .execution_options(synchronize_session=False)
+        )
+        result = await session.execute(query)
+        claimed = list(result.scalars().all())
+        await session.commit()
+        return claimed
+
+    @classmethod
+    async def record(cls, session: AsyncSession, sent: Sequence[EmailOutbox], failed: Sequence[dict]) -> None:
+        """
+        Record the outcome of delivering claimed emails, in one transaction.
+
+        :param sent: Emails the mail server accepted. Their ``context`` is emptied, since it can
+            hold a live verification link that has no business outliving the send.
+        :param failed: One dict per failed email: ``id``, ``error``, ``dead`` (give up on it) and
+            ``delay`` (seconds until the retry, ignored when dead).
+        """
+        table = EmailOutbox.__table__
+        if sent:
+            await session.execute(
+                update(table)
+                .where(table.c.id.in_([email.id for email in sent]))
+                .values(status=OutboxStatus.SENT, sent_at=func.now(), last_error=None, context={})
+            )
+        if failed:
+            await session.execute(
+                update(table)
+                .where(table.c.id == bindparam("row_id"))
+                .values(
+                    status=bindparam("next_status"),
+                    available_at=func.now() + bindparam("delay", type_=Float) * ONE_SECOND,
+                    last_error=bindparam("error"),
+                ),
+                [{"row_id": f["id"], "next_status": OutboxStatus.DEAD if f["dead"] else OutboxStatus.PENDING,
+                  "delay": f["delay"], "error": f["error"]} for f in failed],
+            )
+        await session.commit()
+
+    @classmethod
+    async def retry_dead(cls, session: AsyncSession) -> int:
+        """
+        Put every dead-lettered email back in the queue with a fresh set of attempts; returns how many.
+
+        This process's workers are woken once the requeue commits, which in a request is at its end.
+        """
+        result = await session.execute(
+            update(EmailOutbox)
+            .where(EmailOutbox.status == OutboxStatus.DEAD)
+            .values(status=OutboxStatus.PENDING, attempts=0, available_at=func.now())
+            .execution_options(synchronize_session=False)
+        )
+        await commit(session, wake_outbox_workers)
+        return result.rowcount
+
+    @classmethod
+    async def purge_sent(cls, session: AsyncSession, older_than_seconds: float) -> int:
+        """Delete emails sent more than ``older_than_seconds`` ago; returns how many."""
+        result = await session.execute(
+            delete(EmailOutbox)
+            .where(EmailOutbox.status == OutboxStatus.SENT,
+                   EmailOutbox.sent_at < func.now() - older_than_seconds * ONE_SECOND)
+            .execution_options(synchronize_session=False)
+        )
+        await session.commit()
+        return result.rowcount
+
+    @classmethod
+    async def stats(cls, session: AsyncSession) -> Dict[str, float]:
+        """
+        Queue depth from the table, shared by every worker.
+
+        :return: ``pending`` and ``due`` (pending and not waiting on a retry or lease) emails,
+            ``dead`` emails, and the age in seconds of the oldest pending one.
+        """
+        pending = EmailOutbox.status == OutboxStatus.PENDING
+        result = await session.execute(select(
+            func.count().filter(pending),
+            func.count().filter(pending, EmailOutbox.available_at <= func.now()),
+            func.count().filter(EmailOutbox.status == OutboxStatus.DEAD),
+            func.extract("epoch", func.now() - func.min(EmailOutbox.created_at).filter(pending)),
+        ))
+        pending_count, due_count, dead_count, oldest = result.one()
+        return {"pending": pending_count, "due": due_count, "dead": dead_count,
+                "oldest_pending_seconds": float(oldest or 0)}
+
+def is_permanent(error: Exception) -> bool:
+    """Failures retrying cannot fix: a 5xx SMTP rejection, or an email that cannot be rendered."""
+    if isinstance(error, SMTPError):
+        return error.code >= 500
+    return isinstance(error, (KeyError, ValueError))
+
+class EmailOutboxWorkers:
+    """
+    Delivers outbox emails with ``workers`` concurrent tasks.
+
+    Each task claims a batch, sends it through ``EmailService.send_bulk`` (one call per email
+    type, so the batch is rendered in one pass and pipelined over shared SMTP connections),
+    records each email's outcome, and keeps going while full batches come back; once the queue is drained it sleeps until
+    ``wake`` is called (after a local enqueue commits) or ``poll_seconds`` pass (emails queued
+    by other processes, retries coming due). Any number of processes can run workers against
+    the same table. A failed email is retried after ``backoff_seconds``, doubling per attempt
+    up to ``backoff_max_seconds``; after ``max_attempts``, or on a permanent failure, it is
+    dead-lettered. Time from enqueue to delivery is kept for the last ``latency_samples``
+    emails sent, see ``latency_stats``. Every ``purge_seconds``, emails sent more than
+    ``retention_seconds`` ago are deleted; with a retention of 0 they are kept.
+    """
+
+    def __init__(self, session_factory, email_service: Callable[[], EmailService] = get_email_service,
+                 workers: int = 2, batch_size: int = 20, poll_seconds: float = 1, lease_seconds: float = 300,
+                 max_attempts: int = 5, backoff_seconds: float = 30, backoff_max_seconds: float = 3600,
+                 latency_samples: int = 1000, retention_seconds: float = 7 * 86400, purge_seconds: float = 3600):
+        self.session_factory = session_factory
+        self.email_service = email_service
+        self.workers = workers
+        self.batch_size = batch_size
+        self.poll_seconds = poll_seconds
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self.backoff_seconds = backoff_seconds
+        self.backoff_max_seconds = backoff_max_seconds
+        self.retention_seconds = retention_seconds
+        self.purge_seconds = purge_seconds
+        self.sent = 0
+        self.retried = 0
+        self.dead_lettered = 0
+        self._latencies: Deque[float] = deque(maxlen=latency_samples)
+        self._wakeup: Optional[asyncio.Event] = None
+        self._tasks: List[asyncio.Task] = []
+
+    def backoff(self, attempts: int) -> float:
+        """Seconds to wait before retrying an email that has failed ``attempts`` times."""
+        return min(self.backoff_max_seconds, self.backoff_seconds * 2 ** (attempts - 1))
+
+    def start(self) -> None:
+        self._wakeup = asyncio.Event()
+        self._tasks = [asyncio.create_task(self._work()) for _ in range(self.workers)]
+        if self.retention_seconds > 0:
+            self._tasks.append(asyncio.create_task(self._purge()))
+
+    async def stop(self) -> None:
+        """Stop the workers; a batch being delivered is abandoned and retried once its lease expires."""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def wake(self) -> None:
+        """Have idle workers look for due emails now rather than at their next poll."""
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    async def _work(self) -> None:
+        while True:
+            try:
+                handled = await self.run_once()
+            except Exception as e:
+                logger.error(f"Email outbox worker failed: {e}")
+                handled = 0
+            if handled < self.batch_size:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), self.poll_seconds)
+                except asyncio.TimeoutError:
+                    pass
+                self._wakeup.clear()
+
+    async def _purge(self) -> None:
+        while True:
+            try:
+                async with self.session_factory() as session:
+                    purged = await EmailOutboxService.purge_sent(session, self.retention_seconds)
+                if purged:
+                    logger.info(f"Purged {purged} sent email(s) from the outbox.")
+            except Exception as e:
+                logger.error(f"Email outbox purge failed: {e}")
+            await asyncio.sleep(self.purge_seconds)
+
+    async def run_once(self) -> int:
+        """Claim, deliver and record one batch; returns how many emails it held."""
+        async with self.session_factory() as session:
+            batch = await EmailOutboxService.claim(session, self.batch_size, self.lease_seconds)
+            if not batch:
+                return 0
+            outcomes = await self._deliver(batch)
+            sent, failed = [], []
+            now = datetime.now(timezone.utc)
+            for email, outcome in zip(batch, outcomes):
+                if outcome is None:
+                    sent.append(email)
+                    self._latencies.append((now - email.created_at).total_seconds())
+                    continue
+                dead = is_permanent(outcome) or email.attempts >= self.max_attempts
+                failed.append({"id": email.id, "error": str(outcome) or type(outcome).__name__,
+                               "dead": dead, "delay": 0 if dead else self.backoff(email.attempts)})
+                if dead:
+                    logger.error(f"Giving up on {email.email_type} email {email.id} after {email.attempts} attempt(s): {outcome}")
+                else:
+                    logger.warning(f"Will retry {email.email_type} email {email.id}: {outcome}")
+            await EmailOutboxService.record(session, sent, failed)
+        self.sent += len(sent)
+        self.dead_lettered += sum(1 for f in failed if f["dead"])
+        self.retried += sum(1 for f in failed if not f["dead"])
+        return len(batch)
+
+    async def _deliver(self, batch: Sequence[EmailOutbox]) -> List[Optional[Exception]]:
+        """
+        Send ``batch``, one ``send_bulk`` per email type; returns None or the failure for each email.
+
+        If a whole ``send_bulk`` call fails (e.g. one email's values do not fit its template),
+        its emails are sent one at a time, so the others are not held back by it.
+        """
+        email_service = self.email_service()
+        by_type: Dict[str, List[int]] = {}
+        for index, email in enumerate(batch):
+            by_type.setdefault(email.email_type, []).append(index)
+        results = await asyncio.gather(
+            *(email_service.send_bulk(email_type, [batch[index].context for index in indexes]) for email_type, indexes in by_type.items()),
+            return_exceptions=True,
+        )
+        outcomes: List[Optional[Exception]] = [None] * len(batch)
+        for indexes, result in zip(by_type.values(), results):
+            if isinstance(result, Exception):
+                result = await asyncio.gather(
+                    *(email_service.send_user_email(batch[index].context, batch[index].email_type) for index in indexes),
+                    return_exceptions=True,
+                )
+                result = [error if isinstance(error, Exception) else None for error in result]
+            for index, error in zip(indexes, result):
+                outcomes[index] = error
+        return outcomes
+
+    def latency_stats(self) -> Dict[str, float]:
+        """Enqueue-to-delivery latency over recently sent emails, in milliseconds."""
+        return latency_percentiles(self._latencies)
+
+def build_outbox_workers(session_factory) -> Optional[EmailOutboxWorkers]:
+    """Builds the delivery workers from settings; None when this process runs none."""
+    if settings.email_outbox_workers <= 0:
+        return None
+    return EmailOutboxWorkers(
+        session_factory,
+        workers=settings.email_outbox_workers,
+        batch_size=settings.email_outbox_batch_size,
+        poll_seconds=settings.email_outbox_poll_seconds,
+        lease_seconds=settings.email_outbox_lease_seconds,
+        max_attempts=settings.email_outbox_max_attempts,
+        backoff_seconds=settings.email_outbox_backoff_seconds,
+        backoff_max_seconds=settings.email_outbox_backoff_max_seconds,
+        retention_seconds=settings.email_outbox_retention_days * 86400,
+    )
+
+_workers: Optional[EmailOutboxWorkers] = None
+
+def get_outbox_workers() -> Optional[EmailOutboxWorkers]:
+    """Returns the running delivery workers, or None if none were started in this process."""
+    return _workers
+
+async def wake_outbox_workers() -> None:
+    """Have this process's workers deliver emails just committed to the outbox, if it runs any."""
+    if _workers is not None:
+        _workers.wake()
+
+def start_outbox_workers(workers: Optional[EmailOutboxWorkers]) -> None:
+    global _workers
+    if workers is not None:
+        workers.start()
+    _workers = workers
+
+async def stop_outbox_workers() -> None:
+    global _workers
+    if _workers is not None:
+        await _workers.stop()
+    _workers = None
@@ -1,45 +1,90 @@
 # email_service.py
-from builtins import ValueError, dict, str
+from builtins import Exception, ValueError, dict, len, range, str, zip
+import asyncio
+from typing import List, Optional, Sequence
 from settings.config import settings
-from app.utils.smtp_connection import SMTPClient
+from app.utils.smtp_connection import SMTPClient, SMTPConnectionError
 from app.utils.template_manager import TemplateManager
 from app.models.user_model import User
 
+SUBJECTS = {
+    'email_verification': "Verify Your Account",
+    'password_reset': "Password Reset Instructions",
+    'account_locked': "Account Locked Notification"
+}
+
 class EmailService:
     def __init__(self, template_manager: TemplateManager):
         if not settings.smtp_server or not settings.smtp_port or not settings.smtp_username or not settings.smtp_password:
             print("SMTP settings not configured. Email service will not work.")
             self.smtp_client = None
         else:
+            # Every sending process limits itself, so each one takes its share of the account's limit.
+            processes = max(1, settings.smtp_rate_limit_processes)
+            burst = settings.smtp_rate_limit_burst
             self.smtp_client = SMTPClient(
                 server=settings.smtp_server,
                 port=settings.smtp_port,
                 username=settings.smtp_username,
-                password=settings.smtp_password
+                password=settings.smtp_password,
+                pool_size=settings.smtp_pool_size,
+                starttls=settings.smtp_starttls,
+                timeout=settings.smtp_timeout_seconds,
+                health_check_seconds=settings.smtp_health_check_seconds,
+                rate_limit=settings.smtp_rate_limit_per_second / processes,
+                rate_burst=burst / processes if burst is not None else None,
             )
         self.template_manager = template_manager
 
     async def send_user_email(self, user_data: dict, email_type: str):
         if not self.smtp_client:
             return
-        subject_map = {
-            'email_verification': "Verify Your Account",
-            'password_reset': "Password Reset Instructions",
-            'account_locked': "Account Locked Notification"
-        }
-
-        if email_type not in subject_map:
+        if email_type not in SUBJECTS:
             raise ValueError("Invalid email type")
 
-        html_content = self.template_manager.render_template(email_type, **user_data)
-        self.smtp_client.send_email(subject_map[email_type], html_content, user_data['email'])
+        html_content = await self.template_manager.render_template_async(email_type, **user_data)
+        await self.smtp_client.send_email(SUBJECTS[email_type], html_content, user_data['email'])
+
+    async def send_bulk(self, email_type: str, recipients: Sequence[dict]) -> List[Optional[Exception]]:
+        """
+        Send one templated email to many recipients.
+
+        The template is rendered for everyone in one pass (see ``TemplateManager.render_many``)
+        and the messages go out in batches of ``email_bulk_batch_size``, each over one pooled,
+        pipelined SMTP connection, within the SMTP client's rate limit.
+
+        :param recipients: Template values for each recipient, including the ``email`` to send to.
+        :return: For each recipient, None if the server accepted the email, otherwise why not.
+        """
+        if email_type not in SUBJECTS:
+            raise ValueError("Invalid email type")
+        if not self.smtp_client:
+            return [SMTPConnectionError("SMTP is not configured")] * len(recipients)
+        bodies = await self.template_manager.render_many_async(email_type, recipients)
+        messages = [
+            self.smtp_client.build_message(SUBJECTS[email_type], body, recipient['email'])
+            for body, recipient in zip(bodies, recipients)
+        ]
+        size = settings.email_bulk_batch_size
+        batches = await asyncio.gather(*(
+            self.smtp_client.send_messages(messages[start:start + size]) for start in range(0, len(messages), size)
+        ))
+        return [error for batch in batches for error in batch]
 
     async def send_verification_email(self, user: User):
         if not self.smtp_client:
             return
-        verification_url = f"{settings.server_base_url}verify-email/{user.id}/{user.verification_token}"
-        await self.send_user_email({
-            "name": user.first_name,
-            "verification_url": verification_url,
-            "email": user.email
-        }, 'email_verification')
\ No newline at end of file
+        await self.send_user_email(verification_email_data(user), 'email_verification')
+
+    async def close(self):
+        """Close the pooled SMTP connections."""
+        if self.smtp_client:
+            await self.smtp_client.close()
+
+def verification_email_data(user: User) -> dict:
+    """Template values for ``user``'s verification email; the user must have its token loaded."""
+    return {
+        "name": user.first_name,
+        "verification_url": f"{settings.server_base_url}verify-email/{user.id}/{user.verification_token}",
+        "email": user.email
+    }
@@ -1,9 +1,60 @@
 # app/services/jwt_service.py
-from builtins import dict, str
+from builtins import dict, float, int, isinstance, len, str
+from collections import OrderedDict
+import hashlib
+import time
+from typing import Optional, Tuple
 import jwt
 from datetime import datetime, timedelta
 from settings.config import settings
 
+class VerifiedTokenCache:
+    """
+    Bounded LRU of tokens whose signature has already been verified, with their claims.
+
+    Entries are keyed by the SHA-256 digest of the token, so tokens themselves are not kept,
+    and are served until the token's ``exp``; tokens without one are never cached. A token
+    that differs in any byte has another digest and is verified from scratch.
+    """
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[bytes, Tuple[int, dict]]" = OrderedDict()
+
+    @staticmethod
+    def _key(token: str) -> bytes:
+        return hashlib.sha256(token.encode("utf-8")).digest()
+
+    def get(self, token: str) -> Optional[dict]:
+        key = self._key(token)
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, claims = entry
+        if time.time() >= expires_at:
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return claims
+
+    def put(self, token: str, claims: dict) -> None:
+        expires_at = claims.get("exp")
+        if not isinstance(expires_at, (int, float)) or self.max_entries <= 0:
+            return
+        key = self._key(token)
+        self._entries[key] = (expires_at, claims)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+verified_tokens = VerifiedTokenCache(settings.verified_token_cache_size)
+
 def create_access_token(*, data: dict, expires_delta: timedelta = None):
     to_encode = data.copy()
     # Convert role to uppercase before encoding the JWT
@@ -15,8 +66,13 @@ def create_access_token(*, data: dict, expires_delta: timedelta = None):
     return encoded_jwt
 
 def decode_token(token: str):
+    """Verify and decode ``token``; tokens verified before are served from ``verified_tokens``."""
+    claims = verified_tokens.get(token)
+    if claims is not None:
+        return dict(claims)
     try:
         decoded = jwt.decode(token, settings.jwt_secret_key, algorithms=[settings.jwt_algorithm])
-        return decoded
     except jwt.PyJWTError:
         return None
+    verified_tokens.put(token, decoded)
+    return dict(decoded)
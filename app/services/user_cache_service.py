@@ -0,0 +1,193 @@
+from builtins import NotImplementedError, ValueError, dict, float, getattr, int, len, str
+from collections import OrderedDict
+import time
+from typing import Any, Optional, Tuple
+from uuid import UUID
+from sqlalchemy import inspect
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import make_transient_to_detached
+from app.models.user_model import User
+from settings.config import settings
+
+MEMORY = "memory"
+NONE = "none"
+# Stored for lookups that found no user, so repeated misses skip the database until it expires.
+MISSING = "__missing__"
+# Lookup columns the cache serves; each is unique, so a key maps to at most one user.
+CACHED_LOOKUPS = ("id", "email", "nickname")
+
+class UserCacheBackend:
+    """
+    Storage for the user cache.
+
+    Implement this to keep entries outside the process (e.g. in Redis); values are dicts of
+    column values or strings, and an implementation is responsible for encoding them.
+    """
+
+    async def get(self, key: str) -> Any:
+        """Returns the value stored under ``key``, or None if it is absent or expired."""
+        raise NotImplementedError
+
+    async def set(self, key: str, value: Any, ttl: float) -> None:
+        raise NotImplementedError
+
+    async def delete(self, *keys: str) -> None:
+        raise NotImplementedError
+
+    async def clear(self) -> None:
+        raise NotImplementedError
+
+class MemoryCacheBackend(UserCacheBackend):
+    """In-process LRU holding at most ``max_entries`` entries, each with its own expiry."""
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+
+    async def get(self, key: str) -> Any:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if time.monotonic() >= expires_at:
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    async def set(self, key: str, value: Any, ttl: float) -> None:
+        self._entries[key] = (time.monotonic() + ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    async def delete(self, *keys: str) -> None:
+        for key in keys:
+            self._entries.pop(key, None)
+
+    async def clear(self) -> None:
+        self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+class UserCache:
+    """
+    Read-through cache of users by id, email or nickname.
+
+    Users are stored once, by id, as a snapshot of their loaded columns; deferred secrets such
+    as ``hashed_password`` are never cached. Email and nickname entries only point at the id and
+    are checked against the snapshot, so a stale pointer is a miss rather than a wrong user.
+    Lookups that find nothing are cached for ``negative_ttl_seconds``.
+    """
+
+    def __init__(self, backend: UserCacheBackend, ttl_seconds: float, negative_ttl_seconds: float):
+        self.backend = backend
+        self.ttl_seconds = ttl_seconds
+        self.negative_ttl_seconds = negative_ttl_seconds
+        self.hits = 0
+        self.negative_hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    @staticmethod
+    def _key(column: str, value) -> str:
+        return f"user:{column}:{value}"
+
+    async def get(self, session: AsyncSession, column: str, value) -> Tuple[bool, Optional[User]]:
+        """
+        Look a user up in the cache.
+
+        :return: ``(True, user)`` on a hit, ``(True, None)`` on a cached miss and ``(False, None)``
+            when the database has to be asked. Hits are merged into ``session`` without SQL.
+        """
+        if column not in CACHED_LOOKUPS:
+            raise ValueError(f"Users are not cached by {column}")
+        entry = await self.backend.get(self._key(column, value))
+        if entry == MISSING:
+            self.negative_hits += 1
+            return True, None
+        if entry is not None and column != "id":
+            entry = await self.backend.get(self._key("id", entry))
+            if entry == MISSING or entry is not None and str(entry[column]) != str(value):
+                entry = None
+        if entry is None:
+            self.misses += 1
+            return False, None
+        self.hits += 1
+        return True, await self._restore(session, entry)
+
+    async def put(self, column: str, value, user: Optional[User]) -> None:
+        """Cache the result of looking a user up by ``column``; None caches the miss."""
+        if user is None:
+            await self.backend.set(self._key(column, value), MISSING, self.negative_ttl_seconds)
+            return
+        await self.backend.set(self._key("id", user.id), self._snapshot(user), self.ttl_seconds)
+        if column != "id":
+            await self.backend.set(self._key(column, value), str(user.id), self.ttl_seconds)
+
+    async def invalidate(self, user_id: Optional[UUID] = None, email: Optional[str] = None, nickname: Optional[str] = None) -> None:
+        """
+        Drop what is cached for a user after a write.
+
+        Pass the email and nickname a write may have given a user (e.g. on signup) so cached
+        misses for them are dropped too.
+        """
+        keys = [self._key(column, value) for column, value in (("id", user_id), ("email", email), ("nickname", nickname)) if value is not None]
+        if keys:
+            self.invalidations += 1
+            await self.backend.delete(*keys)
+
+    async def clear(self) -> None:
+        await self.backend.clear()
+
+    def stats(self) -> dict:
+        """Hit, miss and invalidation counters since the cache was created."""
+        lookups = self.hits + self.negative_hits + self.misses
+        return {
+            "hits": self.hits,
+            "negative_hits": self.negative_hits,
+            "misses": self.misses,
+            "invalidations": self.invalidations,
+            "hit_ratio": (self.hits + self.negative_hits) / lookups if lookups else 0.0,
+        }
+
+    @staticmethod
+    def _snapshot(user: User) -> dict:
+        unloaded = inspect(user).unloaded
+        return {column.key: getattr(user, column.key) for column in User.__table__.columns if column.key not in unloaded}
+
+    @staticmethod
+    async def _restore(session: AsyncSession, snapshot: dict) -> User:
+        user = User(**snapshot)
+        make_transient_to_detached(user)
+        return await session.merge(user, load=False)
+
+def build_user_cache(backend: str) -> Optional[UserCache]:
+    """Builds the user cache named by ``backend`` from settings; None when caching is off."""
+    if backend == NONE:
+        return None
+    if backend != MEMORY:
+        raise ValueError(f"Unknown user cache backend: {backend}")
+    return UserCache(
+        MemoryCacheBackend(settings.user_cache_max_entries),
+        settings.user_cache_ttl_seconds,
+        settings.user_cache_negative_ttl_seconds,
+    )
+
+_cache = None
+_configured = False
+
+def get_user_cache() -> Optional[UserCache]:
+    """Returns the user cache, creating it from settings on first use; None when caching is off."""
+    global _cache, _configured
+    if not _configured:
+        _cache = build_user_cache(settings.user_cache_backend)
+        _configured = True
+    return _cache
+
+def set_user_cache(cache: Optional[UserCache]) -> None:
+    """Replaces the user cache, e.g. with one on an external backend; None turns caching off."""
+    global _cache, _configured
+    _cache = cache
+    _configured = True
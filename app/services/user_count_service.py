@@ -0,0 +1,103 @@
+from builtins import ValueError, float, int, str
+import time
+from typing import Optional
+from sqlalchemy import func, select, text
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.models.user_model import User
+from settings.config import settings
+import logging
+
+logger = logging.getLogger(__name__)
+
+EXACT = "exact"
+CACHED = "cached"
+ESTIMATED = "estimated"
+
+class ExactUserCount:
+    """Counts users with ``SELECT count(*)``; always correct, cost grows with the table."""
+
+    async def count(self, session: AsyncSession) -> int:
+        result = await session.execute(select(func.count()).select_from(User))
+        return result.scalar()
+
+    def invalidate(self) -> None:
+        pass
+
+class CachedUserCount:
+    """
+    Serves an exact count from memory for up to ``ttl_seconds``.
+
+    The cache is dropped whenever this process creates or deletes a user, so a worker always
+    sees its own writes; writes made by other workers show up once the TTL expires.
+    """
+
+    def __init__(self, ttl_seconds: float, source: Optional[ExactUserCount] = None):
+        self.ttl_seconds = ttl_seconds
+        self.source = source or ExactUserCount()
+        self._value: Optional[int] = None
+        self._expires_at = 0.0
+
+    async def count(self, session: AsyncSession) -> int:
+        now = time.monotonic()
+        if self._value is None or now >= self._expires_at:
+            self._value = await self.source.count(session)
+            self._expires_at = now + self.ttl_seconds
+        return self._value
+
+    def invalidate(self) -> None:
+        self._value = None
+
+class EstimatedUserCount:
+    """
+    Reads the row estimate PostgreSQL's planner keeps in ``pg_class.reltuples``.
+
+    The estimate is refreshed by VACUUM/ANALYZE (including autovacuum), so it costs a single
+    catalog lookup regardless of table size. Below ``exact_threshold`` rows, or if the table
+    has never been analysed, the exact count is cheap enough and used instead.
+    """
+
+    def __init__(self, exact_threshold: int, source: Optional[ExactUserCount] = None):
+        self.exact_threshold = exact_threshold
+        self.source = source or ExactUserCount()
+
+    async def count(self, session: AsyncSession) -> int:
+        result = await session.execute(
+            text("SELECT reltuples::bigint FROM pg_class WHERE oid = CAST(:table AS regclass)"),
+            {"table": User.__tablename__},
+        )
+        estimate = result.scalar()
+        if estimate is None or estimate < self.exact_threshold:
+            return await self.source.count(session)
+        return estimate
+
+    def invalidate(self) -> None:
+        pass
+
+def build_user_count_strategy(strategy: str):
+    """Builds the counting strategy named by ``strategy`` from settings."""
+    if strategy == CACHED:
+        return CachedUserCount(settings.user_count_cache_ttl_seconds)
+    if strategy == ESTIMATED:
+        return EstimatedUserCount(settings.user_count_estimate_threshold)
+    if strategy != EXACT:
+        raise ValueError(f"Unknown user count strategy: {strategy}")
+    return ExactUserCount()
+
+_strategy = None
+
+def get_user_count_strategy():
+    """Returns the counting strategy used for user listing totals, creating it on first use."""
+    global _strategy
+    if _strategy is None:
+        _strategy = build_user_count_strategy(settings.user_count_strategy)
+    return _strategy
+
+def set_user_count_strategy(strategy) -> None:
+    """Replaces the counting strategy used for user listing totals."""
+    global _strategy
+    _strategy = strategy
+
+def invalidate_user_count() -> None:
+    """Drops any cached user count; called after users are created or deleted."""
+    if _strategy is not None:
+        _strategy.invalidate()
@@ -1,45 +1,143 @@
-from builtins import Exception, bool, classmethod, int, str
+from builtins import Exception, ValueError, bool, chr, classmethod, dict, getattr, int, isinstance, len, list, ord, range, set, str, tuple, zip
+import asyncio
+from functools import partial
 from datetime import datetime, timezone
 import secrets
-from typing import Optional, Dict, List
+from typing import Optional, Dict, List, Sequence, Tuple
 from pydantic import ValidationError
-from sqlalchemy import func, null, update, select
-from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy import case, exists, func, literal, literal_column, null, or_, tuple_, union, update, select
+from sqlalchemy.dialects.postgresql import array, insert as pg_insert
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import load_only, undefer
+from app.database import REPLICA, commit, has_pending_writes
 from app.dependencies import get_email_service, get_settings
-from app.models.user_model import User
-from app.schemas.user_schemas import UserCreate, UserUpdate
-from app.utils.nickname_gen import generate_nickname
-from app.utils.security import generate_verification_token, hash_password, verify_password
+from app.models.user_model import SEARCH_DOCUMENT_SQL, User
+from app.schemas.user_schemas import UserCreate, UserListFilters, UserUpdate
+from app.utils.cursor import NEXT, PREV, Cursor
+from app.utils.nickname_gen import generate_nickname_candidates
+from app.utils.security import generate_verification_token, hash_password_async, password_needs_rehash, verify_password_async
 from uuid import UUID
-from app.services.email_service import EmailService
+from app.services.email_outbox_service import EmailOutboxService, wake_outbox_workers
+from app.services.change_notification_service import CREATED, DELETED, UPDATED, get_change_bus
+from app.services.user_cache_service import get_user_cache
+from app.services.user_count_service import invalidate_user_count
 from app.models.user_model import UserRole
 import logging
 
 settings = get_settings()
 logger = logging.getLogger(__name__)
 
+# Upper bound on nickname retries for one signup; each retry is one more INSERT attempt.
+MAX_NICKNAME_ATTEMPTS = 10
+# Nickname candidates checked inside each INSERT; a retry is only needed if all are taken.
+NICKNAME_BATCH_SIZE = 8
+# pg_advisory_xact_lock key that serialises first-user (ADMIN) registration.
+BOOTSTRAP_LOCK_KEY = 0x75736572
+# Whitelisted listing sorts and the unique key columns each one orders by.
+SORT_KEYS = {
+    "created_at": (User.created_at, User.id),
+    "email": (User.email,),
+    "nickname": (User.nickname,),
+}
+DEFAULT_SORT = "created_at"
+
+
+class NicknamesExhaustedError(Exception):
+    """Raised when every nickname tried for a signup was taken; the signup can be retried."""
+
+
 class UserService:
+    # Strong references to fire-and-forget tasks so they are not garbage collected mid-flight.
+    _background_tasks: set = set()
+    # True once at least one user is known to exist; the first-admin check is skipped from then on.
+    _bootstrapped: bool = False
+
     @classmethod
-    async def _execute_query(cls, session: AsyncSession, query):
-        try:
-            result = await session.execute(query)
-            await session.commit()
-            return result
-        except SQLAlchemyError as e:
-            logger.error(f"Database error: {e}")
-            await session.rollback()
-            return None
+    def _select_users(cls, fields: Optional[Sequence[str]] = None, extra: Sequence[str] = ()):
+        """
+        ``SELECT`` users, restricted to the columns in ``fields`` when given.
+
+        The primary key, ``updated_at`` (the version ETags are derived from) and any ``extra``
+        columns (e.g. sort keys a cursor is built from) are always loaded. Deferred columns such
+        as ``hashed_password`` stay unloaded either way.
+
+        :raises ValueError: If a field is not a column of ``User``.
+        """
+        query = select(User)
+        if fields is None:
+            return query
+        names = dict.fromkeys(["id", "updated_at", *fields, *extra])
+        columns = User.__table__.columns
+        unknown = [name for name in names if name not in columns]
+        if unknown:
+            raise ValueError(f"Unknown user fields: {', '.join(unknown)}")
+        return query.options(load_only(*(getattr(User, name) for name in names)))
 
     @classmethod
-    async def _fetch_user(cls, session: AsyncSession, **filters) -> Optional[User]:
-        query = select(User).filter_by(**filters)
-        result = await cls._execute_query(session, query)
-        return result.scalars().first() if result else None
+    async def _fetch_user(cls, session: AsyncSession, fields: Optional[Sequence[str]] = None, options: Sequence = (), **filters) -> Optional[User]:
+        """
+        Fetch one user matching ``filters``.
+
+        Full-row lookups by a single unique key go through the user cache; restricted ``fields``
+        or loader ``options`` (e.g. undeferring a secret) always read from the database, as does
+        a session with uncommitted writes. Rows read from a replica are served but not cached.
+        """
+        cache = get_user_cache()
+        # Uncommitted writes must be read back from the transaction, and never cached.
+        cacheable = (cache is not None and fields is None and not options and len(filters) == 1
+                     and not has_pending_writes(session))
+        if cacheable:
+            (column, value), = filters.items()
+            found, user = await cache.get(session, column, value)
+            if found:
+                return user
+        query = cls._select_users(fields).options(*options).filter_by(**filters)
+        if cacheable:
+            # What gets cached must be the row as read, not an older copy already in the session.
+            query = query.execution_options(populate_existing=True)
+        result = await session.execute(query)
+        user = result.scalars().first()
+        # A lagging replica could still return a row the cache was just invalidated for.
+        if cacheable and not session.info.get(REPLICA):
+            await cache.put(column, value, user)
+        return user
+
+    @classmethod
+    async def _changed(cls, kind: str, user_id: UUID, email: Optional[str] = None, nickname: Optional[str] = None) -> None:
+        """
+        Drop cached lookups of a user after a committed write, here and, through the change
+        bus, in every other worker.
+
+        :param kind: ``CREATED``, ``UPDATED`` or ``DELETED``.
+        :param email: An email the write gave or took from the user, so lookups by it are dropped too.
+        :param nickname: Likewise for a nickname.
+        """
+        cache = get_user_cache()
+        if cache is not None:
+            await cache.invalidate(user_id, email, nickname)
+        bus = get_change_bus()
+        if bus is not None:
+            await bus.publish(kind, user_id, email, nickname)
 
     @classmethod
-    async def get_by_id(cls, session: AsyncSession, user_id: UUID) -> Optional[User]:
-        return await cls._fetch_user(session, id=user_id)
+    async def get_by_id(cls, session: AsyncSession, user_id: UUID, fields: Optional[Sequence[str]] = None) -> Optional[User]:
+        return await cls._fetch_user(session, fields, id=user_id)
+
+    @classmethod
+    async def get_version(cls, session: AsyncSession, user_id: UUID, for_update: bool = False) -> Optional[datetime]:
+        """
+        Read only a user's ``updated_at``, e.g. to evaluate a conditional request without loading the row.
+
+        With ``for_update`` the row stays locked until the session's transaction ends, so a write
+        in the same transaction applies to the version that was checked.
+
+        :return: The user's ``updated_at``, or None if the user does not exist.
+        """
+        query = select(User.updated_at).where(User.id == user_id)
+        if for_update:
+            query = query.with_for_update()
+        result = await session.execute(query)
+        return result.scalar_one_or_none()
 
     @classmethod
     async def get_by_nickname(cls, session: AsyncSession, nickname: str) -> Optional[User]:
@@ -50,57 +148,166 @@ class UserService:
         return await cls._fetch_user(session, email=email)
 
     @classmethod
-    async def create(cls, session: AsyncSession, user_data: Dict[str, str], email_service: EmailService) -> Optional[User]:
+    async def create(cls, session: AsyncSession, user_data: Dict[str, str]) -> Optional[User]:
+        """
+        Register a new user with a single INSERT ... ON CONFLICT DO NOTHING RETURNING statement.
+
+        The unique indexes on ``email`` and ``nickname`` arbitrate concurrent signups. When no row
+        comes back, one existence check tells a duplicate email (give up) from a nickname collision
+        (retry with a fresh batch of nickname candidates). The first user ever registered becomes ADMIN; see
+        ``_claim_bootstrap`` for how that is decided without counting the table.
+
+        The verification email is queued in the email outbox in the same transaction as the user
+        row, so it goes out only if the signup commits, and SMTP is never on the request path.
+
+        Returns None for invalid data or a duplicate email. Raises ``NicknamesExhaustedError`` if
+        no free nickname turned up in ``MAX_NICKNAME_ATTEMPTS`` tries.
+        """
         try:
             validated_data = UserCreate(**user_data).model_dump()
-            existing_user = await cls.get_by_email(session, validated_data['email'])
-            if existing_user:
+        except ValidationError as e:
+            logger.error(f"Validation error during user creation: {e}")
+            return None
+        validated_data.pop('nickname', None)
+        validated_data.pop('role', None)
+        validated_data['hashed_password'] = await hash_password_async(validated_data.pop('password'))
+
+        is_first_user = await cls._claim_bootstrap(session)
+        if is_first_user:
+            validated_data.update(role=UserRole.ADMIN, email_verified=True)
+        else:
+            validated_data.update(role=UserRole.ANONYMOUS, verification_token=generate_verification_token())
+
+        for _ in range(MAX_NICKNAME_ATTEMPTS):
+            new_user = await cls._insert_user(session, validated_data, generate_nickname_candidates(NICKNAME_BATCH_SIZE))
+            if new_user:
+                break
+            if await cls._email_exists(session, validated_data['email']):
                 logger.error("User with given email already exists.")
                 return None
-            validated_data['hashed_password'] = hash_password(validated_data.pop('password'))
-            new_user = User(**validated_data)
-            new_nickname = generate_nickname()
-            while await cls.get_by_nickname(session, new_nickname):
-                new_nickname = generate_nickname()
-            new_user.nickname = new_nickname
-            logger.info(f"User Role: {new_user.role}")
-            user_count = await cls.count(session)
-            new_user.role = UserRole.ADMIN if user_count == 0 else UserRole.ANONYMOUS            
-            if new_user.role == UserRole.ADMIN:
-                new_user.email_verified = True
+        else:
+            logger.error(f"Could not allocate a unique nickname after {MAX_NICKNAME_ATTEMPTS} attempts.")
+            raise NicknamesExhaustedError(f"No free nickname after {MAX_NICKNAME_ATTEMPTS} attempts")
 
-            else:
-                new_user.verification_token = generate_verification_token()
-                await email_service.send_verification_email(new_user)
+        logger.info(f"User Role: {new_user.role}")
+        if new_user.role != UserRole.ADMIN:
+            EmailOutboxService.enqueue_verification_email(session, new_user)
+        await commit(session, partial(cls._created, new_user))
+        return new_user
 
-            session.add(new_user)
-            await session.commit()
-            return new_user
-        except ValidationError as e:
-            logger.error(f"Validation error during user creation: {e}")
-            return None
+    @classmethod
+    async def _created(cls, user: User) -> None:
+        cls._bootstrapped = True
+        invalidate_user_count()
+        await cls._changed(CREATED, user.id, user.email, user.nickname)
+        await wake_outbox_workers()
+
+    @classmethod
+    async def _claim_bootstrap(cls, session: AsyncSession) -> bool:
+        """
+        Decide whether the user being registered is the first one, and so becomes ADMIN.
+
+        Once any user is known to exist the answer is cached for the life of the process and
+        this returns without touching the database. Until then, a transaction-scoped advisory
+        lock serialises concurrent first signups across all workers, and an EXISTS probe (which
+        stops at the first row, unlike COUNT(*)) runs under it. The lock is held until the
+        signup commits, so a second racing signup sees the first one's row.
+        """
+        if cls._bootstrapped:
+            return False
+        await session.execute(select(func.pg_advisory_xact_lock(BOOTSTRAP_LOCK_KEY)))
+        result = await session.execute(select(exists().select_from(User)))
+        if result.scalar():
+            cls._bootstrapped = True
+            return False
+        return True
+
+    @classmethod
+    def reset_bootstrap_cache(cls) -> None:
+        """Forget the cached bootstrap state, e.g. after the users table has been emptied."""
+        cls._bootstrapped = False
+
+    @classmethod
+    async def _insert_user(cls, session: AsyncSession, values: Dict[str, str], candidates: List[str]) -> Optional[User]:
+        # Pick the first candidate not already taken, using the nickname index, inside the INSERT.
+        # If every candidate is taken, fall back to the first one so the INSERT conflicts and is retried.
+        candidate = func.unnest(array(candidates)).column_valued("candidate")
+        free_candidate = (
+            select(candidate)
+            .where(~exists().where(User.nickname == candidate))
+            .limit(1)
+            .scalar_subquery()
+        )
+        query = (
+            pg_insert(User)
+            .values(**values, nickname=func.coalesce(free_candidate, candidates[0]))
+            .on_conflict_do_nothing()
+            .returning(User)
+            # The verification email needs the token; the password hash is never read back.
+            .options(undefer(User.verification_token))
+        )
+        result = await session.execute(query)
+        return result.scalars().first()
+
+    @classmethod
+    async def _email_exists(cls, session: AsyncSession, email: str) -> bool:
+        result = await session.execute(select(exists().where(User.email == email)))
+        return bool(result.scalar())
 
     @classmethod
     async def update(cls, session: AsyncSession, user_id: UUID, update_data: Dict[str, str]) -> Optional[User]:
+        """
+        Update a user's fields.
+
+        :return: The updated user, or None if the data is invalid or the user does not exist.
+        :raises IntegrityError: If the new email or nickname belongs to another user.
+        """
         try:
-            # validated_data = UserUpdate(**update_data).dict(exclude_unset=True)
             validated_data = UserUpdate(**update_data).model_dump(exclude_unset=True)
-
-            if 'password' in validated_data:
-                validated_data['hashed_password'] = hash_password(validated_data.pop('password'))
-            query = update(User).where(User.id == user_id).values(**validated_data).execution_options(synchronize_session="fetch")
-            await cls._execute_query(session, query)
-            updated_user = await cls.get_by_id(session, user_id)
-            if updated_user:
-                session.refresh(updated_user)  # Explicitly refresh the updated user object
-                logger.info(f"User {user_id} updated successfully.")
-                return updated_user
-            else:
-                logger.error(f"User {user_id} not found after update attempt.")
+        except ValidationError as e:
+            logger.error(f"Validation error during user update: {e}")
             return None
-        except Exception as e:  # Broad exception handling for debugging
-            logger.error(f"Error during user update: {e}")
+
+        if 'password' in validated_data:
+            validated_data['hashed_password'] = await hash_password_async(validated_data.pop('password'))
+        # One round trip: the updated row, including the server-set updated_at, comes back
+        # from the UPDATE, so nothing is read back afterwards.
+        query = update(User).where(User.id == user_id).values(**validated_data).returning(User)
+        result = await session.execute(cls._returning_users(query))
+        updated_user = result.scalars().first()
+        if updated_user is None:
+            logger.error(f"User {user_id} not found for update.")
             return None
+        await commit(session, partial(cls._changed, UPDATED, user_id, validated_data.get('email'), validated_data.get('nickname')))
+        logger.info(f"User {user_id} updated successfully.")
+        return updated_user
+
+    @classmethod
+    def _returning_users(cls, statement):
+        """
+        Load the users a DML ``statement`` returns as the session's copies of them.
+
+        Executed directly, an ORM ``UPDATE ... RETURNING`` hands back users already in the
+        session unchanged and patches them from the statement's Python-side values instead;
+        loaded ``from_statement`` with ``populate_existing``, they hold exactly the returned row.
+        """
+        return select(User).from_statement(statement).execution_options(populate_existing=True)
+
+    @classmethod
+    async def _update_if(cls, session: AsyncSession, user_id: UUID, values: dict, *conditions) -> bool:
+        """
+        Apply ``values`` to a user with a single ``UPDATE ... RETURNING``, if it exists and
+        matches ``conditions``; checking and writing in one statement leaves no window for a
+        concurrent change in between.
+
+        :return: True if the user was updated.
+        """
+        query = update(User).where(User.id == user_id, *conditions).values(**values).returning(User)
+        result = await session.execute(cls._returning_users(query))
+        if result.scalars().first() is None:
+            return False
+        await commit(session, partial(cls._changed, UPDATED, user_id))
+        return True
 
     @classmethod
     async def delete(cls, session: AsyncSession, user_id: UUID) -> bool:
@@ -109,42 +316,197 @@ class UserService:
             logger.info(f"User with ID {user_id} not found.")
             return False
         await session.delete(user)
-        await session.commit()
+        await commit(session, partial(cls._deleted, user))
         return True
 
     @classmethod
-    async def list_users(cls, session: AsyncSession, skip: int = 0, limit: int = 10) -> List[User]:
-        query = select(User).offset(skip).limit(limit)
-        result = await cls._execute_query(session, query)
-        return result.scalars().all() if result else []
+    async def _deleted(cls, user: User) -> None:
+        invalidate_user_count()
+        await cls._changed(DELETED, user.id, user.email, user.nickname)
 
     @classmethod
-    async def register_user(cls, session: AsyncSession, user_data: Dict[str, str], get_email_service) -> Optional[User]:
-        return await cls.create(session, user_data, get_email_service)
+    def _sort_columns(cls, sort: str) -> Tuple[tuple, bool]:
+        """
+        Resolve a whitelisted sort such as ``"created_at"`` or ``"-email"`` to its key columns.
+
+        :return: The columns making up the (unique) sort key and whether the sort is descending.
+        :raises ValueError: If the sort is not whitelisted.
+        """
+        descending = sort.startswith("-")
+        columns = SORT_KEYS.get(sort.lstrip("-"))
+        if columns is None:
+            raise ValueError(f"Unsupported sort: {sort}")
+        return columns, descending
+
+    @classmethod
+    def _apply_filters(cls, query, filters: Optional[UserListFilters]):
+        if filters is None:
+            return query
+        if filters.role is not None:
+            query = query.where(User.role == filters.role)
+        for flag in ("is_locked", "email_verified", "is_professional"):
+            value = getattr(filters, flag)
+            if value is not None:
+                query = query.where(getattr(User, flag) == value)
+        if filters.created_after is not None:
+            query = query.where(User.created_at >= filters.created_after)
+        if filters.created_before is not None:
+            query = query.where(User.created_at < filters.created_before)
+        if filters.last_login_after is not None:
+            query = query.where(User.last_login_at >= filters.last_login_after)
+        if filters.last_login_before is not None:
+            query = query.where(User.last_login_at < filters.last_login_before)
+        return query
+
+    @classmethod
+    def cursor_for(cls, user: User, sort: str, direction: str) -> Cursor:
+        """Build a cursor pointing at ``user`` in a listing sorted by ``sort``."""
+        columns, _ = cls._sort_columns(sort)
+        return Cursor(key=tuple(getattr(user, column.key) for column in columns), direction=direction, sort=sort)
+
+    @classmethod
+    async def list_users(cls, session: AsyncSession, skip: int = 0, limit: int = 10,
+                         filters: Optional[UserListFilters] = None, sort: str = DEFAULT_SORT,
+                         fields: Optional[Sequence[str]] = None) -> List[User]:
+        columns, descending = cls._sort_columns(sort)
+        query = cls._apply_filters(cls._select_users(fields, [column.key for column in columns]), filters)
+        query = query.order_by(*(column.desc() if descending else column for column in columns)).offset(skip).limit(limit)
+        result = await session.execute(query)
+        return result.scalars().all()
+
+    @classmethod
+    async def list_users_by_cursor(cls, session: AsyncSession, limit: int = 10, cursor: Optional[Cursor] = None,
+                                   filters: Optional[UserListFilters] = None, sort: str = DEFAULT_SORT,
+                                   fields: Optional[Sequence[str]] = None) -> Tuple[List[User], bool, bool]:
+        """
+        List users with keyset pagination over the index backing ``sort``.
+
+        Unlike OFFSET, the cost of a page does not grow with its depth, and rows inserted or
+        deleted elsewhere in the table do not shift page boundaries.
+
+        :param session: The AsyncSession instance for database access.
+        :param limit: Maximum number of users to return.
+        :param cursor: Position to read from; None reads the first page.
+        :param filters: Optional filters applied to the listing.
+        :param sort: Whitelisted sort key, optionally prefixed with ``-`` for descending order.
+        :param fields: Columns to load; None loads every non-deferred column.
+        :return: The users in ``sort`` order, whether a next page exists, and whether a previous
+            page exists.
+        :raises ValueError: If the sort is not whitelisted, the cursor was issued for another sort,
+            or a field is unknown.
+        """
+        columns, descending = cls._sort_columns(sort)
+        backwards = cursor is not None and cursor.direction == PREV
+        query = cls._apply_filters(cls._select_users(fields, [column.key for column in columns]), filters)
+        if cursor is not None:
+            if cursor.sort != sort or len(cursor.key) != len(columns):
+                raise ValueError("Cursor does not match the requested sort")
+            sort_key = tuple_(*columns)
+            position = tuple_(*(literal(cls._coerce_key(column, value), column.type) for column, value in zip(columns, cursor.key)))
+            # Rows after the cursor in display order; flipped for descending sorts and for paging back.
+            query = query.where(sort_key < position if backwards != descending else sort_key > position)
+        reverse_scan = backwards != descending
+        query = query.order_by(*(column.desc() if reverse_scan else column for column in columns))
+        # One extra row tells whether another page exists in the direction of travel.
+        result = await session.execute(query.limit(limit + 1))
+        users = list(result.scalars().all())
+        has_more = len(users) > limit
+        users = users[:limit]
+        if backwards:
+            users.reverse()
+            return users, True, has_more
+        return users, has_more, cursor is not None
+
+    @classmethod
+    def _coerce_key(cls, column, value):
+        """
+        Convert a cursor key value from its JSON form back to the column's Python type.
+
+        :raises ValueError: If the value is not of the column's type, e.g. a list where a
+            timestamp belongs, so a tampered cursor is a bad request rather than a database error.
+        """
+        python_type = column.type.python_type
+        if isinstance(value, python_type):
+            return value
+        if not isinstance(value, str):
+            raise ValueError(f"Invalid cursor value for {column.key}")
+        if python_type is datetime:
+            value = datetime.fromisoformat(value)
+            return value if value.tzinfo is not None else value.replace(tzinfo=timezone.utc)
+        if python_type is UUID:
+            return UUID(value)
+        raise ValueError(f"Invalid cursor value for {column.key}")
+
+    @classmethod
+    async def register_user(cls, session: AsyncSession, user_data: Dict[str, str]) -> Optional[User]:
+        return await cls.create(session, user_data)
     
 
     @classmethod
     async def login_user(cls, session: AsyncSession, email: str, password: str) -> Optional[User]:
-        user = await cls.get_by_email(session, email)
+        user = await cls._fetch_user(session, options=[undefer(User.hashed_password)], email=email)
         if user:
             if user.email_verified is False:
                 return None
             if user.is_locked:
                 return None
-            if verify_password(password, user.hashed_password):
+            if await verify_password_async(password, user.hashed_password):
                 user.failed_login_attempts = 0
                 user.last_login_at = datetime.now(timezone.utc)
                 session.add(user)
-                await session.commit()
+                await commit(session, partial(cls._changed, UPDATED, user.id))
+                if password_needs_rehash(user.hashed_password):
+                    cls._spawn(cls.rehash_password(session.bind, user.id, user.hashed_password, password))
                 return user
             else:
                 user.failed_login_attempts += 1
                 if user.failed_login_attempts >= settings.max_login_attempts:
                     user.is_locked = True
                 session.add(user)
-                await session.commit()
+                # Committed now: the request fails after this, which would roll the count back.
+                await commit(session, partial(cls._changed, UPDATED, user.id), now=True)
         return None
 
+    @classmethod
+    def _spawn(cls, coro) -> asyncio.Task:
+        task = asyncio.create_task(coro)
+        cls._background_tasks.add(task)
+        task.add_done_callback(cls._background_tasks.discard)
+        return task
+
+    @classmethod
+    async def rehash_password(cls, bind, user_id: UUID, old_hash: str, password: str) -> bool:
+        """
+        Re-hash a password under the current hash policy after a successful login.
+
+        Runs outside the request on its own session. The update only applies if the stored
+        hash is still ``old_hash``, so a password change that happened in the meantime wins.
+
+        :param bind: The engine or connection to open the background session on.
+        :param user_id: The ID of the user whose hash is upgraded.
+        :param old_hash: The hash the password was just verified against.
+        :param password: The verified plain text password.
+        :return: True if the stored hash was replaced, False otherwise.
+        """
+        try:
+            new_hash = await hash_password_async(password)
+            async with AsyncSession(bind, expire_on_commit=False) as session:
+                query = (
+                    update(User)
+                    .where(User.id == user_id, User.hashed_password == old_hash)
+                    .values(hashed_password=new_hash)
+                )
+                result = await session.execute(query)
+                await session.commit()
+            if result.rowcount:
+                # The write moves updated_at, so cached copies would serve a stale ETag.
+                await cls._changed(UPDATED, user_id)
+                logger.info(f"Rehashed password for user {user_id} under the current policy.")
+            return bool(result.rowcount)
+        except Exception as e:
+            logger.error(f"Failed to rehash password for user {user_id}: {e}")
+            return False
+
     @classmethod
     async def is_account_locked(cls, session: AsyncSession, email: str) -> bool:
         user = await cls.get_by_email(session, email)
@@ -153,106 +515,143 @@ class UserService:
 
     @classmethod
     async def reset_password(cls, session: AsyncSession, user_id: UUID, new_password: str) -> bool:
-        hashed_password = hash_password(new_password)
-        user = await cls.get_by_id(session, user_id)
-        if user:
-            user.hashed_password = hashed_password
-            user.failed_login_attempts = 0  # Resetting failed login attempts
-            user.is_locked = False  # Unlocking the user account, if locked
-            session.add(user)
-            await session.commit()
-            return True
-        return False
+        hashed_password = await hash_password_async(new_password)
+        # Resetting the password also clears failed login attempts and unlocks the account.
+        return await cls._update_if(session, user_id, {"hashed_password": hashed_password, "failed_login_attempts": 0, "is_locked": False})
 
     @classmethod
     async def verify_email_with_token(cls, session: AsyncSession, user_id: UUID, token: str) -> bool:
-        user = await cls.get_by_id(session, user_id)
-        if user and user.verification_token == token:
-            user.email_verified = True
-            user.verification_token = None  # Clear the token once used
-            user.role = UserRole.AUTHENTICATED
-            session.add(user)
-            await session.commit()
-            return True
-        return False
+        # The token is cleared once used, so it verifies at most once.
+        return await cls._update_if(
+            session, user_id, {"email_verified": True, "verification_token": None, "role": UserRole.AUTHENTICATED},
+            User.verification_token == token,
+        )
 
     @classmethod
-    async def count(cls, session: AsyncSession) -> int:
+    async def resend_verification_emails(cls, session: AsyncSession, filters: Optional[UserListFilters] = None,
+                                         batch_size: int = 500) -> int:
+        """
+        Queue the verification email again for every unverified user matching ``filters``.
+
+        Users are read in keyset pages of ``batch_size`` and their emails are queued in the
+        outbox, in ``session``'s transaction; the outbox workers deliver them within the SMTP
+        rate limit, so nothing here waits on the mail server. Unverified users without a
+        verification token (e.g. created before tokens were issued) are given one first.
+
+        :return: How many emails were queued.
+        """
+        filters = (filters or UserListFilters()).model_copy(update={"email_verified": False})
+        queued = 0
+        cursor = None
+        while True:
+            users, has_next, _ = await cls.list_users_by_cursor(
+                session, batch_size, cursor, filters, DEFAULT_SORT, ["email", "first_name", "verification_token"]
+            )
+            tokenless = [user for user in users if not user.verification_token]
+            for user in tokenless:
+                user.verification_token = generate_verification_token()
+            for user in users:
+                EmailOutboxService.enqueue_verification_email(session, user)
+            queued += len(users)
+            await commit(session, *(partial(cls._changed, UPDATED, user.id) for user in tokenless))
+            if not has_next:
+                break
+            cursor = cls.cursor_for(users[-1], DEFAULT_SORT, NEXT)
+        if queued:
+            await commit(session, wake_outbox_workers)
+        return queued
+
+    @classmethod
+    async def count(cls, session: AsyncSession, filters: Optional[UserListFilters] = None) -> int:
         """
         Count the number of users in the database.
 
         :param session: The AsyncSession instance for database access.
+        :param filters: Optional filters; only matching users are counted.
         :return: The count of users.
         """
-        query = select(func.count()).select_from(User)
+        query = cls._apply_filters(select(func.count()).select_from(User), filters)
         result = await session.execute(query)
         count = result.scalar()
         return count
-    
+
     @classmethod
-    async def unlock_user_account(cls, session: AsyncSession, user_id: UUID) -> bool:
-        user = await cls.get_by_id(session, user_id)
-        if user and user.is_locked:
-            user.is_locked = False
-            user.failed_login_attempts = 0  # Optionally reset failed login attempts
-            session.add(user)
-            await session.commit()
-            return True
-        return False
-@classmethod
-async def update_profile(cls, session: AsyncSession, user_id: UUID, update_data: Dict[str, str]) -> Optional[User]:
-    """
-    Update user profile fields, such as name, bio, or location.
-    """
-    try:
-        # Validate and sanitize input using UserUpdate schema
-        validated_data = UserUpdate(**update_data).model_dump(exclude_unset=True)
-        
-        # Execute the update query
+    def _escape_like(cls, term: str) -> str:
+        """Escape LIKE wildcards so user input only ever matches literally."""
+        return term.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+    @classmethod
+    async def search(cls, session: AsyncSession, term: str, limit: int = 10) -> List[User]:
+        """
+        Case-insensitive substring search over nickname, email, first and last name.
+
+        The match runs against ``SEARCH_DOCUMENT_SQL``, which the ``ix_users_search_trgm`` pg_trgm
+        GIN index covers, so the cost depends on the number of candidate rows rather than the
+        table size. Users whose nickname or email starts with the term are listed first.
+
+        :param session: The AsyncSession instance for database access.
+        :param term: Text to look for; at least three characters for the index to be used.
+        :param limit: Maximum number of users to return.
+        :return: Matching users, prefix matches first, then by nickname.
+        """
+        term = term.lower()
+        prefix = cls._escape_like(term) + "%"
         query = (
-            update(User)
-            .where(User.id == user_id)
-            .values(**validated_data)
-            .execution_options(synchronize_session="fetch")
+            select(User)
+            .where(literal_column(SEARCH_DOCUMENT_SQL).like("%" + cls._escape_like(term) + "%", escape="\\"))
+            .order_by(
+                case((or_(func.lower(User.nickname).like(prefix, escape="\\"), func.lower(User.email).like(prefix, escape="\\")), 0), else_=1),
+                User.nickname,
+            )
+            .limit(limit)
         )
-        await cls._execute_query(session, query)
-        
-        # Fetch the updated user
-        updated_user = await cls.get_by_id(session, user_id)
-        if updated_user:
-            logger.info(f"User {user_id} profile updated successfully.")
-            return updated_user
-        else:
-            logger.error(f"Failed to find user {user_id} after update.")
-            return None
-    except ValidationError as e:
-        logger.error(f"Validation error while updating profile: {e}")
-        return None
-    except SQLAlchemyError as e:
-        logger.error(f"Database error during profile update: {e}")
-        return None
+        result = await session.execute(query)
+        return result.scalars().all()
+
+    @classmethod
+    def _prefix_query(cls, column, prefix: str, limit: int):
+        # A range on the C-collated key is an index range scan even as a generic prepared plan,
+        # which a LIKE 'prefix%' bind parameter is not.
+        key = func.lower(column).collate("C")
+        upper = prefix[:-1] + chr(ord(prefix[-1]) + 1)
+        return select(User.id, User.nickname).where(key >= prefix, key < upper).order_by(key).limit(limit)
+
+    @classmethod
+    async def autocomplete(cls, session: AsyncSession, prefix: str, limit: int = 10) -> List[Tuple[UUID, str]]:
+        """
+        Suggest users whose nickname or email starts with ``prefix`` (case-insensitive).
+
+        Each column is read with a capped scan of its prefix index, so at most ``2 * limit``
+        index entries are visited however many users match, and only id and nickname are fetched.
+
+        :param session: The AsyncSession instance for database access.
+        :param prefix: Non-empty prefix typed so far.
+        :param limit: Maximum number of suggestions.
+        :return: ``(id, nickname)`` pairs ordered by nickname.
+        """
+        prefix = prefix.lower()
+        matches = union(
+            cls._prefix_query(User.nickname, prefix, limit),
+            cls._prefix_query(User.email, prefix, limit),
+        ).subquery()
+        query = select(matches.c.id, matches.c.nickname).order_by(matches.c.nickname).limit(limit)
+        result = await session.execute(query)
+        return [tuple(row) for row in result.all()]
     
-@classmethod
-async def upgrade_to_professional_status(cls, session: AsyncSession, user_id: UUID, current_user: dict) -> bool:
-    """
-    Upgrade a user to professional status if the current user is an admin or manager.
-
-    :param session: AsyncSession instance for database access.
-    :param user_id: The ID of the user to upgrade.
-    :param current_user: The current authenticated user performing the action.
-    :return: True if the upgrade was successful, False otherwise.
-    """
-    if current_user["role"] not in ["ADMIN", "MANAGER"]:
-        return False
-
-    user = await cls.get_by_id(session, user_id)
-    if not user:
-        return False
-
-    user.professional_status = True
-    user.professional_status_updated_at = datetime.now(timezone.utc)
-    session.add(user)
-    await session.commit()
-
-    # Optionally send a notification about the upgrade (handled by an external service)
-    return True
\ No newline at end of file
+    @classmethod
+    async def unlock_user_account(cls, session: AsyncSession, user_id: UUID) -> bool:
+        return await cls._update_if(session, user_id, {"is_locked": False, "failed_login_attempts": 0}, User.is_locked)
+
+    @classmethod
+    async def upgrade_to_professional_status(cls, session: AsyncSession, user_id: UUID, current_user: dict) -> bool:
+        """
+        Upgrade a user to professional status if the current user is an admin or manager.
+
+        :param session: AsyncSession instance for database access.
+        :param user_id: The ID of the user to upgrade.
+        :param current_user: The current authenticated user performing the action.
+        :return: True if the upgrade was successful, False otherwise.
+        """
+        if current_user["role"] not in ["ADMIN", "MANAGER"]:
+            return False
+        return await cls._update_if(session, user_id, {"is_professional": True, "professional_status_updated_at": func.now()})
@@ -0,0 +1,61 @@
+from builtins import AttributeError, KeyError, TypeError, UnicodeError, ValueError, isinstance, len, list, str, tuple
+import base64
+import binascii
+from dataclasses import dataclass
+from datetime import datetime
+import json
+from uuid import UUID
+
+NEXT = "next"
+PREV = "prev"
+
+@dataclass(frozen=True)
+class Cursor:
+    """
+    Position in the user listing, keyed on the values of the listing's sort columns.
+
+    Attributes:
+        key (tuple): Sort column values of the row the cursor points at, e.g. ``(created_at, id)``.
+        direction (str): ``"next"`` to read rows after this position, ``"prev"`` to read rows before it.
+        sort (str): Sort the cursor was issued for; a cursor is only valid with the same sort.
+    """
+    key: tuple
+    direction: str = NEXT
+    sort: str = "created_at"
+
+def _encode_value(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, UUID):
+        return str(value)
+    return value
+
+def encode_cursor(cursor: Cursor) -> str:
+    """Encode a cursor as an opaque, URL-safe token."""
+    payload = json.dumps(
+        {"k": [_encode_value(value) for value in cursor.key], "d": cursor.direction, "s": cursor.sort},
+        separators=(",", ":"),
+    )
+    return base64.urlsafe_b64encode(payload.encode("utf-8")).decode("ascii").rstrip("=")
+
+def decode_cursor(token: str) -> Cursor:
+    """
+    Decode a token produced by ``encode_cursor``.
+
+    Key values come back in their JSON form (datetimes and UUIDs as strings); the caller
+    converts them to the types of the sort columns.
+
+    Raises:
+        ValueError: If the token is malformed.
+    """
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        direction = payload.get("d", NEXT)
+        if direction not in (NEXT, PREV):
+            raise ValueError(f"Invalid cursor direction: {direction}")
+        if not isinstance(payload["k"], list) or not payload["k"]:
+            raise ValueError("Invalid cursor key")
+        return Cursor(key=tuple(payload["k"]), direction=direction, sort=str(payload.get("s", "created_at")))
+    except (binascii.Error, UnicodeError, json.JSONDecodeError, KeyError, TypeError, AttributeError) as e:
+        raise ValueError("Invalid cursor") from e
@@ -0,0 +1,48 @@
+from builtins import bool, str
+import hashlib
+from datetime import datetime
+from typing import Iterable
+from uuid import UUID
+
+def _etag(*parts) -> str:
+    digest = hashlib.blake2b(digest_size=16)
+    for part in parts:
+        digest.update(str(part).encode("utf-8"))
+        digest.update(b"\0")
+    return f'"{digest.hexdigest()}"'
+
+def user_etag(user_id: UUID, updated_at: datetime) -> str:
+    """
+    Strong entity tag of a user, derived from its id and ``updated_at``.
+
+    The tag tracks the stored version rather than the bytes of one representation; responses
+    that differ by ``fields`` or ``links`` have different URLs, and caches key on the URL.
+    """
+    return _etag(user_id, updated_at.isoformat() if updated_at else None)
+
+def page_etag(users: Iterable, *state) -> str:
+    """
+    Entity tag of a page of users: the ids and ``updated_at`` of its rows plus ``state``, the
+    other values the page body depends on (total, whether neighbouring pages exist).
+    """
+    return _etag(*state, *(f"{user.id}@{user.updated_at.isoformat() if user.updated_at else None}" for user in users))
+
+def etag_matches(header: str, etag: str, weak: bool = False) -> bool:
+    """
+    Whether ``etag`` matches an ``If-Match`` or ``If-None-Match`` header value.
+
+    ``If-None-Match`` uses weak comparison (``weak=True``), where a ``W/`` prefix is ignored;
+    ``If-Match`` uses strong comparison, where weak tags never match (RFC 9110, 8.8.3.2).
+    """
+    header = header.strip()
+    if header == "*":
+        return True
+    for candidate in header.split(","):
+        candidate = candidate.strip()
+        if candidate.startswith("W/"):
+            if not weak:
+                continue
+            candidate = candidate[2:]
+        if candidate == etag:
+            return True
+    return False
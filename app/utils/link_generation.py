@@ -1,6 +1,6 @@
-from builtins import dict, int, max, str
-from typing import List, Callable
-from urllib.parse import urlencode
+from builtins import dict, getattr, int, max, str
+from typing import List, Callable, Optional, Tuple
+from urllib.parse import parse_qsl, urlencode
 from uuid import UUID
 
 from fastapi import Request
@@ -11,38 +11,97 @@ from app.schemas.pagination_schema import PaginationLink
 def create_link(rel: str, href: str, method: str = "GET", action: str = None) -> Link:
     return Link(rel=rel, href=href, method=method, action=action)
 
-def create_pagination_link(rel: str, base_url: str, params: dict) -> PaginationLink:
+def create_pagination_link(rel: str, base_url: str, params: dict, extra_params: Optional[List[Tuple[str, str]]] = None) -> PaginationLink:
     # Ensure parameters are added in a specific order
-    query_string = f"skip={params['skip']}&limit={params['limit']}"
+    if 'cursor' in params:
+        query_string = urlencode({'cursor': params['cursor'], 'limit': params['limit']})
+    else:
+        query_string = f"skip={params['skip']}&limit={params['limit']}"
+    if extra_params:
+        query_string = f"{query_string}&{urlencode(extra_params)}"
     return PaginationLink(rel=rel, href=f"{base_url}?{query_string}")
 
+# (rel, route name, action) of the links attached to every user.
+USER_LINK_ACTIONS = [
+    ("self", "get_user", "view"),
+    ("update", "update_user", "update"),
+    ("delete", "delete_user", "delete"),
+]
+
+class UserLinkTemplates:
+    """
+    URL templates for the user action links, resolved against the router once.
+
+    ``request.url_for`` walks every route on each call; here the routes are looked up when the
+    templates are built and a user's hrefs are then plain string concatenation.
+    """
+
+    def __init__(self, router):
+        self.templates = []
+        for rel, route_name, action in USER_LINK_ACTIONS:
+            prefix, _, suffix = router.url_path_for(route_name, user_id="{user_id}").partition("{user_id}")
+            self.templates.append((rel, prefix, suffix, action))
+
+    def payloads(self, user_id: UUID, base_url: str) -> List[dict]:
+        """Links for ``user_id`` as JSON-ready dicts; ``base_url`` has no trailing slash."""
+        user_id = str(user_id)
+        return [
+            {"rel": rel, "href": f"{base_url}{prefix}{user_id}{suffix}", "action": action, "type": "application/json"}
+            for rel, prefix, suffix, action in self.templates
+        ]
+
+def get_user_link_templates(request: Request) -> UserLinkTemplates:
+    """Returns the app's link templates, building them on first use if startup has not."""
+    templates = getattr(request.app.state, "user_link_templates", None)
+    if templates is None:
+        templates = request.app.state.user_link_templates = UserLinkTemplates(request.app.router)
+    return templates
+
+def user_link_builder(request: Request) -> Callable[[UUID], List[dict]]:
+    """Returns a function producing the link dicts of a user for this request's base URL."""
+    templates = get_user_link_templates(request)
+    base_url = str(request.base_url).rstrip("/")
+    return lambda user_id: templates.payloads(user_id, base_url)
+
 def create_user_links(user_id: UUID, request: Request) -> List[Link]:
     """
     Generate navigation links for user actions.
     """
-    actions = [
-        ("self", "get_user", "GET", "view"),
-        ("update", "update_user", "PUT", "update"),
-        ("delete", "delete_user", "DELETE", "delete")
-    ]
-    return [
-        create_link(rel, str(request.url_for(action, user_id=str(user_id))), method, action_desc)
-        for rel, action, method, action_desc in actions
-    ]
+    return [Link(**payload) for payload in user_link_builder(request)(user_id)]
 
-def generate_pagination_links(request: Request, skip: int, limit: int, total_items: int) -> List[PaginationLink]:
-    base_url = str(request.url)
-    total_pages = (total_items + limit - 1) // limit
+def generate_pagination_links(request: Request, skip: int, limit: int, total_items: Optional[int],
+                              next_cursor: Optional[str] = None, prev_cursor: Optional[str] = None,
+                              cursor: Optional[str] = None, has_next: Optional[bool] = None) -> List[PaginationLink]:
+    """
+    Generate self/first/last/next/prev links for a page of results.
+
+    Offset links (``skip``/``limit``) are produced by default. When ``next_cursor`` or
+    ``prev_cursor`` is given, the corresponding link carries the opaque cursor instead, and
+    ``cursor`` (the cursor of the current page) is used for the self link. When ``total_items``
+    is None (the total was not counted), no "last" link is produced. ``has_next``, when known
+    from the page itself, decides the offset "next" link; otherwise it is worked out from
+    ``total_items``, which an estimated or cached count can get wrong.
+    """
+    base_url, _, query = str(request.url).partition('?')
+    # Carry filters, sort and other options over to every link; only the position changes.
+    extra = [(key, value) for key, value in parse_qsl(query, keep_blank_values=True) if key not in ('skip', 'limit', 'cursor')]
+    self_params = {'cursor': cursor, 'limit': limit} if cursor else {'skip': skip, 'limit': limit}
     links = [
-        create_pagination_link("self", base_url, {'skip': skip, 'limit': limit}),
-        create_pagination_link("first", base_url, {'skip': 0, 'limit': limit}),
-        create_pagination_link("last", base_url, {'skip': max(0, (total_pages - 1) * limit), 'limit': limit})
+        create_pagination_link("self", base_url, self_params, extra),
+        create_pagination_link("first", base_url, {'skip': 0, 'limit': limit}, extra),
     ]
+    if total_items is not None:
+        total_pages = (total_items + limit - 1) // limit
+        links.append(create_pagination_link("last", base_url, {'skip': max(0, (total_pages - 1) * limit), 'limit': limit}, extra))
 
-    if skip + limit < total_items:
-        links.append(create_pagination_link("next", base_url, {'skip': skip + limit, 'limit': limit}))
+    if next_cursor:
+        links.append(create_pagination_link("next", base_url, {'cursor': next_cursor, 'limit': limit}, extra))
+    elif cursor is None and (has_next if has_next is not None else total_items is not None and skip + limit < total_items):
+        links.append(create_pagination_link("next", base_url, {'skip': skip + limit, 'limit': limit}, extra))
 
-    if skip > 0:
-        links.append(create_pagination_link("prev", base_url, {'skip': max(skip - limit, 0), 'limit': limit}))
+    if prev_cursor:
+        links.append(create_pagination_link("prev", base_url, {'cursor': prev_cursor, 'limit': limit}, extra))
+    elif cursor is None and skip > 0:
+        links.append(create_pagination_link("prev", base_url, {'skip': max(skip - limit, 0), 'limit': limit}, extra))
 
     return links
@@ -1,10 +1,57 @@
-from builtins import str
+from builtins import int, len, list, set, str
 import random
 
+ADJECTIVES = (
+    "able", "agile", "amber", "ample", "arctic", "azure", "bold", "brave", "breezy", "bright",
+    "brisk", "calm", "candid", "cheery", "chill", "civic", "clever", "cosmic", "crafty", "crisp",
+    "curious", "daring", "dapper", "dawn", "deft", "eager", "early", "earnest", "easy", "epic",
+    "fair", "fancy", "fearless", "fiery", "fluent", "frank", "fresh", "frosty", "gentle", "giddy",
+    "glad", "golden", "grand", "happy", "hardy", "hazel", "hearty", "honest", "humble", "icy",
+    "ideal", "jade", "jolly", "jovial", "keen", "kind", "lively", "lucky", "lunar", "merry",
+    "mellow", "mighty", "misty", "modest", "nifty", "nimble", "noble", "novel", "olive", "open",
+    "patient", "peppy", "plucky", "polite", "proud", "quick", "quiet", "rapid", "ready", "regal",
+    "rosy", "rustic", "sage", "savvy", "serene", "sharp", "shiny", "silent", "sly", "smart",
+    "snowy", "solar", "spry", "steady", "stellar", "sunny", "swift", "tidy", "vivid", "witty",
+)
+
+ANIMALS = (
+    "albatross", "alpaca", "antelope", "badger", "beaver", "bison", "bobcat", "buffalo", "camel", "caribou",
+    "cheetah", "chipmunk", "cobra", "condor", "cougar", "coyote", "crane", "crow", "dingo", "dolphin",
+    "donkey", "dove", "eagle", "eel", "egret", "elk", "emu", "falcon", "ferret", "finch",
+    "flamingo", "fox", "gazelle", "gecko", "gibbon", "giraffe", "gopher", "gorilla", "grouse", "gull",
+    "hamster", "hare", "hawk", "hedgehog", "heron", "hippo", "hornet", "husky", "ibex", "iguana",
+    "impala", "jackal", "jaguar", "kestrel", "kiwi", "koala", "lemur", "leopard", "lion", "llama",
+    "lynx", "macaw", "magpie", "manatee", "marmot", "meerkat", "mink", "mole", "moose", "narwhal",
+    "newt", "ocelot", "octopus", "orca", "osprey", "otter", "owl", "panda", "panther", "parrot",
+    "pelican", "penguin", "puffin", "puma", "quail", "rabbit", "raccoon", "raven", "robin", "seal",
+    "shark", "sparrow", "squid", "stork", "swan", "tapir", "tiger", "toucan", "walrus", "wombat",
+)
+
+# Numeric suffixes are drawn from [0, NUMBER_RANGE).
+NUMBER_RANGE = 10000
+
+# Size of the nickname space: 100 adjectives x 100 animals x 10,000 numbers = 100 million names.
+NICKNAME_SPACE = len(ADJECTIVES) * len(ANIMALS) * NUMBER_RANGE
+
+_random = random.SystemRandom()
 
 def generate_nickname() -> str:
     """Generate a URL-safe nickname using adjectives and animal names."""
-    adjectives = ["clever", "jolly", "brave", "sly", "gentle"]
-    animals = ["panda", "fox", "raccoon", "koala", "lion"]
-    number = random.randint(0, 999)
-    return f"{random.choice(adjectives)}_{random.choice(animals)}_{number}"
+    number = _random.randrange(NUMBER_RANGE)
+    return f"{_random.choice(ADJECTIVES)}_{_random.choice(ANIMALS)}_{number}"
+
+def generate_nickname_candidates(count: int) -> list:
+    """
+    Generate ``count`` distinct nickname candidates.
+
+    Candidates are checked against the database in one statement, so a signup only needs
+    another attempt if every candidate in the batch is already taken.
+    """
+    candidates = []
+    seen = set()
+    while len(candidates) < count:
+        nickname = generate_nickname()
+        if nickname not in seen:
+            seen.add(nickname)
+            candidates.append(nickname)
+    return candidates
@@ -0,0 +1,157 @@
+# app/utils/password_policy.py
+from builtins import bool, float, int, max, min, str
+from dataclasses import dataclass, replace
+import re
+import time
+from typing import Optional
+import bcrypt
+from argon2 import PasswordHasher
+from argon2.exceptions import InvalidHashError, VerificationError, VerifyMismatchError
+from logging import getLogger
+
+logger = getLogger(__name__)
+
+BCRYPT = "bcrypt"
+ARGON2ID = "argon2id"
+SUPPORTED_ALGORITHMS = (BCRYPT, ARGON2ID)
+
+# Calibration never goes below these floors, however fast the measured hardware is.
+MIN_BCRYPT_ROUNDS = 10
+MAX_BCRYPT_ROUNDS = 16
+MIN_ARGON2_TIME_COST = 1
+MAX_ARGON2_TIME_COST = 10
+
+_BCRYPT_HASH_RE = re.compile(r"^\$2[abxy]?\$(\d{2})\$")
+
+@dataclass(frozen=True)
+class PasswordHashPolicy:
+    """
+    Describes how new password hashes are produced.
+
+    Every hash it produces is self-describing (modular crypt format), so the algorithm and
+    its cost parameters can always be read back from the stored value. That is what lets
+    ``needs_rehash`` detect hashes created under an older policy.
+
+    Attributes:
+        algorithm (str): Either ``"bcrypt"`` or ``"argon2id"``.
+        bcrypt_rounds (int): bcrypt cost factor (log2 of the iteration count).
+        argon2_time_cost (int): argon2id number of passes over memory.
+        argon2_memory_cost (int): argon2id memory usage in KiB.
+        argon2_parallelism (int): argon2id number of lanes.
+    """
+    algorithm: str = BCRYPT
+    bcrypt_rounds: int = 12
+    argon2_time_cost: int = 3
+    argon2_memory_cost: int = 65536
+    argon2_parallelism: int = 4
+
+    def __post_init__(self):
+        if self.algorithm not in SUPPORTED_ALGORITHMS:
+            raise ValueError(f"Unsupported password hash algorithm: {self.algorithm}")
+
+    def _argon2_hasher(self) -> PasswordHasher:
+        return PasswordHasher(
+            time_cost=self.argon2_time_cost,
+            memory_cost=self.argon2_memory_cost,
+            parallelism=self.argon2_parallelism,
+        )
+
+    def hash(self, password: str) -> str:
+        """Hashes a password with this policy's algorithm and parameters."""
+        if self.algorithm == ARGON2ID:
+            return self._argon2_hasher().hash(password)
+        salt = bcrypt.gensalt(rounds=self.bcrypt_rounds)
+        return bcrypt.hashpw(password.encode('utf-8'), salt).decode('utf-8')
+
+    def verify(self, password: str, hashed_password: str) -> bool:
+        """
+        Verifies a password against a stored hash of any supported algorithm.
+
+        Raises:
+            ValueError: If the stored hash is not in a recognised format.
+        """
+        if hashed_password.startswith("$argon2"):
+            try:
+                return self._argon2_hasher().verify(hashed_password, password)
+            except VerifyMismatchError:
+                return False
+            except (InvalidHashError, VerificationError) as e:
+                raise ValueError("Invalid argon2 hash") from e
+        return bcrypt.checkpw(password.encode('utf-8'), hashed_password.encode('utf-8'))
+
+    def needs_rehash(self, hashed_password: str) -> bool:
+        """Returns True if the stored hash was produced with a different algorithm or parameters."""
+        if self.algorithm == ARGON2ID:
+            if not hashed_password.startswith("$argon2id$"):
+                return True
+            try:
+                return self._argon2_hasher().check_needs_rehash(hashed_password)
+            except InvalidHashError:
+                return True
+        match = _BCRYPT_HASH_RE.match(hashed_password)
+        return match is None or int(match.group(1)) != self.bcrypt_rounds
+
+    def calibrate(self, target_ms: float) -> "PasswordHashPolicy":
+        """
+        Returns a copy of this policy with its cost tuned to the current hardware.
+
+        The cost is the largest value whose measured hash time stays within ``target_ms``,
+        clamped to the module's minimum and maximum so a slow host cannot weaken hashes
+        below the floor and a fast one cannot make logins arbitrarily expensive.
+        """
+        if self.algorithm == ARGON2ID:
+            base = replace(self, argon2_time_cost=MIN_ARGON2_TIME_COST)
+            elapsed_ms = _time_hash(base)
+            time_cost = int(target_ms // elapsed_ms) if elapsed_ms > 0 else MAX_ARGON2_TIME_COST
+            time_cost = max(MIN_ARGON2_TIME_COST, min(MAX_ARGON2_TIME_COST, time_cost))
+            calibrated = replace(self, argon2_time_cost=time_cost)
+        else:
+            base = replace(self, bcrypt_rounds=MIN_BCRYPT_ROUNDS)
+            elapsed_ms = _time_hash(base)
+            rounds = MIN_BCRYPT_ROUNDS
+            # Each extra bcrypt round doubles the work.
+            while rounds < MAX_BCRYPT_ROUNDS and elapsed_ms * 2 ** (rounds + 1 - MIN_BCRYPT_ROUNDS) <= target_ms:
+                rounds += 1
+            calibrated = replace(self, bcrypt_rounds=rounds)
+        logger.info("Calibrated password hash policy to %s for a %.0f ms budget", calibrated, target_ms)
+        return calibrated
+
+def _time_hash(policy: PasswordHashPolicy, samples: int = 3) -> float:
+    """Returns the fastest of ``samples`` hash timings in milliseconds."""
+    best = None
+    for _ in range(samples):
+        started = time.perf_counter()
+        policy.hash("calibration-password")
+        elapsed = (time.perf_counter() - started) * 1000
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+_current_policy = PasswordHashPolicy()
+
+def get_password_policy() -> PasswordHashPolicy:
+    """Returns the policy used for newly created password hashes."""
+    return _current_policy
+
+def set_password_policy(policy: PasswordHashPolicy) -> None:
+    """Replaces the policy used for newly created password hashes."""
+    global _current_policy
+    _current_policy = policy
+
+def configure_password_policy(settings, calibrate: Optional[bool] = None) -> PasswordHashPolicy:
+    """
+    Builds the policy from settings, calibrating it when a latency budget is configured,
+    and installs it as the current policy.
+    """
+    policy = PasswordHashPolicy(
+        algorithm=settings.password_hash_algorithm,
+        bcrypt_rounds=settings.password_bcrypt_rounds,
+        argon2_time_cost=settings.password_argon2_time_cost,
+        argon2_memory_cost=settings.password_argon2_memory_cost,
+        argon2_parallelism=settings.password_argon2_parallelism,
+    )
+    if calibrate is None:
+        calibrate = settings.password_hash_target_ms > 0
+    if calibrate:
+        policy = policy.calibrate(settings.password_hash_target_ms)
+    set_password_policy(policy)
+    return policy
@@ -0,0 +1,27 @@
+from builtins import float, max, min
+import asyncio
+import time
+from typing import Callable, Optional
+
+class RateLimiter:
+    """
+    Token bucket allowing ``rate`` acquisitions per second on average, in bursts of up to ``burst``.
+
+    An acquisition that finds the bucket empty reserves the next token and sleeps until it is
+    due, so concurrent callers are admitted in arrival order without polling.
+    """
+
+    def __init__(self, rate: float, burst: Optional[float] = None, clock: Callable[[], float] = time.monotonic):
+        self.rate = rate
+        self.burst = max(1.0, burst if burst is not None else rate)
+        self.clock = clock
+        self._tokens = self.burst
+        self._updated = clock()
+
+    async def acquire(self) -> None:
+        now = self.clock()
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+        self._tokens -= 1
+        if self._tokens < 0:
+            await asyncio.sleep(-self._tokens / self.rate)
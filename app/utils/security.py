@@ -1,30 +1,37 @@
 # app/security.py
 from builtins import Exception, ValueError, bool, int, str
+import asyncio
 import secrets
-import bcrypt
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import replace
+from typing import Optional
 from logging import getLogger
+from app.utils.password_policy import BCRYPT, PasswordHashPolicy, get_password_policy
+from settings.config import settings
 
 # Set up logging
 logger = getLogger(__name__)
 
-def hash_password(password: str, rounds: int = 12) -> str:
+def hash_password(password: str, rounds: Optional[int] = None, policy: Optional[PasswordHashPolicy] = None) -> str:
     """
-    Hashes a password using bcrypt with a specified cost factor.
+    Hashes a password according to the password hash policy.
     
     Args:
         password (str): The plain text password to hash.
-        rounds (int): The cost factor that determines the computational cost of hashing.
+        rounds (int): Optional bcrypt cost factor; when given, a bcrypt hash with this cost is produced.
+        policy (PasswordHashPolicy): Optional policy to use instead of the current one.
 
     Returns:
-        str: The hashed password.
+        str: The hashed password, which records its algorithm and parameters.
 
     Raises:
         ValueError: If hashing the password fails.
     """
+    policy = policy or get_password_policy()
+    if rounds is not None:
+        policy = replace(policy, algorithm=BCRYPT, bcrypt_rounds=rounds)
     try:
-        salt = bcrypt.gensalt(rounds=rounds)
-        hashed_password = bcrypt.hashpw(password.encode('utf-8'), salt)
-        return hashed_password.decode('utf-8')
+        return policy.hash(password)
     except Exception as e:
         logger.error("Failed to hash password: %s", e)
         raise ValueError("Failed to hash password") from e
@@ -35,7 +42,7 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
     
     Args:
         plain_password (str): The plain text password to verify.
-        hashed_password (str): The bcrypt hashed password.
+        hashed_password (str): The bcrypt or argon2id hashed password.
 
     Returns:
         bool: True if the password is correct, False otherwise.
@@ -44,10 +51,68 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
         ValueError: If the hashed password format is incorrect or the function fails to verify.
     """
     try:
-        return bcrypt.checkpw(plain_password.encode('utf-8'), hashed_password.encode('utf-8'))
+        return get_password_policy().verify(plain_password, hashed_password)
     except Exception as e:
         logger.error("Error verifying password: %s", e)
         raise ValueError("Authentication process encountered an unexpected error") from e
 
+def password_needs_rehash(hashed_password: str) -> bool:
+    """Returns True if the hash was produced with an algorithm or cost other than the current policy's."""
+    return get_password_policy().needs_rehash(hashed_password)
+
+_password_executor: Optional[Executor] = None
+
+def get_password_executor() -> Executor:
+    """
+    Returns the worker pool used for password hashing, creating it on first use.
+
+    The pool size is the concurrency cap: at most ``password_hash_workers`` hashes run
+    at once and the rest wait in the executor queue instead of blocking the event loop.
+    """
+    global _password_executor
+    if _password_executor is None:
+        workers = settings.password_hash_workers
+        if settings.password_hash_executor == "process":
+            _password_executor = ProcessPoolExecutor(max_workers=workers)
+        else:
+            _password_executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="password-hash")
+    return _password_executor
+
+def shutdown_password_executor(wait: bool = True) -> None:
+    """Shuts down the password worker pool; the next async call creates a fresh one."""
+    global _password_executor
+    if _password_executor is not None:
+        _password_executor.shutdown(wait=wait)
+        _password_executor = None
+
+async def hash_password_async(password: str, rounds: Optional[int] = None) -> str:
+    """
+    Hashes a password on the password worker pool without blocking the event loop.
+
+    Args:
+        password (str): The plain text password to hash.
+        rounds (int): Optional bcrypt cost factor; when given, a bcrypt hash with this cost is produced.
+
+    Returns:
+        str: The hashed password.
+    """
+    loop = asyncio.get_running_loop()
+    # The policy is resolved here and passed along so process workers use the calibrated one.
+    return await loop.run_in_executor(get_password_executor(), hash_password, password, rounds, get_password_policy())
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    """
+    Verifies a password on the password worker pool without blocking the event loop.
+
+    Args:
+        plain_password (str): The plain text password to verify.
+        hashed_password (str): The bcrypt or argon2id hashed password.
+
+    Returns:
+        bool: True if the password is correct, False otherwise.
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_password_executor(), verify_password, plain_password, hashed_password)
+
 def generate_verification_token():
     return secrets.token_urlsafe(16)  # Generates a secure 16-byte URL-safe token
\ No newline at end of file
@@ -0,0 +1,58 @@
+from builtins import TypeError, bytes, dict, getattr, isinstance, len, str, tuple, type
+from typing import Any, Callable, List, Optional, Sequence
+from uuid import UUID
+from fastapi.responses import ORJSONResponse
+import orjson
+from app.schemas.user_schemas import UserResponse
+
+# Public user fields read from the row, in the order UserResponse declares them.
+USER_RESPONSE_FIELDS = tuple(name for name in UserResponse.model_fields if name != "links")
+
+def user_payload(user, fields: Optional[Sequence[str]] = None, links: Optional[Callable] = None) -> dict:
+    """
+    Build the JSON payload of a user straight from its attributes.
+
+    ``user`` can be an ORM object or a row. Its values are not validated here, not even once:
+    every one of them was validated against ``UserBase`` on its way into the database, and the
+    columns hold the same types, so validating on the way out cannot fail and would cost more
+    than the rest of the response put together (see ``benchmarks/bench_user_serialization.py``).
+    ``tests/test_serialization.py`` checks the payload against ``UserResponse`` instead, so the
+    two cannot drift apart. UUIDs and enums are left as is for orjson to encode natively. With
+    ``fields``, only ``id`` and those fields are included. ``links`` (see
+    ``app.utils.link_generation.user_link_builder``) adds the user's hypermedia links.
+    """
+    names = USER_RESPONSE_FIELDS if fields is None else ("id", *fields)
+    payload = {name: getattr(user, name) for name in names}
+    if links is not None:
+        payload["links"] = links(user.id)
+    return payload
+
+def user_list_payload(users, fields: Optional[Sequence[str]] = None, links: Optional[Callable] = None,
+                      pagination_links: Optional[Sequence] = None, **page) -> dict:
+    """
+    Build the payload of a page of users; ``page`` carries total, page, cursors and the like.
+
+    ``links`` is passed on to ``user_payload``; ``pagination_links`` are omitted when None.
+    """
+    items: List[dict] = [user_payload(user, fields, links) for user in users]
+    payload = {"items": items, **page, "size": len(items)}
+    if pagination_links is not None:
+        payload["links"] = [link.model_dump(mode="json") for link in pagination_links]
+    return payload
+
+def _default(value):
+    # orjson encodes uuid.UUID itself but not subclasses, such as the UUIDs asyncpg returns.
+    if isinstance(value, UUID):
+        return str(value)
+    raise TypeError(f"Type is not JSON serializable: {type(value).__name__}")
+
+class UserJSONResponse(ORJSONResponse):
+    """
+    orjson-encoded response for the payloads built here.
+
+    Returning it from a route skips FastAPI's response-model validation and ``jsonable_encoder``;
+    the route's ``response_model`` still documents the schema.
+    """
+
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(content, default=_default, option=orjson.OPT_NON_STR_KEYS)
@@ -1,31 +1,354 @@
 # smtp_client.py
-from builtins import Exception, int, str
-import smtplib
+from builtins import BaseException, Exception, OSError, ValueError, bool, bytes, int, isinstance, len, next, range, str, super
+import asyncio
+import base64
+from collections import deque
+from email import policy
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
-from settings.config import settings
+import re
+import socket
+import ssl
+import time
+from typing import Deque, List, Optional, Sequence, Set, Tuple
 import logging
+from app.utils.rate_limiter import RateLimiter
+
+logger = logging.getLogger(__name__)
+
+# A message ready for the wire: envelope sender, envelope recipients and the encoded message.
+Envelope = Tuple[str, Sequence[str], bytes]
+
+class SMTPError(Exception):
+    """A reply the server gave that was not the expected one; ``code`` is its SMTP status."""
+
+    def __init__(self, code: int, message: str):
+        super().__init__(f"{code} {message}")
+        self.code = code
+        self.message = message
+
+    @property
+    def temporary(self) -> bool:
+        """4xx replies may succeed when retried later; 5xx replies will not."""
+        return 400 <= self.code < 500
+
+class SMTPConnectionError(SMTPError):
+    """The connection failed or was dropped; what was in flight may be retried on a new one."""
+
+    def __init__(self, message: str):
+        super().__init__(0, message)
+
+class SMTPConnection:
+    """
+    One SMTP session on asyncio streams: greeting, EHLO, STARTTLS and AUTH PLAIN or LOGIN.
+
+    With ``starttls`` (the default), a server that does not offer STARTTLS is refused before
+    any credentials are sent, since AUTH would otherwise carry them in the clear.
+
+    When the server advertises PIPELINING (RFC 2920), each message's ``MAIL FROM``, ``RCPT TO``
+    and ``DATA`` commands go out in one write, so a message costs two round trips however
+    many recipients it has; otherwise the commands are sent one at a time.
+    """
+
+    def __init__(self, host: str, port: int, username: Optional[str] = None, password: Optional[str] = None,
+                 starttls: bool = True, ssl_context: Optional[ssl.SSLContext] = None, timeout: float = 30,
+                 local_hostname: Optional[str] = None):
+        self.host = host
+        self.port = port
+        self.username = username
+        self.password = password
+        self.starttls = starttls
+        self.ssl_context = ssl_context
+        self.timeout = timeout
+        self.local_hostname = local_hostname or socket.gethostname()
+        self.extensions: Set[str] = set()
+        self.auth_mechanisms: Set[str] = set()
+        self.last_used = 0.0
+        self._reader: Optional[asyncio.StreamReader] = None
+        self._writer: Optional[asyncio.StreamWriter] = None
+
+    async def connect(self) -> None:
+        try:
+            self._reader, self._writer = await asyncio.wait_for(asyncio.open_connection(self.host, self.port), self.timeout)
+        except (OSError, asyncio.TimeoutError) as e:
+            raise SMTPConnectionError(f"Could not connect to {self.host}:{self.port}: {e}") from e
+        await self._expect(220)
+        await self._ehlo()
+        if self.starttls:
+            if "STARTTLS" not in self.extensions:
+                # Not offered, or stripped from the reply on the way: never fall back to plain text.
+                raise SMTPError(502, f"{self.host} does not offer STARTTLS")
+            await self._command("STARTTLS", 220)
+            context = self.ssl_context or ssl.create_default_context()
+            try:
+                await self._writer.start_tls(context, server_hostname=self.host)
+            except (OSError, ssl.SSLError) as e:
+                raise SMTPConnectionError(f"TLS handshake with {self.host} failed: {e}") from e
+            await self._ehlo()
+        if self.username:
+            await self._authenticate()
+        self.last_used = time.monotonic()
+
+    async def _ehlo(self) -> None:
+        _, text = await self._command(f"EHLO {self.local_hostname}", 250)
+        self.extensions, self.auth_mechanisms = set(), set()
+        for line in text.splitlines()[1:]:
+            # Some servers still advertise the pre-standard "AUTH=LOGIN PLAIN" form.
+            keyword, _, params = re.sub(r"^AUTH=", "AUTH ", line, flags=re.IGNORECASE).partition(" ")
+            self.extensions.add(keyword.upper())
+            if keyword.upper() == "AUTH":
+                self.auth_mechanisms.update(params.upper().split())
+
+    async def _authenticate(self) -> None:
+        if "AUTH" not in self.extensions:
+            raise SMTPError(502, f"{self.host} does not offer AUTH")
+        if "PLAIN" in self.auth_mechanisms:
+            credentials = _b64(f"\0{self.username}\0{self.password}")
+            await self._command(f"AUTH PLAIN {credentials}", 235)
+        elif "LOGIN" in self.auth_mechanisms:
+            await self._command("AUTH LOGIN", 334)
+            await self._command(_b64(self.username), 334)
+            await self._command(_b64(self.password), 235)
+        else:
+            mechanisms = " ".join(sorted(self.auth_mechanisms)) or "none"
+            raise SMTPError(504, f"{self.host} offers no supported AUTH mechanism (PLAIN or LOGIN), only: {mechanisms}")
+
+    def is_open(self) -> bool:
+        return self._writer is not None and not self._writer.is_closing()
+
+    def _write(self, *lines: str) -> None:
+        if not self.is_open():
+            raise SMTPConnectionError(f"Connection to {self.host} is closed")
+        self._writer.write("".join(f"{line}\r\n" for line in lines).encode("utf-8"))
+
+    async def _reply(self) -> Tuple[int, str]:
+        lines = []
+        try:
+            while True:
+                line = await asyncio.wait_for(self._reader.readline(), self.timeout)
+                if not line:
+                    raise SMTPConnectionError(f"{self.host} closed the connection")
+                lines.append(line[4:].decode("utf-8", "replace").rstrip("\r\n"))
+                if line[3:4] != b"-":
+                    return int(line[:3]), "\n".join(lines)
+        except (OSError, asyncio.TimeoutError, ValueError) as e:
+            raise SMTPConnectionError(f"No reply from {self.host}: {e!r}") from e
+
+    async def _expect(self, *codes: int) -> Tuple[int, str]:
+        code, text = await self._reply()
+        if code not in codes:
+            if code == 421:
+                raise SMTPConnectionError(f"{self.host} is closing the connection: {text}")
+            raise SMTPError(code, text)
+        return code, text
+
+    async def _command(self, line: str, *codes: int) -> Tuple[int, str]:
+        self._write(line)
+        return await self._expect(*codes)
+
+    async def noop(self) -> None:
+        """Health check: a round trip the server must answer with 250."""
+        await self._command("NOOP", 250)
+        self.last_used = time.monotonic()
+
+    async def send_message(self, sender: str, recipients: Sequence[str], data: bytes) -> Optional[SMTPError]:
+        """
+        Send one message.
+
+        :return: None if every recipient accepted it, otherwise the server's rejection; the
+            session stays usable either way.
+        :raises SMTPConnectionError: If the connection failed; the message may be retried elsewhere.
+        """
+        commands = [f"MAIL FROM:<{sender}>", *(f"RCPT TO:<{recipient}>" for recipient in recipients), "DATA"]
+        if "PIPELINING" in self.extensions:
+            self._write(*commands)
+            replies = [await self._reply() for _ in commands]
+        else:
+            replies = []
+            for command in commands:
+                self._write(command)
+                replies.append(await self._reply())
+                if replies[-1][0] >= 400 and command.startswith("MAIL"):
+                    break
+        if any(code == 421 for code, _ in replies):
+            raise SMTPConnectionError(f"{self.host} is closing the connection")
+        mail, rcpts, data_reply = replies[0], replies[1:len(recipients) + 1], replies[len(recipients) + 1:]
+        rejected = [reply for reply in rcpts if reply[0] not in (250, 251)]
+        if mail[0] != 250 or not data_reply or data_reply[0][0] != 354:
+            await self._command("RSET", 250)
+            code, text = next((reply for reply in [mail, *rejected, *data_reply] if reply[0] >= 400), mail)
+            return SMTPError(code, text)
+        self._writer.write(_dot_stuff(data) + b".\r\n")
+        code, text = await self._reply()
+        self.last_used = time.monotonic()
+        if code == 421:
+            raise SMTPConnectionError(f"{self.host} is closing the connection: {text}")
+        if code != 250:
+            return SMTPError(code, text)
+        if rejected:
+            return SMTPError(*rejected[0])
+        return None
+
+    async def close(self) -> None:
+        if self.is_open():
+            try:
+                await asyncio.wait_for(self._command("QUIT", 221), self.timeout)
+            except (SMTPError, asyncio.TimeoutError):
+                pass
+            self._writer.close()
+            try:
+                await self._writer.wait_closed()
+            except (OSError, ssl.SSLError):
+                pass
+
+def _b64(text: str) -> str:
+    return base64.b64encode(text.encode("utf-8")).decode("ascii")
+
+def _dot_stuff(data: bytes) -> bytes:
+    # Normalise line endings to CRLF and double leading dots, so the body cannot end DATA early.
+    data = re.sub(rb"\r?\n", b"\r\n", data)
+    if not data.endswith(b"\r\n"):
+        data += b"\r\n"
+    return re.sub(rb"(?m)^\.", b"..", data)
 
 class SMTPClient:
-    def __init__(self, server: str, port: int, username: str, password: str):
+    """
+    Sends email over a pool of up to ``pool_size`` persistent, authenticated SMTP connections.
+
+    Connections are opened on demand and kept for reuse. One that has been idle for more than
+    ``health_check_seconds`` is checked with NOOP before it is handed out, and replaced if the
+    check fails. If a connection drops mid-send, the messages not yet accepted are retried on
+    a fresh connection up to ``max_retries`` times.
+
+    With a ``rate_limit``, at most that many messages per second (in bursts of up to
+    ``rate_burst``) are handed to the server, across all connections, to stay within the
+    provider's sending limits.
+    """
+
+    def __init__(self, server: str, port: int, username: str, password: str, pool_size: int = 4,
+                 starttls: bool = True, timeout: float = 30, health_check_seconds: float = 30,
+                 max_retries: int = 1, ssl_context: Optional[ssl.SSLContext] = None,
+                 rate_limit: float = 0, rate_burst: Optional[float] = None):
         self.server = server
         self.port = port
         self.username = username
         self.password = password
+        self.pool_size = pool_size
+        self.starttls = starttls
+        self.timeout = timeout
+        self.health_check_seconds = health_check_seconds
+        self.max_retries = max_retries
+        self.ssl_context = ssl_context
+        self.rate_limiter = RateLimiter(rate_limit, rate_burst) if rate_limit > 0 else None
+        self.connections_opened = 0
+        self._idle: Deque[SMTPConnection] = deque()
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._closed = False
 
-    def send_email(self, subject: str, html_content: str, recipient: str):
+    def build_message(self, subject: str, html_content: str, recipient: str) -> Envelope:
+        message = MIMEMultipart('alternative')
+        message['Subject'] = subject
+        message['From'] = self.username
+        message['To'] = recipient
+        message.attach(MIMEText(html_content, 'html'))
+        return self.username, [recipient], message.as_bytes(policy=policy.SMTP)
+
+    async def send_email(self, subject: str, html_content: str, recipient: str):
+        """Send one HTML email; raises ``SMTPError`` if it was not accepted."""
+        error = (await self.send_messages([self.build_message(subject, html_content, recipient)]))[0]
+        if error is not None:
+            logger.error(f"Failed to send email: {error}")
+            raise error
+        logger.info(f"Email sent to {recipient}")
+
+    async def send_messages(self, messages: Sequence[Envelope]) -> List[Optional[SMTPError]]:
+        """
+        Send ``messages`` one after another over a single pooled connection.
+
+        :return: For each message, None if it was accepted, otherwise why it was not.
+        """
+        results: List[Optional[SMTPError]] = [None] * len(messages)
+        pending = deque(range(len(messages)))
+        failures = 0
+        while pending:
+            try:
+                connection = await self._acquire()
+            except SMTPError as e:
+                for index in pending:
+                    results[index] = e
+                break
+            reusable = True
+            try:
+                while pending:
+                    if self.rate_limiter is not None:
+                        await self.rate_limiter.acquire()
+                    results[pending[0]] = await connection.send_message(*messages[pending[0]])
+                    pending.popleft()
+                    failures = 0
+            except SMTPError as e:
+                reusable = False
+                if not isinstance(e, SMTPConnectionError):
+                    # The session is in an unknown state; fail this message and carry on with a new one.
+                    results[pending.popleft()] = e
+                    continue
+                failures += 1
+                logger.warning(f"SMTP connection to {self.server} failed: {e}")
+                if failures > self.max_retries:
+                    for index in pending:
+                        results[index] = e
+                    pending.clear()
+            finally:
+                await self._release(connection, reusable)
+        return results
+
+    def _semaphore(self) -> asyncio.Semaphore:
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.pool_size)
+        return self._slots
+
+    async def _acquire(self) -> SMTPConnection:
+        await self._semaphore().acquire()
         try:
-            message = MIMEMultipart('alternative')
-            message['Subject'] = subject
-            message['From'] = self.username
-            message['To'] = recipient
-            message.attach(MIMEText(html_content, 'html'))
-
-            with smtplib.SMTP(self.server, self.port) as server:
-                server.starttls()  # Use TLS
-                server.login(self.username, self.password)
-                server.sendmail(self.username, recipient, message.as_string())
-            logging.info(f"Email sent to {recipient}")
-        except Exception as e:
-            logging.error(f"Failed to send email: {str(e)}")
+            while self._idle:
+                connection = self._idle.pop()
+                if await self._healthy(connection):
+                    return connection
+                await connection.close()
+            connection = SMTPConnection(self.server, self.port, self.username, self.password, self.starttls,
+                                        self.ssl_context, self.timeout)
+            try:
+                await connection.connect()
+            except BaseException:
+                await connection.close()
+                raise
+            self.connections_opened += 1
+            return connection
+        except BaseException:
+            self._semaphore().release()
             raise
+
+    async def _healthy(self, connection: SMTPConnection) -> bool:
+        if not connection.is_open():
+            return False
+        if time.monotonic() - connection.last_used < self.health_check_seconds:
+            return True
+        try:
+            await connection.noop()
+            return True
+        except SMTPError:
+            return False
+
+    async def _release(self, connection: SMTPConnection, reusable: bool) -> None:
+        try:
+            if reusable and connection.is_open() and not self._closed:
+                self._idle.append(connection)
+            else:
+                await connection.close()
+        finally:
+            self._semaphore().release()
+
+    async def close(self) -> None:
+        """Close the idle connections; connections in use are closed when they are released."""
+        self._closed = True
+        while self._idle:
+            await self._idle.pop().close()
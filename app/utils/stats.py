@@ -0,0 +1,17 @@
+from builtins import float, int, len, min, round, sorted
+from typing import Dict, Iterable
+
+def percentile(values: Iterable[float], pct: float) -> float:
+    """The ``pct``th percentile of ``values`` by nearest rank; 0.0 when there are none."""
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+def latency_percentiles(seconds: Iterable[float]) -> Dict[str, float]:
+    """Sample count, p50, p95, p99 and max of durations given in seconds, in milliseconds."""
+    ordered = sorted(seconds)
+    if not ordered:
+        return {"samples": 0}
+    return {"samples": len(ordered), "p50_ms": percentile(ordered, 50) * 1000, "p95_ms": percentile(ordered, 95) * 1000,
+            "p99_ms": percentile(ordered, 99) * 1000, "max_ms": ordered[-1] * 1000}
@@ -1,46 +1,103 @@
+import asyncio
+import html
+import re
+import string
+import threading
 import markdown2
 from pathlib import Path
+from typing import Dict, List, Sequence
+
+# Inline styles applied to each tag for email compatibility, with excellent typography.
+EMAIL_STYLES = {
+    'body': 'font-family: Arial, sans-serif; font-size: 16px; color: #333333; background-color: #ffffff; line-height: 1.5;',
+    'h1': 'font-size: 24px; color: #333333; font-weight: bold; margin-top: 20px; margin-bottom: 10px;',
+    'p': 'font-size: 16px; color: #666666; margin: 10px 0; line-height: 1.6;',
+    'a': 'color: #0056b3; text-decoration: none; font-weight: bold;',
+    'footer': 'font-size: 12px; color: #777777; padding: 20px 0;',
+    'ul': 'list-style-type: none; padding: 0;',
+    'li': 'margin-bottom: 10px;'
+}
+# Matches every bare opening tag that gets a style, so styling is a single pass over the HTML.
+STYLED_TAG = re.compile("<({})>".format("|".join(re.escape(tag) for tag in EMAIL_STYLES if tag != 'body')))
+
+def _placeholders(template: str) -> List[str]:
+    return sorted(field for _, field, _, _ in string.Formatter().parse(template) if field is not None)
 
 class TemplateManager:
+    """
+    Renders the markdown email templates in ``email_templates`` to styled HTML.
+
+    Template files are read once and kept in memory until their mtime changes. The header and
+    footer are converted and styled once; each email only converts its own substituted body.
+    """
+
     def __init__(self):
         # Dynamically determine the root path of the project
         self.root_dir = Path(__file__).resolve().parent.parent.parent  # Adjust this depending on the structure
         self.templates_dir = self.root_dir / 'email_templates'
+        # filename -> (mtime_ns, markdown source, styled HTML or None if not converted yet)
+        self._cache = {}
+        self._lock = threading.Lock()
+
+    def _load(self, filename: str, as_html: bool = False) -> str:
+        """Return a template's markdown, or its styled HTML with ``as_html``, re-reading the file if it changed."""
+        template_path = self.templates_dir / filename
+        mtime = template_path.stat().st_mtime_ns
+        entry = self._cache.get(filename)
+        if entry is None or entry[0] != mtime:
+            with open(template_path, 'r', encoding='utf-8') as file:
+                entry = (mtime, file.read(), None)
+        if as_html and entry[2] is None:
+            entry = (entry[0], entry[1], self._apply_email_styles(markdown2.markdown(entry[1])))
+        with self._lock:
+            self._cache[filename] = entry
+        return entry[2] if as_html else entry[1]
 
     def _read_template(self, filename: str) -> str:
         """Private method to read template content."""
-        template_path = self.templates_dir / filename
-        with open(template_path, 'r', encoding='utf-8') as file:
-            return file.read()
+        return self._load(filename)
 
     def _apply_email_styles(self, html: str) -> str:
-        """Apply advanced CSS styles inline for email compatibility with excellent typography."""
-        styles = {
-            'body': 'font-family: Arial, sans-serif; font-size: 16px; color: #333333; background-color: #ffffff; line-height: 1.5;',
-            'h1': 'font-size: 24px; color: #333333; font-weight: bold; margin-top: 20px; margin-bottom: 10px;',
-            'p': 'font-size: 16px; color: #666666; margin: 10px 0; line-height: 1.6;',
-            'a': 'color: #0056b3; text-decoration: none; font-weight: bold;',
-            'footer': 'font-size: 12px; color: #777777; padding: 20px 0;',
-            'ul': 'list-style-type: none; padding: 0;',
-            'li': 'margin-bottom: 10px;'
-        }
-        # Wrap entire HTML content in <div> with body style
-        styled_html = f'<div style="{styles["body"]}">{html}</div>'
-        # Apply styles to each HTML element
-        for tag, style in styles.items():
-            if tag != 'body':  # Skip the body style since it's already applied to the <div>
-                styled_html = styled_html.replace(f'<{tag}>', f'<{tag} style="{style}">')
-        return styled_html
+        """Apply advanced CSS styles inline to each tag, in a single pass over the HTML."""
+        return STYLED_TAG.sub(lambda match: f'<{match.group(1)} style="{EMAIL_STYLES[match.group(1)]}">', html)
 
     def render_template(self, template_name: str, **context) -> str:
         """Render a markdown template with given context, applying advanced email styles."""
-        header = self._read_template('header.md')
-        footer = self._read_template('footer.md')
+        header = self._load('header.md', as_html=True)
+        footer = self._load('footer.md', as_html=True)
+
+        # Format the main template with the provided context; only this part is converted per email
+        main_content = self._read_template(f'{template_name}.md').format(**context)
+        main_html = self._apply_email_styles(markdown2.markdown(main_content))
+
+        # Wrap entire HTML content in <div> with body style
+        return f'<div style="{EMAIL_STYLES["body"]}">{header}\n{main_html}\n{footer}</div>'
+
+    async def render_template_async(self, template_name: str, **context) -> str:
+        """``render_template`` on a worker thread, so markdown conversion does not block the event loop."""
+        return await asyncio.to_thread(self.render_template, template_name, **context)
+
+    def render_many(self, template_name: str, contexts: Sequence[Dict[str, str]]) -> List[str]:
+        """
+        Render one template for many recipients.
 
-        # Read main template and format it with provided context
-        main_template = self._read_template(f'{template_name}.md')
-        main_content = main_template.format(**context)
+        The template is converted to HTML once with its ``{placeholders}`` in place, and each
+        recipient's values are HTML-escaped into that, so an email costs a string substitution
+        rather than a markdown conversion. Values are inserted as text and never interpreted as
+        markdown. A template whose placeholders do not come through conversion unchanged is
+        rendered one email at a time instead.
+        """
+        source = self._read_template(f'{template_name}.md')
+        body = self._load(f'{template_name}.md', as_html=True)
+        if _placeholders(body) != _placeholders(source):
+            return [self.render_template(template_name, **context) for context in contexts]
+        prefix = f'<div style="{EMAIL_STYLES["body"]}">{self._load("header.md", as_html=True)}\n'
+        suffix = f'\n{self._load("footer.md", as_html=True)}</div>'
+        return [
+            prefix + body.format(**{key: html.escape(str(value)) for key, value in context.items()}) + suffix
+            for context in contexts
+        ]
 
-        full_markdown = f"{header}\n{main_content}\n{footer}"
-        html_content = markdown2.markdown(full_markdown)
-        return self._apply_email_styles(html_content)
+    async def render_many_async(self, template_name: str, contexts: Sequence[Dict[str, str]]) -> List[str]:
+        """``render_many`` on a worker thread."""
+        return await asyncio.to_thread(self.render_many, template_name, contexts)
@@ -0,0 +1,76 @@
+"""
+Benchmark: per-request cost of resolving settings and the email service.
+
+Compares building them on every call, as ``get_settings`` and ``get_email_service`` used to
+(``Settings()`` re-reads ``.env`` and the environment; the email service builds a template
+manager and an SMTP client), with handing out the service container's singletons.
+
+Two measurements are taken:
+
+- ``call``: the dependency functions alone, in microseconds per call.
+- ``request``: a request through a minimal FastAPI app whose endpoint depends on both, over
+  the in-process ASGI transport, so the numbers include FastAPI's dependency resolution.
+
+No database is needed.
+
+Usage:
+    python -m benchmarks.bench_dependency_overhead --calls 2000 --requests 2000
+"""
+import argparse
+import asyncio
+import time
+
+from fastapi import Depends, FastAPI
+from httpx import AsyncClient
+
+from app.dependencies import get_email_service, get_settings
+from app.services.email_service import EmailService
+from app.utils.template_manager import TemplateManager
+from settings.config import Settings
+
+def build_settings() -> Settings:
+    return Settings()
+
+def build_email_service() -> EmailService:
+    return EmailService(template_manager=TemplateManager())
+
+MODES = {
+    "per-request": (build_settings, build_email_service),
+    "container": (get_settings, get_email_service),
+}
+
+def time_calls(settings_dependency, email_dependency, calls: int) -> float:
+    started = time.perf_counter()
+    for _ in range(calls):
+        settings_dependency()
+        email_dependency()
+    return (time.perf_counter() - started) / calls * 1e6
+
+def build_app() -> FastAPI:
+    app = FastAPI()
+    for name, (settings_dependency, email_dependency) in MODES.items():
+        async def endpoint(settings: Settings = Depends(settings_dependency), email_service: EmailService = Depends(email_dependency)):
+            return {"ok": True}
+        app.add_api_route(f"/{name}", endpoint)
+    return app
+
+async def time_requests(client: AsyncClient, path: str, requests: int) -> float:
+    started = time.perf_counter()
+    for _ in range(requests):
+        (await client.get(path)).raise_for_status()
+    return (time.perf_counter() - started) / requests * 1e6
+
+async def main(args):
+    for name, dependencies in MODES.items():
+        time_calls(*dependencies, calls=10)
+        print(f"  {name:<12} call    {time_calls(*dependencies, calls=args.calls):9.1f} us")
+    async with AsyncClient(app=build_app(), base_url="http://bench") as client:
+        for name in MODES:
+            await time_requests(client, f"/{name}", 10)
+            print(f"  {name:<12} request {await time_requests(client, f'/{name}', args.requests):9.1f} us")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--calls", type=int, default=2000, help="Dependency calls timed per mode")
+    parser.add_argument("--requests", type=int, default=2000, help="Requests timed per mode")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,115 @@
+"""
+Benchmark: cross-worker cache invalidation lag over PostgreSQL LISTEN/NOTIFY under write load.
+
+``--listeners`` change buses, each on its own connection as a separate uvicorn worker would
+be, listen on a scratch channel from an event loop in their own thread, so their lag is not
+inflated by waiting behind the writers. ``--writers`` concurrent tasks each commit an
+``UPDATE`` of a row in the scratch table ``user_lag_bench`` and then publish the change, as
+``UserService`` does after a write, for ``--seconds`` at up to ``--rate`` writes per second in
+total (0: as fast as they can).
+
+Lag is the time from publishing to a listener receiving the notification (see
+``ChangeBus.lag_stats``); it is reported across all listeners, along with the write throughput
+achieved and any notifications that never arrived.
+
+Requires a PostgreSQL database (``DATABASE_URL``). The scratch table is dropped afterwards.
+
+Usage:
+    python -m benchmarks.bench_invalidation_lag --listeners 4 --writers 1 8 32 --seconds 10
+"""
+import argparse
+import asyncio
+import threading
+import time
+import uuid
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from app.services.change_notification_service import UPDATED, ChangeBus, PostgresNotifyTransport
+from app.utils.stats import percentile
+from settings.config import settings
+
+CHANNEL = "user_changes_bench"
+ROWS = 1000
+
+async def writer(engine, bus, ids, deadline, interval, offset):
+    writes = 0
+    next_at = time.perf_counter()
+    async with engine.connect() as conn:
+        while time.perf_counter() < deadline:
+            user_id = ids[(offset + writes) % len(ids)]
+            await conn.execute(text("UPDATE user_lag_bench SET updated_at = now() WHERE id = :id"), {"id": user_id})
+            await conn.commit()
+            await bus.publish(UPDATED, user_id)
+            writes += 1
+            if interval:
+                next_at += interval
+                await asyncio.sleep(max(0.0, next_at - time.perf_counter()))
+    return writes
+
+def listen(listeners, ready: threading.Event, done: threading.Event):
+    async def serve():
+        for bus in listeners:
+            await bus.start()
+        ready.set()
+        while not done.is_set():
+            await asyncio.sleep(0.05)
+        for bus in listeners:
+            await bus.stop()
+
+    asyncio.run(serve())
+
+async def run(engine, ids, args, writers):
+    listeners = [ChangeBus(PostgresNotifyTransport(args.database_url, CHANNEL), lag_samples=10_000_000) for _ in range(args.listeners)]
+    # Listeners must not drop their own cache for every write; only the lag is of interest here.
+    for bus in listeners:
+        bus.handlers = []
+    ready, done = threading.Event(), threading.Event()
+    thread = threading.Thread(target=listen, args=(listeners, ready, done))
+    thread.start()
+    await asyncio.to_thread(ready.wait)
+    publisher = ChangeBus(PostgresNotifyTransport(args.database_url, CHANNEL))
+    await publisher.start()
+    try:
+        interval = writers / args.rate if args.rate else 0
+        started = time.perf_counter()
+        deadline = started + args.seconds
+        writes = sum(await asyncio.gather(*(writer(engine, publisher, ids, deadline, interval, offset) for offset in range(writers))))
+        elapsed = time.perf_counter() - started
+        # Let notifications still in flight arrive before counting.
+        await asyncio.sleep(1)
+    finally:
+        await publisher.stop()
+        done.set()
+        await asyncio.to_thread(thread.join)
+    lags = [lag * 1000 for bus in listeners for lag in bus._lags]
+    missing = writes * len(listeners) - len(lags)
+    print(f"  writers={writers:<3} writes/s={writes / elapsed:8.0f}  "
+          f"lag p50={percentile(lags, 50):6.2f} ms  p95={percentile(lags, 95):6.2f} ms  "
+          f"p99={percentile(lags, 99):6.2f} ms  max={max(lags):7.2f} ms  missing={missing}")
+
+async def main(args):
+    engine = create_async_engine(args.database_url, pool_size=max(args.writers) + 1)
+    ids = [str(uuid.uuid4()) for _ in range(ROWS)]
+    try:
+        async with engine.begin() as conn:
+            await conn.execute(text("DROP TABLE IF EXISTS user_lag_bench"))
+            await conn.execute(text("CREATE TABLE user_lag_bench (id uuid PRIMARY KEY, updated_at timestamptz)"))
+            await conn.execute(text("INSERT INTO user_lag_bench (id) SELECT CAST(unnest(CAST(:ids AS text[])) AS uuid)"), {"ids": ids})
+        print(f"{args.listeners} listening workers, {args.seconds}s per run")
+        for writers in args.writers:
+            await run(engine, ids, args, writers)
+    finally:
+        async with engine.begin() as conn:
+            await conn.execute(text("DROP TABLE IF EXISTS user_lag_bench"))
+        await engine.dispose()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database-url", default=settings.database_url, help="Async SQLAlchemy database URL")
+    parser.add_argument("--listeners", type=int, default=4, help="Simulated workers listening for changes")
+    parser.add_argument("--writers", type=int, nargs="+", default=[1, 8, 32], help="Concurrent writers per run")
+    parser.add_argument("--seconds", type=float, default=10, help="Duration of each run")
+    parser.add_argument("--rate", type=float, default=0, help="Target total writes per second; 0 for unthrottled")
+    asyncio.run(main(parser.parse_args()))
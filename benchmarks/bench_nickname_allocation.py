@@ -0,0 +1,132 @@
+"""
+Benchmark: nickname allocation latency as the users table fills up.
+
+For each table size, a scratch table ``nickname_bench`` with a unique nickname index is
+filled with that many nicknames drawn from the generator's word lists, then two allocation
+strategies are timed (each attempt runs in a transaction that is rolled back, so the table
+size stays fixed):
+
+- ``probe loop``: the previous approach, one SELECT per random candidate until a free one is
+  found, then an INSERT. Run against the legacy 25,000-name space when it is not exhausted.
+- ``batched insert``: the current approach, one INSERT that picks the first free name out of
+  ``NICKNAME_BATCH_SIZE`` candidates, retried only if all of them are taken.
+
+Requires a PostgreSQL database (``DATABASE_URL``). The scratch table is dropped afterwards.
+
+Usage:
+    python -m benchmarks.bench_nickname_allocation --sizes 10000 1000000 10000000 --samples 200
+"""
+import argparse
+import asyncio
+import random
+import time
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from app.services.user_service import MAX_NICKNAME_ATTEMPTS, NICKNAME_BATCH_SIZE
+from app.utils.nickname_gen import ADJECTIVES, ANIMALS, NICKNAME_SPACE, NUMBER_RANGE, generate_nickname_candidates
+from app.utils.stats import percentile
+from settings.config import settings
+
+LEGACY_ADJECTIVES = ["clever", "jolly", "brave", "sly", "gentle"]
+LEGACY_ANIMALS = ["panda", "fox", "raccoon", "koala", "lion"]
+LEGACY_SPACE = len(LEGACY_ADJECTIVES) * len(LEGACY_ANIMALS) * 1000
+FILL_CHUNK = 1_000_000
+
+def legacy_nickname() -> str:
+    return f"{random.choice(LEGACY_ADJECTIVES)}_{random.choice(LEGACY_ANIMALS)}_{random.randint(0, 999)}"
+
+async def fill(conn, size: int, adjectives, animals, numbers: int):
+    await conn.execute(text("TRUNCATE nickname_bench"))
+    current = 0
+    while current < size:
+        await conn.execute(
+            text(
+                "INSERT INTO nickname_bench (nickname) "
+                "SELECT (CAST(:adjectives AS text[]))[1 + floor(random() * :adjective_count)::int] || '_' || "
+                "(CAST(:animals AS text[]))[1 + floor(random() * :animal_count)::int] || '_' || floor(random() * :numbers)::int "
+                "FROM generate_series(1, :batch) ON CONFLICT DO NOTHING"
+            ),
+            {
+                "adjectives": list(adjectives), "adjective_count": len(adjectives),
+                "animals": list(animals), "animal_count": len(animals),
+                "numbers": numbers, "batch": min(FILL_CHUNK, size - current),
+            },
+        )
+        current = (await conn.execute(text("SELECT count(*) FROM nickname_bench"))).scalar()
+    await conn.execute(text("ANALYZE nickname_bench"))
+    return current
+
+async def probe_loop(conn) -> int:
+    round_trips = 0
+    while True:
+        candidate = legacy_nickname()
+        round_trips += 1
+        taken = (await conn.execute(text("SELECT 1 FROM nickname_bench WHERE nickname = :n"), {"n": candidate})).first()
+        if not taken:
+            break
+    await conn.execute(text("INSERT INTO nickname_bench (nickname) VALUES (:n)"), {"n": candidate})
+    return round_trips + 1
+
+async def batched_insert(conn) -> int:
+    for attempt in range(1, MAX_NICKNAME_ATTEMPTS + 1):
+        candidates = generate_nickname_candidates(NICKNAME_BATCH_SIZE)
+        row = (await conn.execute(
+            text(
+                "INSERT INTO nickname_bench (nickname) VALUES (coalesce(("
+                "SELECT candidate FROM unnest(CAST(:candidates AS text[])) AS candidate "
+                "WHERE NOT EXISTS (SELECT 1 FROM nickname_bench WHERE nickname = candidate) LIMIT 1), :first)) "
+                "ON CONFLICT DO NOTHING RETURNING nickname"
+            ),
+            {"candidates": candidates, "first": candidates[0]},
+        )).first()
+        if row:
+            return attempt
+    raise RuntimeError("nickname space exhausted")
+
+async def time_strategy(engine, strategy, samples: int):
+    latencies, round_trips = [], []
+    for _ in range(samples):
+        async with engine.connect() as conn:
+            transaction = await conn.begin()
+            started = time.perf_counter()
+            round_trips.append(await strategy(conn))
+            latencies.append((time.perf_counter() - started) * 1000)
+            await transaction.rollback()
+    return latencies, round_trips
+
+def report(label: str, latencies, round_trips):
+    print(
+        f"  {label:<15} p50={percentile(latencies, 50):7.2f} ms  p99={percentile(latencies, 99):7.2f} ms  "
+        f"mean round trips={sum(round_trips) / len(round_trips):6.2f}  max round trips={max(round_trips)}"
+    )
+
+async def main(args):
+    engine = create_async_engine(args.database_url)
+    async with engine.begin() as conn:
+        await conn.execute(text("DROP TABLE IF EXISTS nickname_bench"))
+        await conn.execute(text("CREATE TABLE nickname_bench (nickname varchar(50) PRIMARY KEY)"))
+    try:
+        for size in args.sizes:
+            print(f"{size:,} existing users (fill {size / NICKNAME_SPACE:.2%} of {NICKNAME_SPACE:,} names)")
+            if size < LEGACY_SPACE * 0.99:
+                async with engine.begin() as conn:
+                    await fill(conn, size, LEGACY_ADJECTIVES, LEGACY_ANIMALS, 1000)
+                report("probe loop", *await time_strategy(engine, probe_loop, args.samples))
+            else:
+                print(f"  {'probe loop':<15} legacy space of {LEGACY_SPACE:,} names is exhausted; the loop never terminates")
+            async with engine.begin() as conn:
+                await fill(conn, size, ADJECTIVES, ANIMALS, NUMBER_RANGE)
+            report("batched insert", *await time_strategy(engine, batched_insert, args.samples))
+    finally:
+        async with engine.begin() as conn:
+            await conn.execute(text("DROP TABLE IF EXISTS nickname_bench"))
+        await engine.dispose()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database-url", default=settings.database_url, help="Async SQLAlchemy database URL")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 1_000_000, 10_000_000], help="Existing user counts to test")
+    parser.add_argument("--samples", type=int, default=200, help="Allocations timed per strategy and size")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,93 @@
+"""
+Benchmark: event-loop impact of password hashing under mixed login/list traffic.
+
+Simulates a single uvicorn worker serving a mix of login requests (one bcrypt verify each)
+and list requests (pure I/O, modelled as an awaited sleep of ``--io-ms``). Each scenario is
+run twice: once calling ``verify_password`` inline on the event loop ("before") and once
+through ``verify_password_async`` on the password worker pool ("after").
+
+Reported per scenario:
+- requests per second for login and list traffic
+- list request latency (p50 / p99), which is what other users feel while a login runs
+- event-loop lag (p50 / p99 / max), measured by a ticker that expects to wake every 5 ms
+
+Usage:
+    python -m benchmarks.bench_password_hashing --duration 5 --concurrency 50 --login-ratio 0.1
+"""
+import argparse
+import asyncio
+import random
+import statistics
+import time
+
+from app.utils.security import hash_password, shutdown_password_executor, verify_password, verify_password_async
+from app.utils.stats import percentile
+
+TICK_SECONDS = 0.005
+
+async def measure_loop_lag(stop: asyncio.Event, lags: list):
+    while not stop.is_set():
+        started = time.perf_counter()
+        await asyncio.sleep(TICK_SECONDS)
+        lags.append(max(0.0, time.perf_counter() - started - TICK_SECONDS))
+
+async def run_scenario(offload: bool, hashed: str, args) -> dict:
+    stop = asyncio.Event()
+    lags, list_latencies = [], []
+    counts = {"login": 0, "list": 0}
+
+    async def login():
+        if offload:
+            await verify_password_async("MySuperPassword$1234", hashed)
+        else:
+            verify_password("MySuperPassword$1234", hashed)
+        counts["login"] += 1
+
+    async def list_users():
+        started = time.perf_counter()
+        await asyncio.sleep(args.io_ms / 1000)
+        list_latencies.append(time.perf_counter() - started)
+        counts["list"] += 1
+
+    async def client():
+        while not stop.is_set():
+            await (login() if random.random() < args.login_ratio else list_users())
+
+    lag_task = asyncio.create_task(measure_loop_lag(stop, lags))
+    clients = [asyncio.create_task(client()) for _ in range(args.concurrency)]
+    await asyncio.sleep(args.duration)
+    stop.set()
+    await asyncio.gather(lag_task, *clients)
+
+    return {
+        "login_rps": counts["login"] / args.duration,
+        "list_rps": counts["list"] / args.duration,
+        "list_p50_ms": percentile(list_latencies, 50) * 1000,
+        "list_p99_ms": percentile(list_latencies, 99) * 1000,
+        "lag_p50_ms": percentile(lags, 50) * 1000,
+        "lag_p99_ms": percentile(lags, 99) * 1000,
+        "lag_max_ms": max(lags, default=0.0) * 1000,
+        "lag_mean_ms": statistics.fmean(lags) * 1000 if lags else 0.0,
+    }
+
+def print_row(label: str, result: dict):
+    print(
+        f"{label:<22} login/s={result['login_rps']:7.1f}  list/s={result['list_rps']:8.1f}  "
+        f"list p50/p99={result['list_p50_ms']:6.1f}/{result['list_p99_ms']:6.1f} ms  "
+        f"loop lag p50/p99/max={result['lag_p50_ms']:6.1f}/{result['lag_p99_ms']:6.1f}/{result['lag_max_ms']:6.1f} ms"
+    )
+
+async def main(args):
+    hashed = hash_password("MySuperPassword$1234", rounds=args.rounds)
+    print_row("before (inline bcrypt)", await run_scenario(False, hashed, args))
+    print_row("after (worker pool)", await run_scenario(True, hashed, args))
+    shutdown_password_executor()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--duration", type=float, default=5.0, help="Seconds to run each scenario")
+    parser.add_argument("--concurrency", type=int, default=50, help="Number of concurrent simulated clients")
+    parser.add_argument("--login-ratio", type=float, default=0.1, help="Fraction of requests that are logins")
+    parser.add_argument("--io-ms", type=float, default=2.0, help="Simulated database time of a list request")
+    parser.add_argument("--rounds", type=int, default=12, help="bcrypt cost factor of the stored hash")
+    asyncio.run(main(parser.parse_args()))
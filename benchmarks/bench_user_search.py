@@ -0,0 +1,146 @@
+"""
+Benchmark: user search and autocomplete latency at millions of rows.
+
+A scratch table ``user_search_bench`` with the users table's searchable columns is filled with
+``--rows`` synthetic users and given the same indexes as ``users``:
+
+- ``ix_user_search_bench_trgm``: pg_trgm GIN index on the search document, used by substring search.
+- ``ix_user_search_bench_nickname_prefix`` / ``..._email_prefix``: C-collated ``lower()`` btree
+  indexes, used by autocomplete.
+
+The queries issued are the ones ``UserService.search`` and ``UserService.autocomplete`` build,
+run as prepared statements so repeated executions may switch to generic plans, as they do in
+the application. If the server does not ship pg_trgm, search is timed without its index.
+
+Requires a PostgreSQL database (``DATABASE_URL``). The scratch table is dropped afterwards.
+
+Usage:
+    python -m benchmarks.bench_user_search --rows 1000000 5000000 --samples 200
+"""
+import argparse
+import asyncio
+import random
+import time
+
+from sqlalchemy import text
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from app.models.user_model import SEARCH_DOCUMENT_SQL
+from app.utils.nickname_gen import ADJECTIVES, ANIMALS
+from app.utils.stats import percentile
+from settings.config import settings
+
+FIRST_NAMES = ["ada", "alan", "grace", "linus", "margaret", "dennis", "barbara", "ken", "frances", "edsger"]
+LAST_NAMES = ["lovelace", "turing", "hopper", "torvalds", "hamilton", "ritchie", "liskov", "thompson", "allen", "dijkstra"]
+DOMAINS = ["example.com", "mail.example.org", "corp.example.net"]
+FILL_CHUNK = 500_000
+
+SEARCH_SQL = (
+    f"SELECT * FROM user_search_bench WHERE {SEARCH_DOCUMENT_SQL} LIKE :pattern ESCAPE '\\' "
+    "ORDER BY CASE WHEN lower(nickname) LIKE :prefix ESCAPE '\\' OR lower(email) LIKE :prefix ESCAPE '\\' THEN 0 ELSE 1 END, "
+    "nickname LIMIT :limit"
+)
+AUTOCOMPLETE_SQL = (
+    "SELECT id, nickname FROM ("
+    "(SELECT id, nickname FROM user_search_bench WHERE lower(nickname) COLLATE \"C\" >= :lower "
+    "AND lower(nickname) COLLATE \"C\" < :upper ORDER BY lower(nickname) COLLATE \"C\" LIMIT :limit) UNION "
+    "(SELECT id, nickname FROM user_search_bench WHERE lower(email) COLLATE \"C\" >= :lower "
+    "AND lower(email) COLLATE \"C\" < :upper ORDER BY lower(email) COLLATE \"C\" LIMIT :limit)"
+    ") AS matches ORDER BY nickname LIMIT :limit"
+)
+
+async def fill(conn, rows: int):
+    await conn.execute(text("TRUNCATE user_search_bench"))
+    for start in range(0, rows, FILL_CHUNK):
+        await conn.execute(
+            text(
+                "INSERT INTO user_search_bench (nickname, email, first_name, last_name) "
+                "SELECT (CAST(:adjectives AS text[]))[1 + i % :adjective_count] || '_' || "
+                "(CAST(:animals AS text[]))[1 + (i / :adjective_count) % :animal_count] || '_' || i, "
+                "(CAST(:first_names AS text[]))[1 + i % :name_count] || '.' || i || '@' || "
+                "(CAST(:domains AS text[]))[1 + i % :domain_count], "
+                "initcap((CAST(:first_names AS text[]))[1 + (i / 7) % :name_count]), "
+                "initcap((CAST(:last_names AS text[]))[1 + (i / 13) % :name_count]) "
+                "FROM generate_series(CAST(:start AS bigint), CAST(:stop AS bigint)) AS i"
+            ),
+            {
+                "adjectives": list(ADJECTIVES), "adjective_count": len(ADJECTIVES),
+                "animals": list(ANIMALS), "animal_count": len(ANIMALS),
+                "first_names": FIRST_NAMES, "last_names": LAST_NAMES, "name_count": len(FIRST_NAMES),
+                "domains": DOMAINS, "domain_count": len(DOMAINS),
+                "start": start, "stop": min(rows, start + FILL_CHUNK) - 1,
+            },
+        )
+    await conn.execute(text("ANALYZE user_search_bench"))
+
+async def create_trigram_index(engine) -> bool:
+    try:
+        async with engine.begin() as conn:
+            await conn.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+            await conn.execute(text(
+                f"CREATE INDEX ix_user_search_bench_trgm ON user_search_bench USING gin (({SEARCH_DOCUMENT_SQL}) gin_trgm_ops)"
+            ))
+        return True
+    except DBAPIError as e:
+        print(f"  pg_trgm unavailable, timing search without its index ({str(e.orig).splitlines()[0]})")
+        return False
+
+def search_params(rows: int):
+    term = random.choice([
+        random.choice(LAST_NAMES)[1:5],
+        f"{random.choice(ANIMALS)}_{random.randrange(rows)}",
+        f".{random.randrange(rows)}@",
+    ])
+    return {"pattern": f"%{term}%", "prefix": f"{term}%", "limit": 10}
+
+def autocomplete_params(rows: int):
+    prefix = random.choice([
+        random.choice(ADJECTIVES)[:3],
+        f"{random.choice(ADJECTIVES)}_{random.choice(ANIMALS)[:2]}",
+        f"{random.choice(FIRST_NAMES)}.{random.randrange(rows)}"[:8],
+    ])
+    return {"lower": prefix, "upper": prefix[:-1] + chr(ord(prefix[-1]) + 1), "limit": 10}
+
+async def time_query(engine, sql: str, make_params, rows: int, samples: int):
+    latencies = []
+    statement = text(sql)
+    async with engine.connect() as conn:
+        for _ in range(samples):
+            params = make_params(rows)
+            started = time.perf_counter()
+            (await conn.execute(statement, params)).all()
+            latencies.append((time.perf_counter() - started) * 1000)
+    return latencies
+
+def report(label: str, latencies):
+    print(f"  {label:<13} p50={percentile(latencies, 50):7.2f} ms  p95={percentile(latencies, 95):7.2f} ms  p99={percentile(latencies, 99):7.2f} ms")
+
+async def main(args):
+    engine = create_async_engine(args.database_url)
+    try:
+        for rows in args.rows:
+            async with engine.begin() as conn:
+                await conn.execute(text("DROP TABLE IF EXISTS user_search_bench"))
+                await conn.execute(text(
+                    "CREATE TABLE user_search_bench (id bigserial PRIMARY KEY, nickname varchar(50), "
+                    "email varchar(255), first_name varchar(100), last_name varchar(100))"
+                ))
+                await fill(conn, rows)
+                await conn.execute(text('CREATE INDEX ix_user_search_bench_nickname_prefix ON user_search_bench ((lower(nickname) COLLATE "C"))'))
+                await conn.execute(text('CREATE INDEX ix_user_search_bench_email_prefix ON user_search_bench ((lower(email) COLLATE "C"))'))
+            await create_trigram_index(engine)
+            print(f"{rows:,} users")
+            report("search", await time_query(engine, SEARCH_SQL, search_params, rows, args.samples))
+            report("autocomplete", await time_query(engine, AUTOCOMPLETE_SQL, autocomplete_params, rows, args.samples))
+    finally:
+        async with engine.begin() as conn:
+            await conn.execute(text("DROP TABLE IF EXISTS user_search_bench"))
+        await engine.dispose()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database-url", default=settings.database_url, help="Async SQLAlchemy database URL")
+    parser.add_argument("--rows", type=int, nargs="+", default=[1_000_000, 5_000_000], help="Table sizes to test")
+    parser.add_argument("--samples", type=int, default=200, help="Queries timed per mode and size")
+    asyncio.run(main(parser.parse_args()))
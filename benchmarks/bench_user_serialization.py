@@ -0,0 +1,77 @@
+"""
+Benchmark: serializing a page of users, before and after the orjson fast path.
+
+Both paths start from ORM ``User`` objects (built in memory, no database) and end with the
+encoded response body:
+
+- ``pydantic``: the previous path. ``UserResponse.model_validate`` per row, a ``UserListResponse``,
+  FastAPI's response-model validation and ``jsonable_encoder`` (``serialize_response``), then
+  ``JSONResponse`` rendering with the standard library encoder.
+- ``orjson``: the current path. ``user_list_payload`` builds dicts from the row attributes and
+  ``UserJSONResponse`` encodes them with orjson.
+
+Usage:
+    python -m benchmarks.bench_user_serialization --page-sizes 10 100 --repeat 500
+"""
+import argparse
+import asyncio
+import time
+import uuid
+
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_response_field
+
+from app.models.user_model import User, UserRole
+from app.schemas.pagination_schema import PaginationLink
+from app.schemas.user_schemas import UserListResponse, UserResponse
+from app.utils.nickname_gen import generate_nickname_candidates
+from app.utils.serialization import UserJSONResponse, user_list_payload
+
+RESPONSE_FIELD = create_response_field(name="Response_list_users", type_=UserListResponse)
+
+def make_users(count: int):
+    return [
+        User(
+            id=uuid.uuid4(), nickname=nickname, email=f"{nickname}@example.com", first_name="Ada", last_name="Lovelace",
+            bio="Mathematician and writer, chiefly known for her work on the Analytical Engine.",
+            profile_picture_url="https://example.com/profiles/ada.jpg", linkedin_profile_url="https://linkedin.com/in/ada",
+            github_profile_url="https://github.com/ada", role=UserRole.AUTHENTICATED, is_professional=False,
+        )
+        for nickname in generate_nickname_candidates(count)
+    ]
+
+def make_links(count: int):
+    return [PaginationLink(rel=rel, href=f"http://localhost/users/?skip=0&limit={count}") for rel in ("self", "first", "next")]
+
+async def pydantic_path(users, links) -> bytes:
+    response = UserListResponse(
+        items=[UserResponse.model_validate(user) for user in users],
+        total=1000, page=1, size=len(users), next_cursor=None, prev_cursor=None, links=links,
+    )
+    content = await serialize_response(field=RESPONSE_FIELD, response_content=response, is_coroutine=True)
+    return JSONResponse(content).body
+
+async def orjson_path(users, links) -> bytes:
+    payload = user_list_payload(users, pagination_links=links, total=1000, page=1, next_cursor=None, prev_cursor=None)
+    return UserJSONResponse(payload).body
+
+async def time_path(path, users, links, repeat: int) -> float:
+    await path(users, links)
+    started = time.perf_counter()
+    for _ in range(repeat):
+        await path(users, links)
+    return (time.perf_counter() - started) / repeat * 1_000_000
+
+async def main(args):
+    for size in args.page_sizes:
+        users, links = make_users(size), make_links(size)
+        before = await time_path(pydantic_path, users, links, args.repeat)
+        after = await time_path(orjson_path, users, links, args.repeat)
+        print(f"{size:>4} users/page  pydantic {before:9.1f} us  orjson {after:9.1f} us  speedup {before / after:5.1f}x")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--page-sizes", type=int, nargs="+", default=[1, 10, 100], help="Users per serialized page")
+    parser.add_argument("--repeat", type=int, default=500, help="Serializations timed per path and page size")
+    asyncio.run(main(parser.parse_args()))
@@ -23,19 +23,24 @@ from uuid import uuid4
 import pytest
 from fastapi.testclient import TestClient
 from httpx import AsyncClient
+from sqlalchemy import event
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
 from sqlalchemy.orm import sessionmaker, scoped_session
 from faker import Faker
 
 # Application-specific imports
 from app.main import app
-from app.database import Base, Database
+from app.database import Base, Database, unit_of_work
 from app.models.user_model import User, UserRole
-from app.dependencies import get_db, get_settings
+from app.dependencies import get_db, get_email_service, get_settings
 from app.utils.security import hash_password
+from app.utils.smtp_connection import SMTPClient
 from app.utils.template_manager import TemplateManager
 from app.services.email_service import EmailService
 from app.services.jwt_service import create_access_token
+from app.services.user_cache_service import build_user_cache, set_user_cache
+from app.services.user_service import UserService
+from tests.smtp_stand_in import SMTPStandIn
 
 fake = Faker()
 
@@ -64,6 +69,52 @@ async def async_client(db_session):
         finally:
             app.dependency_overrides.clear()
 
+# http client whose requests each get their own session and unit of work, as in production;
+# for tests that fire requests in parallel or count a request's round trips
+@pytest.fixture(scope="function")
+async def concurrent_async_client(setup_database, email_service):
+    async def get_request_db():
+        async with unit_of_work(AsyncTestingSessionLocal) as session:
+            yield session
+
+    async with AsyncClient(app=app, base_url="http://testserver") as client:
+        app.dependency_overrides[get_db] = get_request_db
+        app.dependency_overrides[get_email_service] = lambda: email_service
+        try:
+            yield client
+        finally:
+            app.dependency_overrides.clear()
+
+class QueryLog(list):
+    """SQL statements sent to the test database; ``round_trips`` also has the BEGIN, COMMIT and ROLLBACK around them."""
+
+    def __init__(self):
+        super().__init__()
+        self.round_trips = []
+
+# records every SQL statement sent to the test database, so tests can assert on round trips
+@pytest.fixture(scope="function")
+def query_counter():
+    log = QueryLog()
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        log.append(statement)
+        log.round_trips.append(statement)
+
+    listeners = {
+        "before_cursor_execute": record,
+        "begin": lambda conn: log.round_trips.append("BEGIN"),
+        "commit": lambda conn: log.round_trips.append("COMMIT"),
+        "rollback": lambda conn: log.round_trips.append("ROLLBACK"),
+    }
+    for name, listener in listeners.items():
+        event.listen(engine.sync_engine, name, listener)
+    try:
+        yield log
+    finally:
+        for name, listener in listeners.items():
+            event.remove(engine.sync_engine, name, listener)
+
 @pytest.fixture(scope="session", autouse=True)
 def initialize_database():
     try:
@@ -76,12 +127,19 @@ def initialize_database():
 async def setup_database():
     async with engine.begin() as conn:
         await conn.run_sync(Base.metadata.create_all)
+    UserService.reset_bootstrap_cache()
+    set_user_cache(build_user_cache(settings.user_cache_backend))
     yield
     async with engine.begin() as conn:
         # you can comment out this line during development if you are debugging a single test
          await conn.run_sync(Base.metadata.drop_all)
     await engine.dispose()
 
+# factory for tests that need sessions of their own, e.g. background workers
+@pytest.fixture(scope="function")
+def session_factory(setup_database):
+    return AsyncTestingSessionLocal
+
 @pytest.fixture(scope="function")
 async def db_session(setup_database):
     async with AsyncSessionScoped() as session:
@@ -227,6 +285,20 @@ def user_token(user):
     token_data = {"sub": str(user.id), "role": user.role.name}
     return create_access_token(data=token_data, expires_delta=timedelta(minutes=30))
 
+# in-process SMTP server for tests of the mail transport
+@pytest.fixture
+async def smtp_server():
+    server = await SMTPStandIn().start()
+    yield server
+    await server.stop()
+
+# email service that sends to the in-process SMTP server
+@pytest.fixture
+def mailer(smtp_server):
+    service = EmailService(template_manager=TemplateManager())
+    service.smtp_client = SMTPClient("127.0.0.1", smtp_server.port, "mailer", "secret", starttls=False, timeout=5)
+    return service
+
 @pytest.fixture
 def email_service():
     if settings.send_real_mail == 'true':
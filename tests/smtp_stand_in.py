@@ -0,0 +1,204 @@
+"""
+In-process SMTP server standing in for the mail provider in tests.
+
+It speaks enough ESMTP for ``app.utils.smtp_connection``: EHLO with PIPELINING, AUTH PLAIN
+or LOGIN and (given a TLS context) STARTTLS, MAIL/RCPT/DATA, RSET, NOOP and QUIT. Accepted
+messages are kept in ``messages``. Switches on the instance script failures:
+
+- ``reject_recipients``: RCPT TO for these addresses is refused with 550.
+- ``drop_after``: the connection is cut after this many messages were accepted on it.
+- ``require_pipelining``: the reply to MAIL FROM is held back until DATA has arrived, so a
+  client waiting for each reply before sending the next command stalls.
+- ``auth_mechanisms``: the AUTH mechanisms advertised and accepted, PLAIN by default.
+"""
+import asyncio
+import base64
+import ssl
+from datetime import datetime, timedelta, timezone
+from typing import List, Optional, Set, Tuple
+
+class SMTPStandIn:
+    def __init__(self, username: str = "mailer", password: str = "secret", tls_context: Optional[ssl.SSLContext] = None):
+        self.username = username
+        self.password = password
+        self.tls_context = tls_context
+        self.messages: List[Tuple[str, List[str], bytes]] = []
+        self.commands: List[str] = []
+        self.connections = 0
+        self.reject_recipients: Set[str] = set()
+        self.drop_after: Optional[int] = None
+        self.require_pipelining = False
+        self.auth_mechanisms = ["PLAIN"]
+        self._server = None
+        self._writers: Set[asyncio.StreamWriter] = set()
+
+    @property
+    def port(self) -> int:
+        return self._server.sockets[0].getsockname()[1]
+
+    async def start(self) -> "SMTPStandIn":
+        self._server = await asyncio.start_server(self._session, "127.0.0.1", 0)
+        return self
+
+    async def stop(self) -> None:
+        self._server.close()
+        for writer in list(self._writers):
+            writer.close()
+        await self._server.wait_closed()
+
+    async def drop_connections(self) -> None:
+        """Cut every open connection, as a server restart or an idle timeout would."""
+        for writer in list(self._writers):
+            writer.close()
+
+    async def _session(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        self.connections += 1
+        self._writers.add(writer)
+        accepted = 0
+        secure = False
+        authenticated = False
+        envelope = None
+
+        def reply(*lines: str) -> None:
+            for line in lines:
+                writer.write(f"{line}\r\n".encode())
+
+        async def readline() -> str:
+            line = await reader.readline()
+            if not line:
+                raise ConnectionResetError
+            return line.decode().rstrip("\r\n")
+
+        try:
+            reply("220 stand-in ESMTP")
+            while True:
+                await writer.drain()
+                line = await readline()
+                verb = line.split(" ", 1)[0].upper()
+                self.commands.append(verb)
+                if verb == "EHLO":
+                    extensions = ["PIPELINING", " ".join(["AUTH", *self.auth_mechanisms])]
+                    if self.tls_context is not None and not secure:
+                        extensions.append("STARTTLS")
+                    reply("250-stand-in", *(f"250-{extension}" for extension in extensions[:-1]), f"250 {extensions[-1]}")
+                elif verb == "STARTTLS":
+                    reply("220 ready for TLS")
+                    await writer.drain()
+                    await writer.start_tls(self.tls_context)
+                    secure = True
+                elif verb == "AUTH":
+                    mechanism = line.split(" ")[1].upper()
+                    if mechanism not in self.auth_mechanisms:
+                        reply("504 unrecognized authentication type")
+                        continue
+                    if mechanism == "LOGIN":
+                        reply("334 VXNlcm5hbWU6")
+                        await writer.drain()
+                        username = base64.b64decode(await readline()).decode()
+                        reply("334 UGFzc3dvcmQ6")
+                        await writer.drain()
+                        password = base64.b64decode(await readline()).decode()
+                    else:
+                        _, username, password = base64.b64decode(line.split(" ")[2]).decode().split("\0")
+                    authenticated = (username, password) == (self.username, self.password)
+                    reply("235 authenticated" if authenticated else "535 bad credentials")
+                elif verb == "MAIL":
+                    if not authenticated:
+                        reply("530 authentication required")
+                        continue
+                    envelope = (line.split(":", 1)[1].strip("<>"), [])
+                    pending = ["250 sender ok"]
+                    if self.require_pipelining:
+                        # Answer nothing until the rest of the group is in.
+                        while True:
+                            line = await readline()
+                            self.commands.append(line.split(" ", 1)[0].upper())
+                            if line.upper() == "DATA":
+                                break
+                            pending.append(self._rcpt(line, envelope))
+                        reply(*pending, "354 end with ." if envelope[1] else "554 no valid recipients")
+                        if envelope[1]:
+                            await self._data(reader, writer, envelope)
+                            accepted += 1
+                        envelope = None
+                    else:
+                        reply(*pending)
+                elif verb == "RCPT":
+                    reply(self._rcpt(line, envelope) if envelope else "503 need MAIL first")
+                elif verb == "DATA":
+                    if not envelope or not envelope[1]:
+                        reply("554 no valid recipients")
+                        continue
+                    reply("354 end with .")
+                    await self._data(reader, writer, envelope)
+                    accepted += 1
+                    envelope = None
+                elif verb == "RSET":
+                    envelope = None
+                    reply("250 reset")
+                elif verb == "NOOP":
+                    reply("250 ok")
+                elif verb == "QUIT":
+                    reply("221 bye")
+                    await writer.drain()
+                    break
+                else:
+                    reply("500 unknown command")
+                if self.drop_after is not None and accepted >= self.drop_after:
+                    await writer.drain()
+                    break
+        except (ConnectionError, ssl.SSLError):
+            pass
+        finally:
+            self._writers.discard(writer)
+            writer.close()
+
+    def _rcpt(self, line: str, envelope) -> str:
+        recipient = line.split(":", 1)[1].strip("<>")
+        if recipient in self.reject_recipients:
+            return "550 no such user"
+        envelope[1].append(recipient)
+        return "250 recipient ok"
+
+    async def _data(self, reader, writer, envelope) -> None:
+        lines = []
+        while True:
+            line = await reader.readline()
+            if not line:
+                raise ConnectionResetError
+            if line == b".\r\n":
+                break
+            lines.append(line[1:] if line.startswith(b"..") else line)
+        self.messages.append((envelope[0], envelope[1], b"".join(lines)))
+        writer.write(b"250 queued\r\n")
+
+def self_signed_contexts() -> Tuple[ssl.SSLContext, ssl.SSLContext]:
+    """A server TLS context with a throwaway certificate for 127.0.0.1, and a client context trusting it."""
+    import ipaddress
+    import tempfile
+    from cryptography import x509
+    from cryptography.hazmat.primitives import hashes, serialization
+    from cryptography.hazmat.primitives.asymmetric import ec
+    from cryptography.x509.oid import NameOID
+
+    key = ec.generate_private_key(ec.SECP256R1())
+    name = x509.Name([x509.NameAttribute(NameOID.COMMON_NAME, "127.0.0.1")])
+    now = datetime.now(timezone.utc)
+    certificate = (
+        x509.CertificateBuilder().subject_name(name).issuer_name(name).public_key(key.public_key())
+        .serial_number(x509.random_serial_number()).not_valid_before(now - timedelta(minutes=1))
+        .not_valid_after(now + timedelta(hours=1))
+        .add_extension(x509.SubjectAlternativeName([x509.IPAddress(ipaddress.ip_address("127.0.0.1"))]), critical=False)
+        .sign(key, hashes.SHA256())
+    )
+    cert_pem = certificate.public_bytes(serialization.Encoding.PEM)
+    key_pem = key.private_bytes(serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8, serialization.NoEncryption())
+    with tempfile.NamedTemporaryFile(suffix=".pem") as cert_file, tempfile.NamedTemporaryFile(suffix=".pem") as key_file:
+        cert_file.write(cert_pem)
+        cert_file.flush()
+        key_file.write(key_pem)
+        key_file.flush()
+        server = ssl.create_default_context(ssl.Purpose.CLIENT_AUTH)
+        server.load_cert_chain(cert_file.name, key_file.name)
+    client = ssl.create_default_context(cadata=cert_pem.decode())
+    return server, client
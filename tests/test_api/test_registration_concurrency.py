@@ -0,0 +1,65 @@
+from builtins import len, range
+import asyncio
+from itertools import count
+import pytest
+from sqlalchemy import func, select
+from app.models.user_model import User, UserRole
+from app.utils.password_policy import PasswordHashPolicy, get_password_policy, set_password_policy
+
+UNIQUE_SIGNUPS = 150
+DUPLICATE_SIGNUPS = 50
+
+@pytest.fixture
+def cheap_password_policy():
+    original = get_password_policy()
+    set_password_policy(PasswordHashPolicy(bcrypt_rounds=4))
+    yield
+    set_password_policy(original)
+
+@pytest.fixture
+def sequential_nicknames(mocker):
+    numbers = count()
+    mocker.patch(
+        "app.services.user_service.generate_nickname_candidates",
+        side_effect=lambda size: [f"user_{next(numbers)}" for _ in range(size)],
+    )
+
+@pytest.mark.asyncio
+async def test_parallel_registrations_are_single_statement_and_race_free(
+    concurrent_async_client, db_session, query_counter, cheap_password_policy, sequential_nicknames
+):
+    emails = [f"signup_{i}@example.com" for i in range(UNIQUE_SIGNUPS)]
+    # Every duplicate races against the original signup for the same email.
+    payloads = [{"email": email, "password": "MySuperPassword$1234", "role": "AUTHENTICATED"} for email in emails]
+    payloads += [{"email": emails[i], "password": "MySuperPassword$1234", "role": "AUTHENTICATED"} for i in range(DUPLICATE_SIGNUPS)]
+
+    responses = await asyncio.gather(*(concurrent_async_client.post("/register/", json=payload) for payload in payloads))
+
+    status_codes = [response.status_code for response in responses]
+    assert status_codes.count(200) == UNIQUE_SIGNUPS
+    assert status_codes.count(400) == DUPLICATE_SIGNUPS
+    assert {response.json()["email"] for response in responses if response.status_code == 200} == set(emails)
+
+    inserts = [statement for statement in query_counter if statement.startswith("INSERT INTO users")]
+    email_lookups = [statement for statement in query_counter if "users.email =" in statement]
+    assert len(inserts) == len(payloads), "Each signup should be exactly one INSERT"
+    assert len(email_lookups) == DUPLICATE_SIGNUPS, "Only rejected signups should need a follow-up lookup"
+
+    result = await db_session.execute(select(func.count()).select_from(User))
+    assert result.scalar() == UNIQUE_SIGNUPS
+    result = await db_session.execute(select(func.count()).select_from(User).where(User.role == UserRole.ADMIN))
+    assert result.scalar() == 1, "Racing first signups must produce exactly one ADMIN"
+
+@pytest.mark.asyncio
+async def test_registration_skips_bootstrap_check_once_bootstrapped(
+    concurrent_async_client, query_counter, cheap_password_policy, sequential_nicknames
+):
+    await concurrent_async_client.post("/register/", json={"email": "first@example.com", "password": "MySuperPassword$1234", "role": "AUTHENTICATED"})
+    query_counter.clear()
+
+    response = await concurrent_async_client.post("/register/", json={"email": "second@example.com", "password": "MySuperPassword$1234", "role": "AUTHENTICATED"})
+
+    assert response.status_code == 200
+    assert response.json()["role"] == UserRole.ANONYMOUS.name
+    assert len(query_counter) == 2 and query_counter[0].startswith("INSERT INTO users"), "A bootstrapped signup should be a single INSERT"
+    assert query_counter[1].startswith("INSERT INTO email_outbox"), "The verification email is queued in the same transaction"
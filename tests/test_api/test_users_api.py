@@ -1,10 +1,16 @@
 from builtins import str
 import pytest
 from httpx import AsyncClient
+from uuid import uuid4
+from sqlalchemy import select
+from app.database import Database
 from app.main import app
+from app.models.email_outbox_model import EmailOutbox, OutboxStatus
 from app.models.user_model import User, UserRole
 from app.utils.nickname_gen import generate_nickname
 from app.utils.security import hash_password
+from app.utils.cursor import NEXT, Cursor, encode_cursor
+from app.services.user_service import UserService
 from app.services.jwt_service import decode_token  # Import your FastAPI app
 
 # Example of a test function using the async_client fixture
@@ -36,6 +42,25 @@ async def test_retrieve_user_access_allowed(async_client, admin_user, admin_toke
     assert response.status_code == 200
     assert response.json()["id"] == str(admin_user.id)
 
+@pytest.mark.asyncio
+async def test_token_resolved_once_per_request_and_verified_once(async_client, admin_user, admin_token, mocker):
+    import jwt
+    from app import dependencies
+    from app.services.jwt_service import verified_tokens
+    verified_tokens.clear()
+    resolve_spy = mocker.spy(dependencies, "decode_token")
+    verify_spy = mocker.spy(jwt, "decode")
+    headers = {"Authorization": f"Bearer {admin_token}"}
+    for _ in range(2):
+        response = await async_client.get(f"/users/{admin_user.id}", headers=headers)
+        assert response.status_code == 200
+    assert resolve_spy.call_count == 2 and verify_spy.call_count == 1
+
+@pytest.mark.asyncio
+async def test_invalid_token_rejected(async_client, admin_user):
+    response = await async_client.get(f"/users/{admin_user.id}", headers={"Authorization": "Bearer not-a-token"})
+    assert response.status_code == 401
+
 @pytest.mark.asyncio
 async def test_update_user_email_access_denied(async_client, verified_user, user_token):
     updated_data = {"email": f"updated_{verified_user.id}@example.com"}
@@ -72,6 +97,18 @@ async def test_create_user_duplicate_email(async_client, verified_user):
     assert response.status_code == 400
     assert "Email already exists" in response.json().get("detail", "")
 
+@pytest.mark.asyncio
+async def test_register_when_nicknames_run_out_is_retryable(async_client, verified_user, mocker):
+    mocker.patch("app.services.user_service.generate_nickname_candidates", return_value=[verified_user.nickname])
+    user_data = {
+        "email": "no_nickname@example.com",
+        "password": "AnotherPassword123!",
+        "role": UserRole.AUTHENTICATED.name
+    }
+    response = await async_client.post("/register/", json=user_data)
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "1"
+
 @pytest.mark.asyncio
 async def test_create_user_invalid_email(async_client):
     user_data = {
@@ -236,4 +273,331 @@ async def test_reset_user_password_as_admin(async_client, admin_token, verified_
     token = login_response.json()["access_token"]
     decoded_token = decode_token(token)
     assert decoded_token is not None, "The access token should be decodable"
-    assert decoded_token["sub"] == str(verified_user.id), "The token's subject should match the user's ID"
\ No newline at end of file
+    assert decoded_token["sub"] == str(verified_user.id), "The token's subject should match the user's ID"
+@pytest.mark.asyncio
+async def test_list_users_cursor_pagination(async_client, admin_token, users_with_same_role_50_users):
+    headers = {"Authorization": f"Bearer {admin_token}"}
+    response = await async_client.get("/users/", params={"limit": 20}, headers=headers)
+    assert response.status_code == 200
+    first_page = response.json()
+    assert first_page["page"] == 1
+    assert first_page["next_cursor"] is not None
+    assert first_page["prev_cursor"] is None
+
+    response = await async_client.get("/users/", params={"limit": 20, "cursor": first_page["next_cursor"]}, headers=headers)
+    assert response.status_code == 200
+    second_page = response.json()
+    assert second_page["page"] is None
+    assert {item["id"] for item in first_page["items"]}.isdisjoint(item["id"] for item in second_page["items"])
+    rels = {link["rel"]: link["href"] for link in second_page["links"]}
+    assert "cursor=" in rels["next"] and "cursor=" in rels["prev"]
+
+    response = await async_client.get("/users/", params={"limit": 20, "cursor": second_page["prev_cursor"]}, headers=headers)
+    assert [item["id"] for item in response.json()["items"]] == [item["id"] for item in first_page["items"]]
+
+@pytest.mark.asyncio
+async def test_list_users_limit_is_capped(async_client, admin_token, users_with_same_role_50_users, mocker):
+    mocker.patch("app.routers.user_routes.settings.max_page_size", 25)
+    response = await async_client.get("/users/", params={"limit": 1000}, headers={"Authorization": f"Bearer {admin_token}"})
+    assert response.status_code == 200
+    assert response.json()["size"] == 25
+
+@pytest.mark.asyncio
+async def test_list_users_invalid_cursor(async_client, admin_token):
+    response = await async_client.get("/users/", params={"cursor": "not-a-cursor"}, headers={"Authorization": f"Bearer {admin_token}"})
+    assert response.status_code == 400
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("sort, key", [("created_at", [[1, 2], 3]), ("email", [42])])
+async def test_list_users_cursor_with_mistyped_key(async_client, admin_token, sort, key):
+    cursor = encode_cursor(Cursor(key=tuple(key), direction=NEXT, sort=sort))
+    response = await async_client.get("/users/", params={"cursor": cursor, "sort": sort}, headers={"Authorization": f"Bearer {admin_token}"})
+    assert response.status_code == 400
+
+@pytest.mark.asyncio
+async def test_list_users_without_total(async_client, admin_token, users_with_same_role_50_users):
+    response = await async_client.get("/users/", params={"include_total": "false"}, headers={"Authorization": f"Bearer {admin_token}"})
+    assert response.status_code == 200
+    body = response.json()
+    assert body["total"] is None
+    assert body["next_cursor"] is not None
+    assert "last" not in {link["rel"] for link in body["links"]}
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("stale_total", [5, 1000])
+async def test_list_users_next_page_ignores_stale_total(async_client, admin_token, users_with_same_role_50_users, mocker, stale_total):
+    mocker.patch("app.routers.user_routes.get_user_count_strategy").return_value.count = mocker.AsyncMock(return_value=stale_total)
+    headers = {"Authorization": f"Bearer {admin_token}"}
+    url, seen = "/users/?limit=10", []
+    while url:
+        response = await async_client.get(url, headers=headers)
+        body = response.json()
+        assert body["total"] == stale_total
+        assert body["items"], "no link should lead to an empty page"
+        seen += [item["id"] for item in body["items"]]
+        url = next((link["href"] for link in body["links"] if link["rel"] == "next"), None)
+    assert len(seen) == len(set(seen)) == 51  # the 50 users and the admin
+
+@pytest.mark.asyncio
+async def test_list_users_filtered_and_sorted(async_client, admin_token, users_with_same_role_50_users):
+    headers = {"Authorization": f"Bearer {admin_token}"}
+    response = await async_client.get("/users/", params={"role": "AUTHENTICATED", "sort": "-nickname", "limit": 10}, headers=headers)
+    assert response.status_code == 200
+    body = response.json()
+    assert body["total"] == 50
+    nicknames = [item["nickname"] for item in body["items"]]
+    assert nicknames == sorted(nicknames, reverse=True)
+    next_link = next(link["href"] for link in body["links"] if link["rel"] == "next")
+    assert "role=AUTHENTICATED" in next_link and "sort=-nickname" in next_link
+
+    response = await async_client.get(next_link, headers=headers)
+    assert response.status_code == 200
+    assert response.json()["items"][0]["nickname"] < nicknames[-1]
+
+@pytest.mark.asyncio
+async def test_list_users_rejects_unknown_sort(async_client, admin_token):
+    response = await async_client.get("/users/", params={"sort": "hashed_password"}, headers={"Authorization": f"Bearer {admin_token}"})
+    assert response.status_code == 422
+
+@pytest.mark.asyncio
+async def test_search_users_endpoint(async_client, admin_token, verified_user):
+    headers = {"Authorization": f"Bearer {admin_token}"}
+    response = await async_client.get("/users/search", params={"q": verified_user.email[:5].upper()}, headers=headers)
+    assert response.status_code == 200
+    assert str(verified_user.id) in [item["id"] for item in response.json()["items"]]
+    response = await async_client.get("/users/search", params={"q": "ab"}, headers=headers)
+    assert response.status_code == 422
+
+@pytest.mark.asyncio
+async def test_autocomplete_users_endpoint(async_client, admin_token, verified_user):
+    headers = {"Authorization": f"Bearer {admin_token}"}
+    response = await async_client.get("/users/autocomplete", params={"q": verified_user.nickname[:2]}, headers=headers)
+    assert response.status_code == 200
+    assert {"id": str(verified_user.id), "nickname": verified_user.nickname} in response.json()["items"]
+    response = await async_client.get("/users/autocomplete", params={"q": "a", "limit": 1000}, headers=headers)
+    assert response.status_code == 422
+
+@pytest.mark.asyncio
+async def test_search_users_unauthorized(async_client, user_token):
+    response = await async_client.get("/users/search", params={"q": "example"}, headers={"Authorization": f"Bearer {user_token}"})
+    assert response.status_code == 403
+
+@pytest.mark.asyncio
+async def test_get_user_sparse_fields(async_client, admin_token, verified_user):
+    headers = {"Authorization": f"Bearer {admin_token}"}
+    response = await async_client.get(f"/users/{verified_user.id}", params={"fields": "email,nickname", "links": "false"}, headers=headers)
+    assert response.status_code == 200
+    assert response.json() == {"id": str(verified_user.id), "email": verified_user.email, "nickname": verified_user.nickname}
+
+@pytest.mark.asyncio
+async def test_list_users_sparse_fields(async_client, admin_token, users_with_same_role_50_users):
+    response = await async_client.get("/users/", params={"fields": "nickname", "limit": 5}, headers={"Authorization": f"Bearer {admin_token}"})
+    assert response.status_code == 200
+    body = response.json()
+    assert len(body["items"]) == 5
+    assert all(set(item) == {"id", "nickname", "links"} for item in body["items"])
+    assert body["next_cursor"] is not None
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("fields", ["hashed_password", "email,bogus", ","])
+async def test_get_user_rejects_unknown_fields(async_client, admin_token, verified_user, fields):
+    response = await async_client.get(f"/users/{verified_user.id}", params={"fields": fields}, headers={"Authorization": f"Bearer {admin_token}"})
+    assert response.status_code == 400
+
+@pytest.mark.asyncio
+async def test_get_user_links(async_client, admin_token, verified_user):
+    headers = {"Authorization": f"Bearer {admin_token}"}
+    response = await async_client.get(f"/users/{verified_user.id}", headers=headers)
+    assert response.status_code == 200
+    links = {link["rel"]: link["href"] for link in response.json()["links"]}
+    assert links == {rel: f"http://testserver/users/{verified_user.id}" for rel in ("self", "update", "delete")}
+
+    response = await async_client.get(f"/users/{verified_user.id}", params={"links": "false"}, headers=headers)
+    assert "links" not in response.json()
+
+@pytest.mark.asyncio
+async def test_list_users_without_links(async_client, admin_token, users_with_same_role_50_users):
+    response = await async_client.get("/users/", params={"links": "false", "limit": 5}, headers={"Authorization": f"Bearer {admin_token}"})
+    assert response.status_code == 200
+    body = response.json()
+    assert "links" not in body
+    assert all("links" not in item for item in body["items"])
+    assert body["next_cursor"] is not None
+
+@pytest.mark.asyncio
+async def test_get_user_conditional(async_client, admin_token, verified_user, query_counter):
+    headers = {"Authorization": f"Bearer {admin_token}"}
+    response = await async_client.get(f"/users/{verified_user.id}", headers=headers)
+    etag = response.headers["ETag"]
+
+    query_counter.clear()
+    response = await async_client.get(f"/users/{verified_user.id}", headers={**headers, "If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.headers["ETag"] == etag and response.content == b""
+    user_reads = [statement for statement in query_counter if "FROM users" in statement]
+    assert len(user_reads) == 1 and "users.email" not in user_reads[0]
+
+    response = await async_client.put(f"/users/{verified_user.id}", json={"bio": "Changed"}, headers={**headers, "If-Match": etag})
+    assert response.status_code == 200
+    new_etag = response.headers["ETag"]
+    assert new_etag != etag
+
+    response = await async_client.get(f"/users/{verified_user.id}", headers={**headers, "If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["ETag"] == new_etag and response.json()["bio"] == "Changed"
+
+@pytest.mark.asyncio
+async def test_update_user_if_match_rejects_stale_etag(async_client, admin_token, verified_user):
+    headers = {"Authorization": f"Bearer {admin_token}"}
+    etag = (await async_client.get(f"/users/{verified_user.id}", headers=headers)).headers["ETag"]
+    assert (await async_client.put(f"/users/{verified_user.id}", json={"bio": "First"}, headers={**headers, "If-Match": etag})).status_code == 200
+
+    response = await async_client.put(f"/users/{verified_user.id}", json={"bio": "Second"}, headers={**headers, "If-Match": etag})
+    assert response.status_code == 412
+    assert (await async_client.get(f"/users/{verified_user.id}", headers=headers)).json()["bio"] == "First"
+
+@pytest.mark.asyncio
+async def test_list_users_conditional(async_client, admin_token, users_with_same_role_50_users):
+    headers = {"Authorization": f"Bearer {admin_token}"}
+    response = await async_client.get("/users/", params={"limit": 5}, headers=headers)
+    etag = response.headers["ETag"]
+    first_id = response.json()["items"][0]["id"]
+
+    response = await async_client.get("/users/", params={"limit": 5}, headers={**headers, "If-None-Match": etag})
+    assert response.status_code == 304
+
+    await async_client.put(f"/users/{first_id}", json={"bio": "Changed"}, headers=headers)
+    response = await async_client.get("/users/", params={"limit": 5}, headers={**headers, "If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["ETag"] != etag
+
+@pytest.mark.asyncio
+async def test_email_outbox_stats(async_client, admin_token, user_token, user):
+    user_data = {"email": "outboxed@example.com", "password": "AnotherPassword123!", "role": UserRole.AUTHENTICATED.name}
+    assert (await async_client.post("/register/", json=user_data)).status_code == 200
+    response = await async_client.get("/email-outbox/stats", headers={"Authorization": f"Bearer {admin_token}"})
+    assert response.status_code == 200
+    assert response.json()["pending"] == 1 and response.json()["dead"] == 0
+    response = await async_client.get("/email-outbox/stats", headers={"Authorization": f"Bearer {user_token}"})
+    assert response.status_code == 403
+
+@pytest.mark.asyncio
+async def test_retry_dead_emails_wakes_workers_after_commit(concurrent_async_client, admin_token, session_factory, mocker):
+    async with session_factory() as session:
+        session.add(EmailOutbox(email_type="email_verification", recipient="dead@example.com", context={}, status=OutboxStatus.DEAD))
+        await session.commit()
+    pending_at_wake = []
+
+    async def wake():
+        async with session_factory() as session:
+            pending_at_wake.append((await session.execute(select(EmailOutbox.status))).scalar_one())
+
+    mocker.patch("app.services.email_outbox_service.wake_outbox_workers", wake)
+    response = await concurrent_async_client.post("/email-outbox/retry-dead", headers={"Authorization": f"Bearer {admin_token}"})
+    assert response.status_code == 200 and response.json() == 1
+    assert pending_at_wake == [OutboxStatus.PENDING]
+
+@pytest.mark.asyncio
+async def test_resend_verification_emails(async_client, admin_token, manager_token, user, verified_user, session_factory):
+    response = await async_client.post("/users/resend-verification?role=AUTHENTICATED", headers={"Authorization": f"Bearer {admin_token}"})
+    assert response.status_code == 202
+    assert response.json() == {"queued": 1}
+    async with session_factory() as session:
+        queued = (await session.execute(select(EmailOutbox.recipient))).scalars().all()
+    assert queued == [user.email]
+    response = await async_client.post("/users/resend-verification", headers={"Authorization": f"Bearer {manager_token}"})
+    assert response.status_code == 403
+
+@pytest.mark.asyncio
+async def test_user_emails_show_delivery_status(async_client, admin_token, manager_token, user, verified_user):
+    headers = {"Authorization": f"Bearer {admin_token}"}
+    assert (await async_client.post("/users/resend-verification?role=AUTHENTICATED", headers=headers)).status_code == 202
+    response = await async_client.get(f"/users/{user.id}/emails", headers=headers)
+    assert response.status_code == 200
+    [email] = response.json()["items"]
+    assert (email["email_type"], email["recipient"], email["status"], email["sent_at"]) == ("email_verification", user.email, "PENDING", None)
+    response = await async_client.get(f"/users/{verified_user.id}/emails", headers=headers)
+    assert response.json() == {"items": []}
+    response = await async_client.get(f"/users/{user.id}/emails", headers={"Authorization": f"Bearer {manager_token}"})
+    assert response.status_code == 403
+
+@pytest.mark.asyncio
+async def test_database_pool_stats(async_client, admin_token, user_token):
+    response = await async_client.get("/database/pool", headers={"Authorization": f"Bearer {admin_token}"})
+    assert response.status_code == 200
+    body = response.json()
+    assert body["size"] == Database.get_engine().pool.size() and body["timeouts"] == 0
+    assert body["wait_histogram"]["+Inf"] == body["checkouts"]
+    response = await async_client.get("/database/pool", headers={"Authorization": f"Bearer {user_token}"})
+    assert response.status_code == 403
+
+@pytest.mark.asyncio
+async def test_user_cache_stats(async_client, admin_token, user_token, verified_user, session_factory):
+    for _ in range(2):
+        async with session_factory() as session:
+            assert await UserService.get_by_id(session, verified_user.id) is not None
+    response = await async_client.get("/user-cache/stats", headers={"Authorization": f"Bearer {admin_token}"})
+    assert response.status_code == 200
+    body = response.json()
+    assert body["hits"] >= 1 and body["misses"] >= 1 and 0 < body["hit_ratio"] < 1
+    response = await async_client.get("/user-cache/stats", headers={"Authorization": f"Bearer {user_token}"})
+    assert response.status_code == 403
+
+@pytest.mark.asyncio
+async def test_user_cache_stats_when_caching_is_off(async_client, admin_token, mocker):
+    mocker.patch("app.routers.user_routes.get_user_cache", return_value=None)
+    response = await async_client.get("/user-cache/stats", headers={"Authorization": f"Bearer {admin_token}"})
+    assert response.status_code == 404
+
+@pytest.mark.asyncio
+async def test_read_request_runs_in_one_transaction(concurrent_async_client, admin_token, users_with_same_role_50_users, query_counter):
+    response = await concurrent_async_client.get("/users/", params={"limit": 5}, headers={"Authorization": f"Bearer {admin_token}"})
+    assert response.status_code == 200
+    trips = query_counter.round_trips
+    # One transaction around the count and the page, and no COMMIT after each SELECT.
+    assert trips[0] == "BEGIN" and trips[-1] == "COMMIT"
+    assert trips.count("BEGIN") == trips.count("COMMIT") == 1
+    assert len(trips) == 4
+
+@pytest.mark.asyncio
+async def test_write_request_commits_once(concurrent_async_client, admin_token, verified_user, query_counter):
+    response = await concurrent_async_client.put(f"/users/{verified_user.id}", json={"bio": "Committed once"}, headers={"Authorization": f"Bearer {admin_token}"})
+    assert response.status_code == 200 and response.json()["bio"] == "Committed once"
+    trips = query_counter.round_trips
+    assert trips.count("BEGIN") == trips.count("COMMIT") == 1 and trips[-1] == "COMMIT"
+
+@pytest.mark.asyncio
+async def test_update_to_a_taken_email_is_a_conflict(concurrent_async_client, admin_token, admin_user, verified_user):
+    headers = {"Authorization": f"Bearer {admin_token}"}
+    response = await concurrent_async_client.put(f"/users/{verified_user.id}", json={"email": admin_user.email}, headers=headers)
+    assert response.status_code == 409
+    response = await concurrent_async_client.put(f"/users/{verified_user.id}/profile", json={"email": admin_user.email}, headers=headers)
+    assert response.status_code == 409
+    response = await concurrent_async_client.get(f"/users/{verified_user.id}", headers=headers)
+    assert response.json()["email"] == verified_user.email
+
+@pytest.mark.asyncio
+async def test_failed_login_is_committed_despite_the_error_response(concurrent_async_client, verified_user, db_session):
+    response = await concurrent_async_client.post("/login/", data=urlencode({"username": verified_user.email, "password": "WrongPassword123!"}),
+                                                  headers={"Content-Type": "application/x-www-form-urlencoded"})
+    assert response.status_code == 401
+    await db_session.refresh(verified_user)
+    assert verified_user.failed_login_attempts == 1
+
+@pytest.mark.asyncio
+async def test_update_is_a_single_update_returning(concurrent_async_client, admin_token, verified_user, query_counter):
+    response = await concurrent_async_client.put(f"/users/{verified_user.id}", json={"first_name": "Returned"}, headers={"Authorization": f"Bearer {admin_token}"})
+    assert response.status_code == 200 and response.json()["first_name"] == "Returned"
+    trips = query_counter.round_trips
+    assert trips[0] == "BEGIN" and trips[2] == "COMMIT" and len(trips) == 3
+    assert trips[1].startswith("UPDATE users") and "RETURNING" in trips[1]
+
+@pytest.mark.asyncio
+async def test_upgrade_to_professional_status(async_client, admin_token, verified_user, db_session):
+    headers = {"Authorization": f"Bearer {admin_token}"}
+    response = await async_client.post(f"/users/{verified_user.id}/professional-status", headers=headers)
+    assert response.status_code == 200 and response.json() is True
+    await db_session.refresh(verified_user)
+    assert verified_user.is_professional and verified_user.professional_status_updated_at is not None
+    response = await async_client.post(f"/users/{uuid4()}/professional-status", headers=headers)
+    assert response.status_code == 404
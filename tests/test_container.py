@@ -0,0 +1,47 @@
+import pytest
+from app.container import ServiceContainer, get_container, set_container
+from app.dependencies import get_email_service, get_settings
+from app.main import app, lifespan
+from app.services import user_service
+from app.services.change_notification_service import get_change_bus
+from app.services.email_outbox_service import get_outbox_workers
+from app.services.jwt_service import create_access_token, decode_token, verified_tokens
+from settings.config import reload_settings, settings
+
+@pytest.fixture
+def restore_settings(monkeypatch):
+    yield monkeypatch
+    monkeypatch.undo()
+    reload_settings()
+
+def test_services_are_built_once():
+    assert get_settings() is get_settings() is settings
+    assert get_email_service() is get_email_service()
+    assert get_email_service().template_manager is get_container().template_manager
+
+def test_reload_settings_updates_every_holder(restore_settings):
+    restore_settings.setenv("MAX_LOGIN_ATTEMPTS", "7")
+    assert reload_settings() is settings
+    assert settings.max_login_attempts == 7
+    assert user_service.settings.max_login_attempts == 7 and get_settings().max_login_attempts == 7
+
+async def test_container_reload_rebuilds_dependents(restore_settings):
+    container = get_container()
+    email_service = container.email_service
+    token = create_access_token(data={"sub": "someone", "role": "admin"})
+    assert decode_token(token) is not None
+    restore_settings.setenv("SMTP_SERVER", "smtp.example.com")
+    restore_settings.setenv("JWT_SECRET_KEY", "a_rotated_secret_key")
+    await container.reload_settings()
+    assert container.email_service is not email_service
+    assert container.email_service.smtp_client.server == "smtp.example.com"
+    assert len(verified_tokens) == 0 and decode_token(token) is None
+
+async def test_lifespan_builds_and_closes_the_container():
+    async with lifespan(app):
+        container = app.state.container
+        assert isinstance(container, ServiceContainer) and get_container() is container
+        assert get_change_bus() is not None and get_outbox_workers() is not None
+    assert get_change_bus() is None and get_outbox_workers() is None
+    assert get_container() is not container
+    set_container(None)
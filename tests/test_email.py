@@ -1,6 +1,10 @@
+import time
 import pytest
 from app.services.email_service import EmailService
+from app.utils.rate_limiter import RateLimiter
+from app.utils.smtp_connection import SMTPClient, SMTPError
 from app.utils.template_manager import TemplateManager
+from settings.config import settings
 
     
 @pytest.mark.asyncio
@@ -19,3 +23,44 @@ async def test_send_verification_email(email_service):
         "verification_url": "http://example.com/verify?token=abc123"
     }
     await email_service.send_verification_email(user_data, 'email_verification')
+
+@pytest.fixture
+def bulk_mailer(smtp_server, monkeypatch):
+    monkeypatch.setattr(settings, "email_bulk_batch_size", 10)
+    service = EmailService(template_manager=TemplateManager())
+    service.smtp_client = SMTPClient("127.0.0.1", smtp_server.port, "mailer", "secret", pool_size=2, starttls=False, timeout=5)
+    return service
+
+def recipients(count):
+    return [{"name": f"User {i}", "verification_url": f"http://example.com/verify/{i}", "email": f"user{i}@example.com"} for i in range(count)]
+
+async def test_send_bulk_shares_connections(bulk_mailer, smtp_server):
+    results = await bulk_mailer.send_bulk('email_verification', recipients(45))
+    assert results == [None] * 45
+    assert sorted(recipient for _, [recipient], _ in smtp_server.messages) == sorted(f"user{i}@example.com" for i in range(45))
+    assert smtp_server.connections == 2
+    assert b"http://example.com/verify/7" in next(data for _, [to], data in smtp_server.messages if to == "user7@example.com")
+
+async def test_send_bulk_reports_each_recipient(bulk_mailer, smtp_server):
+    smtp_server.reject_recipients = {"user3@example.com"}
+    results = await bulk_mailer.send_bulk('email_verification', recipients(5))
+    assert [error is None for error in results] == [True, True, True, False, True]
+    assert results[3].code == 550
+
+async def test_send_bulk_respects_the_rate_limit(bulk_mailer, smtp_server):
+    bulk_mailer.smtp_client.rate_limiter = RateLimiter(rate=100, burst=1)
+    started = time.monotonic()
+    assert await bulk_mailer.send_bulk('email_verification', recipients(11)) == [None] * 11
+    assert time.monotonic() - started >= 0.09
+
+async def test_send_bulk_without_smtp_fails_every_recipient():
+    service = EmailService(template_manager=TemplateManager())
+    service.smtp_client = None
+    assert all(isinstance(error, SMTPError) for error in await service.send_bulk('email_verification', recipients(2)))
+
+def test_rate_limit_is_shared_between_processes(monkeypatch):
+    monkeypatch.setattr(settings, "smtp_rate_limit_per_second", 20)
+    monkeypatch.setattr(settings, "smtp_rate_limit_burst", 8)
+    monkeypatch.setattr(settings, "smtp_rate_limit_processes", 4)
+    limiter = EmailService(template_manager=TemplateManager()).smtp_client.rate_limiter
+    assert (limiter.rate, limiter.burst) == (5, 2)
@@ -0,0 +1,35 @@
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+from uuid import uuid4
+import pytest
+from app.utils.etag import etag_matches, page_etag, user_etag
+
+UPDATED_AT = datetime(2024, 4, 21, 9, 51, 44, 977108, tzinfo=timezone.utc)
+
+def test_user_etag_tracks_version():
+    user_id = uuid4()
+    etag = user_etag(user_id, UPDATED_AT)
+    assert etag.startswith('"') and etag.endswith('"')
+    assert etag == user_etag(user_id, UPDATED_AT)
+    assert etag != user_etag(user_id, UPDATED_AT + timedelta(microseconds=1))
+    assert etag != user_etag(uuid4(), UPDATED_AT)
+
+def test_page_etag_covers_rows_and_state():
+    users = [SimpleNamespace(id=uuid4(), updated_at=UPDATED_AT) for _ in range(3)]
+    etag = page_etag(users, 3, False, False)
+    assert etag == page_etag(list(users), 3, False, False)
+    assert etag != page_etag(users[:2], 3, False, False)
+    assert etag != page_etag(users, 4, False, False)
+    assert etag != page_etag(users, 3, True, False)
+    assert etag != page_etag(users[::-1], 3, False, False)
+
+@pytest.mark.parametrize("header, weak, expected", [
+    ('"abc"', False, True),
+    ('"xyz", "abc"', False, True),
+    ('"xyz"', False, False),
+    ("*", False, True),
+    ('W/"abc"', False, False),
+    ('W/"abc"', True, True),
+])
+def test_etag_matches(header, weak, expected):
+    assert etag_matches(header, '"abc"', weak=weak) is expected
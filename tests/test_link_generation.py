@@ -1,4 +1,5 @@
-from builtins import len, max, sorted, str
+from builtins import ValueError, len, max, sorted, str, zip
+from datetime import datetime, timezone
 from unittest.mock import MagicMock
 from urllib.parse import parse_qs, urlparse, parse_qsl, urlunparse, urlencode
 from uuid import uuid4
@@ -6,7 +7,9 @@ from uuid import uuid4
 import pytest
 from fastapi import Request
 
-from app.utils.link_generation import create_link, create_pagination_link, create_user_links, generate_pagination_links
+from app.utils.cursor import PREV, Cursor, decode_cursor, encode_cursor
+from app.main import app
+from app.utils.link_generation import create_link, create_pagination_link, create_user_links, generate_pagination_links, user_link_builder
 
 from urllib.parse import urlparse, parse_qs, urlunparse, urlencode
 
@@ -33,13 +36,30 @@ def test_create_link():
     link = create_link("self", "http://example.com", "GET", "view")
     assert normalize_url(str(link.href)) == "http://example.com"
 
-def test_create_user_links(mock_request):
+@pytest.fixture
+def app_request():
+    app.state.user_link_templates = None
+    return Request({
+        "type": "http", "app": app, "router": app.router, "scheme": "http", "server": ("testserver", 80),
+        "root_path": "", "path": "/users/", "query_string": b"", "headers": [],
+    })
+
+def test_create_user_links(app_request):
     user_id = uuid4()
-    links = create_user_links(user_id, mock_request)
+    links = create_user_links(user_id, app_request)
     assert len(links) == 3
-    assert normalize_url(str(links[0].href)) == f"http://testserver/get_user/{user_id}"
-    assert normalize_url(str(links[1].href)) == f"http://testserver/update_user/{user_id}"
-    assert normalize_url(str(links[2].href)) == f"http://testserver/delete_user/{user_id}"
+    assert [link.rel for link in links] == ["self", "update", "delete"]
+    for link, route_name in zip(links, ["get_user", "update_user", "delete_user"]):
+        assert str(link.href) == str(app_request.url_for(route_name, user_id=str(user_id)))
+
+def test_user_link_templates_resolve_routes_once(app_request, mocker):
+    build = user_link_builder(app_request)
+    url_path_for = mocker.spy(app.router, "url_path_for")
+    first, second = uuid4(), uuid4()
+    assert build(first)[0]["href"] == f"http://testserver/users/{first}"
+    assert build(second)[2]["href"] == f"http://testserver/users/{second}"
+    url_path_for.assert_not_called()
+    assert user_link_builder(app_request)(first) == build(first)
 
 def test_generate_pagination_links(mock_request):
     skip = 10
@@ -49,3 +69,34 @@ def test_generate_pagination_links(mock_request):
     assert len(links) >= 4
     expected_self_url = "http://testserver/users?limit=5&skip=10"
     assert normalize_url(str(links[0].href)) == normalize_url(expected_self_url), "Self link should match expected URL"
+
+def test_generate_pagination_links_with_cursors(mock_request):
+    links = generate_pagination_links(mock_request, 0, 5, 50, next_cursor="abc", prev_cursor="xyz", cursor="cur")
+    rels = {link.rel: str(link.href) for link in links}
+    assert normalize_url(rels["self"]) == normalize_url("http://testserver/users?cursor=cur&limit=5")
+    assert normalize_url(rels["next"]) == normalize_url("http://testserver/users?cursor=abc&limit=5")
+    assert normalize_url(rels["prev"]) == normalize_url("http://testserver/users?cursor=xyz&limit=5")
+
+def test_generate_pagination_links_next_follows_has_next(mock_request):
+    rels = lambda links: {link.rel for link in links}
+    assert "next" not in rels(generate_pagination_links(mock_request, 40, 10, 1000, has_next=False))
+    assert "next" in rels(generate_pagination_links(mock_request, 0, 10, 5, has_next=True))
+
+def test_cursor_roundtrip():
+    created_at = datetime(2024, 4, 21, 9, 51, 44, 977108, tzinfo=timezone.utc)
+    user_id = uuid4()
+    decoded = decode_cursor(encode_cursor(Cursor((created_at, user_id), PREV, "-created_at")))
+    assert decoded == Cursor((created_at.isoformat(), str(user_id)), PREV, "-created_at")
+
+def test_generate_pagination_links_keeps_filters(mock_request):
+    mock_request.url = "http://testserver/users?role=ADMIN&sort=-email&skip=10&limit=5"
+    links = generate_pagination_links(mock_request, 10, 5, 50)
+    for link in links:
+        query = parse_qs(urlparse(str(link.href)).query)
+        assert query["role"] == ["ADMIN"] and query["sort"] == ["-email"]
+        assert len(query["limit"]) == 1
+
+@pytest.mark.parametrize("token", ["", "not-a-cursor", "e30", "eyJjIjoxfQ"])
+def test_decode_invalid_cursor(token):
+    with pytest.raises(ValueError):
+        decode_cursor(token)
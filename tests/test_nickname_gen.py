@@ -0,0 +1,19 @@
+from builtins import len, set
+import re
+from app.utils.nickname_gen import NICKNAME_SPACE, generate_nickname, generate_nickname_candidates
+
+NICKNAME_PATTERN = re.compile(r'^[\w-]+$')
+
+def test_generate_nickname_is_url_safe():
+    nickname = generate_nickname()
+    assert NICKNAME_PATTERN.match(nickname)
+    assert 3 <= len(nickname) <= 50
+
+def test_generate_nickname_candidates_are_distinct():
+    candidates = generate_nickname_candidates(16)
+    assert len(candidates) == 16
+    assert len(set(candidates)) == 16
+    assert all(NICKNAME_PATTERN.match(candidate) for candidate in candidates)
+
+def test_nickname_space_outgrows_large_user_tables():
+    assert NICKNAME_SPACE >= 100_000_000
@@ -0,0 +1,75 @@
+# test_password_policy.py
+from builtins import ValueError
+from types import SimpleNamespace
+import pytest
+from app.utils.password_policy import (
+    ARGON2ID, BCRYPT, MIN_BCRYPT_ROUNDS, PasswordHashPolicy, configure_password_policy, get_password_policy,
+    set_password_policy
+)
+
+# Cheap argon2id parameters keep the tests fast.
+FAST_ARGON2 = PasswordHashPolicy(algorithm=ARGON2ID, argon2_time_cost=1, argon2_memory_cost=1024, argon2_parallelism=1)
+
+@pytest.fixture
+def restore_policy():
+    original = get_password_policy()
+    yield
+    set_password_policy(original)
+
+def test_argon2id_hash_records_parameters():
+    """Test that argon2id hashes carry their algorithm and cost parameters."""
+    hashed = FAST_ARGON2.hash("secure_password")
+    assert hashed.startswith("$argon2id$v=19$m=1024,t=1,p=1$")
+    assert FAST_ARGON2.verify("secure_password", hashed) is True
+    assert FAST_ARGON2.verify("incorrect_password", hashed) is False
+
+def test_verify_dispatches_on_stored_algorithm():
+    """Test that a policy verifies hashes produced under a different algorithm."""
+    bcrypt_policy = PasswordHashPolicy(bcrypt_rounds=4)
+    assert FAST_ARGON2.verify("secure_password", bcrypt_policy.hash("secure_password")) is True
+    assert bcrypt_policy.verify("secure_password", FAST_ARGON2.hash("secure_password")) is True
+
+def test_verify_invalid_argon2_hash():
+    with pytest.raises(ValueError):
+        FAST_ARGON2.verify("secure_password", "$argon2id$not-a-hash")
+
+def test_needs_rehash():
+    """Test that hashes from another algorithm or cost are flagged for rehashing."""
+    bcrypt_4 = PasswordHashPolicy(bcrypt_rounds=4)
+    bcrypt_5 = PasswordHashPolicy(bcrypt_rounds=5)
+    hashed = bcrypt_4.hash("secure_password")
+    assert bcrypt_4.needs_rehash(hashed) is False
+    assert bcrypt_5.needs_rehash(hashed) is True
+    assert FAST_ARGON2.needs_rehash(hashed) is True
+    argon2_hashed = FAST_ARGON2.hash("secure_password")
+    assert FAST_ARGON2.needs_rehash(argon2_hashed) is False
+    assert PasswordHashPolicy(algorithm=ARGON2ID, argon2_time_cost=2, argon2_memory_cost=1024, argon2_parallelism=1).needs_rehash(argon2_hashed) is True
+    assert bcrypt_4.needs_rehash(argon2_hashed) is True
+
+def test_unsupported_algorithm():
+    with pytest.raises(ValueError):
+        PasswordHashPolicy(algorithm="md5")
+
+def test_calibrate_respects_floor():
+    """Test that a tiny latency budget never drops below the minimum cost."""
+    calibrated = PasswordHashPolicy(algorithm=BCRYPT).calibrate(target_ms=0.001)
+    assert calibrated.bcrypt_rounds == MIN_BCRYPT_ROUNDS
+
+def test_calibrate_argon2_keeps_memory_cost():
+    calibrated = FAST_ARGON2.calibrate(target_ms=0.001)
+    assert calibrated.argon2_time_cost == 1
+    assert calibrated.argon2_memory_cost == FAST_ARGON2.argon2_memory_cost
+
+def test_configure_password_policy_from_settings(restore_policy):
+    settings = SimpleNamespace(
+        password_hash_algorithm=ARGON2ID,
+        password_hash_target_ms=0,
+        password_bcrypt_rounds=12,
+        password_argon2_time_cost=2,
+        password_argon2_memory_cost=2048,
+        password_argon2_parallelism=1,
+    )
+    policy = configure_password_policy(settings)
+    assert get_password_policy() is policy
+    assert policy.algorithm == ARGON2ID
+    assert policy.argon2_time_cost == 2
@@ -0,0 +1,43 @@
+import pytest
+from app.utils.rate_limiter import RateLimiter
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+@pytest.fixture
+def sleeps(mocker):
+    recorded = []
+
+    async def sleep(seconds):
+        recorded.append(seconds)
+
+    mocker.patch("app.utils.rate_limiter.asyncio.sleep", side_effect=sleep)
+    return recorded
+
+async def test_burst_is_admitted_without_waiting(sleeps):
+    limiter = RateLimiter(rate=10, burst=3, clock=FakeClock())
+    for _ in range(3):
+        await limiter.acquire()
+    assert sleeps == []
+
+async def test_acquisitions_past_the_burst_are_spaced_at_the_rate(sleeps):
+    limiter = RateLimiter(rate=10, burst=1, clock=FakeClock())
+    for _ in range(4):
+        await limiter.acquire()
+    # Each waiter reserves the next free slot, so concurrent callers queue up behind each other.
+    assert sleeps == pytest.approx([0.1, 0.2, 0.3])
+
+async def test_tokens_refill_over_time(sleeps):
+    clock = FakeClock()
+    limiter = RateLimiter(rate=10, burst=2, clock=clock)
+    await limiter.acquire()
+    await limiter.acquire()
+    clock.now += 0.1
+    await limiter.acquire()
+    assert sleeps == []
+    await limiter.acquire()
+    assert sleeps == pytest.approx([0.1])
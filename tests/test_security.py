@@ -1,7 +1,11 @@
 # test_security.py
 from builtins import RuntimeError, ValueError, isinstance, str
+import asyncio
 import pytest
-from app.utils.security import hash_password, verify_password
+from app.utils.security import (
+    get_password_executor, hash_password, hash_password_async, shutdown_password_executor,
+    verify_password, verify_password_async
+)
 
 def test_hash_password():
     """Test that hashing password returns a bcrypt hashed string."""
@@ -65,3 +69,40 @@ def test_hash_password_internal_error(monkeypatch):
     with pytest.raises(ValueError):
         hash_password("test")
 
+
+@pytest.mark.asyncio
+async def test_hash_password_async_roundtrip():
+    """Test that the async helpers hash and verify on the worker pool."""
+    hashed = await hash_password_async("secure_password", rounds=4)
+    assert hashed.startswith('$2b$04$')
+    assert await verify_password_async("secure_password", hashed) is True
+    assert await verify_password_async("incorrect_password", hashed) is False
+
+@pytest.mark.asyncio
+async def test_verify_password_async_invalid_hash():
+    """Test that errors raised on the worker pool propagate to the caller."""
+    with pytest.raises(ValueError):
+        await verify_password_async("secure_password", "invalid_hash_format")
+
+@pytest.mark.asyncio
+async def test_hash_password_async_does_not_block_event_loop():
+    """Test that the event loop keeps ticking while a hash is being computed."""
+    ticks = 0
+
+    async def ticker():
+        nonlocal ticks
+        while True:
+            await asyncio.sleep(0.005)
+            ticks += 1
+
+    task = asyncio.create_task(ticker())
+    await hash_password_async("secure_password", rounds=12)
+    task.cancel()
+    assert ticks > 0, "The event loop should not be blocked while hashing"
+
+def test_password_executor_is_reused_and_recreated_after_shutdown():
+    """Test that the worker pool is a lazily created singleton."""
+    executor = get_password_executor()
+    assert get_password_executor() is executor
+    shutdown_password_executor()
+    assert get_password_executor() is not executor
@@ -0,0 +1,34 @@
+from builtins import len
+import uuid
+import orjson
+from app.schemas.pagination_schema import PaginationLink
+from app.schemas.user_schemas import UserListResponse, UserResponse
+from app.utils.serialization import UserJSONResponse, user_list_payload, user_payload
+
+def test_user_payload_matches_response_model(verified_user):
+    encoded = orjson.loads(UserJSONResponse(user_payload(verified_user)).body)
+    assert encoded == UserResponse.model_validate(verified_user).model_dump(mode="json", exclude={"links"})
+
+def test_user_payloads_pass_response_validation(users_with_same_role_50_users, admin_user):
+    # Payloads skip validation at runtime; every one must still be a valid UserResponse.
+    for user in [*users_with_same_role_50_users, admin_user]:
+        UserResponse.model_validate(user_payload(user))
+
+def test_user_payload_sparse_fields(verified_user):
+    assert user_payload(verified_user, ["email"]) == {"id": verified_user.id, "email": verified_user.email}
+
+def test_user_list_payload_matches_response_model(users_with_same_role_50_users):
+    users = users_with_same_role_50_users[:10]
+    links = [PaginationLink(rel="self", href="http://testserver/users/?skip=0&limit=10")]
+    payload = user_list_payload(users, pagination_links=links, total=50, page=1, next_cursor="abc", prev_cursor=None)
+    expected = UserListResponse(
+        items=[UserResponse.model_validate(user) for user in users],
+        total=50, page=1, size=len(users), next_cursor="abc", prev_cursor=None, links=links,
+    )
+    assert orjson.loads(UserJSONResponse(payload).body) == expected.model_dump(mode="json", exclude={"items": {"__all__": {"links"}}})
+
+def test_user_json_response_encodes_uuid_subclasses():
+    class DriverUUID(uuid.UUID):
+        pass
+    value = DriverUUID(int=1)
+    assert orjson.loads(UserJSONResponse({"id": value}).body) == {"id": str(value)}
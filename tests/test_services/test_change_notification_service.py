@@ -0,0 +1,124 @@
+import asyncio
+import pytest
+from sqlalchemy import text
+from app.services.change_notification_service import (
+    CREATED, MEMORY, NONE, POSTGRES, UPDATED, ChangeBus, MemoryHub, MemoryTransport, PostgresNotifyTransport,
+    build_change_bus, get_change_bus, start_change_bus, stop_change_bus
+)
+from app.services.user_cache_service import get_user_cache
+from app.services.user_service import UserService
+from settings.config import settings
+
+pytestmark = pytest.mark.asyncio
+
+@pytest.fixture
+async def workers():
+    """Two buses on one hub, standing in for two workers; the first is the one UserService publishes to."""
+    hub = MemoryHub()
+    this_worker, other_worker = ChangeBus(MemoryTransport(hub)), ChangeBus(MemoryTransport(hub))
+    await start_change_bus(this_worker)
+    await other_worker.start()
+    yield this_worker, other_worker
+    await other_worker.stop()
+    await stop_change_bus()
+
+def recorder(bus):
+    changes = []
+
+    async def record(change):
+        changes.append(change)
+
+    bus.subscribe(record)
+    return changes
+
+async def cached(user_id):
+    return await get_user_cache().backend.get(f"user:id:{user_id}")
+
+async def test_writes_are_published_to_other_workers(db_session, user, workers):
+    this_worker, other_worker = workers
+    received = recorder(other_worker)
+    own = recorder(this_worker)
+    await UserService.update(db_session, user.id, {"nickname": "renamed_nick"})
+    assert [(change["kind"], change["id"], change["nickname"]) for change in received] == [(UPDATED, str(user.id), "renamed_nick")]
+    assert own == [] and this_worker.published == 1 and other_worker.received == 1
+
+async def test_signup_is_published(db_session, workers):
+    received = recorder(workers[1])
+    user = await UserService.create(db_session, {"email": "published@example.com", "password": "ValidPassword123!", "role": "AUTHENTICATED"})
+    assert [(change["kind"], change["id"], change["email"]) for change in received] == [(CREATED, str(user.id), user.email)]
+
+async def test_notifications_invalidate_the_local_cache(db_session, user, workers):
+    this_worker, other_worker = workers
+    await UserService.get_by_id(db_session, user.id)
+    assert await cached(user.id) is not None
+    # A write made by the other worker reaches this one through the bus.
+    await other_worker.publish(UPDATED, user.id)
+    assert await cached(user.id) is None
+    assert this_worker.lag_stats()["samples"] == 1
+
+async def test_lost_notifications_clear_the_cache(db_session, user, workers):
+    this_worker, _ = workers
+    await UserService.get_by_id(db_session, user.id)
+    await this_worker.transport.reset()
+    assert await cached(user.id) is None and this_worker.resets == 1
+
+async def test_malformed_and_failing_notifications_are_ignored(workers):
+    this_worker, other_worker = workers
+
+    async def broken(change):
+        raise RuntimeError("boom")
+
+    this_worker.subscribe(broken)
+    await other_worker.transport.publish("not json")
+    await other_worker.publish(UPDATED, "00000000-0000-0000-0000-000000000000")
+    assert this_worker.received == 1
+
+async def test_publish_failures_are_not_raised():
+    bus = ChangeBus(PostgresNotifyTransport(settings.database_url, settings.change_bus_channel))
+    await bus.publish(UPDATED, "00000000-0000-0000-0000-000000000000")
+    assert bus.published == 0
+
+async def test_postgres_transport_delivers_across_connections(db_session, user):
+    sender = ChangeBus(PostgresNotifyTransport(settings.database_url, "user_changes_test"))
+    listener = ChangeBus(PostgresNotifyTransport(settings.database_url, "user_changes_test"))
+    received = recorder(listener)
+    await sender.start()
+    await listener.start()
+    try:
+        await sender.publish(UPDATED, user.id, nickname=user.nickname)
+        for _ in range(100):
+            if received:
+                break
+            await asyncio.sleep(0.01)
+        assert [(change["id"], change["nickname"]) for change in received] == [(str(user.id), user.nickname)]
+        assert sender.received == 0 and listener.lag_stats()["samples"] == 1
+    finally:
+        await sender.stop()
+        await listener.stop()
+
+async def test_postgres_transport_reconnects_and_resets(db_session, user):
+    bus = ChangeBus(PostgresNotifyTransport(settings.database_url, "user_changes_test", reconnect_delay=0.01))
+    await bus.start()
+    try:
+        await UserService.get_by_id(db_session, user.id)
+        pid = bus.transport._connection.get_server_pid()
+        await db_session.execute(text("SELECT pg_terminate_backend(:pid)"), {"pid": pid})
+        for _ in range(200):
+            if bus.resets:
+                break
+            await asyncio.sleep(0.01)
+        assert bus.resets == 1 and await cached(user.id) is None
+        assert bus.transport._connection.get_server_pid() != pid
+    finally:
+        await bus.stop()
+
+async def test_build_change_bus():
+    assert isinstance(build_change_bus(MEMORY).transport, MemoryTransport)
+    assert isinstance(build_change_bus(POSTGRES).transport, PostgresNotifyTransport)
+    assert build_change_bus(NONE) is None
+    with pytest.raises(ValueError):
+        build_change_bus("redis")
+
+async def test_start_failure_leaves_no_bus():
+    await start_change_bus(ChangeBus(PostgresNotifyTransport("postgresql://nobody@127.0.0.1:1/none", "user_changes")))
+    assert get_change_bus() is None
@@ -0,0 +1,163 @@
+import asyncio
+import pytest
+from sqlalchemy import func, select, text, update
+from app.models.email_outbox_model import EmailOutbox, OutboxStatus
+from app.services.email_outbox_service import EmailOutboxService, EmailOutboxWorkers
+from app.services.email_service import EmailService
+from app.services.user_service import UserService
+from app.utils.smtp_connection import SMTPClient
+from app.utils.template_manager import TemplateManager
+
+pytestmark = pytest.mark.asyncio
+
+# The first signup becomes ADMIN and gets no verification email, so tests that sign up take ``user`` too.
+SIGNUP = {"email": "queued@example.com", "password": "ValidPassword123!", "role": "AUTHENTICATED"}
+
+def workers_for(session_factory, service, **kwargs):
+    return EmailOutboxWorkers(session_factory, email_service=lambda: service, **kwargs)
+
+async def outbox(session_factory):
+    async with session_factory() as session:
+        return (await session.execute(select(EmailOutbox).order_by(EmailOutbox.created_at))).scalars().all()
+
+async def queue(session_factory, count: int):
+    async with session_factory() as session:
+        for i in range(count):
+            EmailOutboxService.enqueue(session, 'email_verification', {
+                "name": f"User {i}", "verification_url": f"http://localhost/verify-email/{i}/token", "email": f"user{i}@example.com"
+            })
+        await session.commit()
+
+async def test_signup_queues_its_verification_email(db_session, user, session_factory):
+    signup = await UserService.create(db_session, SIGNUP)
+    [email] = await outbox(session_factory)
+    assert (email.email_type, email.recipient, email.status) == ("email_verification", signup.email, OutboxStatus.PENDING)
+    assert email.context["verification_url"].endswith(f"/verify-email/{signup.id}/{signup.verification_token}")
+    assert email.user_id == signup.id
+    async with session_factory() as session:
+        assert [queued.id for queued in await EmailOutboxService.for_user(session, signup.id)] == [email.id]
+
+async def test_deleting_a_user_deletes_their_emails(db_session, user, session_factory):
+    signup = await UserService.create(db_session, SIGNUP)
+    assert await UserService.delete(db_session, signup.id)
+    assert await outbox(session_factory) == []
+
+async def test_queued_email_is_discarded_with_its_transaction(db_session, session_factory):
+    EmailOutboxService.enqueue(db_session, 'email_verification', {"name": "x", "verification_url": "x", "email": "gone@example.com"})
+    await db_session.flush()
+    await db_session.rollback()
+    assert await outbox(session_factory) == []
+
+async def test_workers_deliver_queued_email(db_session, user, session_factory, mailer, smtp_server):
+    signup = await UserService.create(db_session, SIGNUP)
+    workers = workers_for(session_factory, mailer)
+    assert await workers.run_once() == 1
+    [email] = await outbox(session_factory)
+    assert email.status == OutboxStatus.SENT and email.sent_at is not None and email.attempts == 1
+    assert smtp_server.messages[0][1] == [signup.email]
+    assert signup.verification_token.encode() in smtp_server.messages[0][2]
+    assert email.context == {}, "The verification link must not be kept once sent"
+    assert workers.sent == 1 and workers.latency_stats()["samples"] == 1
+    assert await workers.run_once() == 0
+
+async def test_workers_send_a_batch_over_shared_connections(session_factory, mailer, smtp_server, mocker):
+    await queue(session_factory, 12)
+    send_bulk = mocker.spy(mailer, "send_bulk")
+    assert await workers_for(session_factory, mailer, batch_size=12).run_once() == 12
+    send_bulk.assert_called_once()
+    assert smtp_server.connections == 1 and len(smtp_server.messages) == 12
+    assert {email.status for email in await outbox(session_factory)} == {OutboxStatus.SENT}
+
+async def test_email_that_does_not_fit_its_template_fails_alone(session_factory, mailer):
+    await queue(session_factory, 2)
+    async with session_factory() as session:
+        EmailOutboxService.enqueue(session, 'email_verification', {"email": "broken@example.com"})
+        await session.commit()
+    workers = workers_for(session_factory, mailer)
+    assert await workers.run_once() == 3
+    statuses = {email.recipient: email.status for email in await outbox(session_factory)}
+    assert statuses == {"user0@example.com": OutboxStatus.SENT, "user1@example.com": OutboxStatus.SENT,
+                        "broken@example.com": OutboxStatus.DEAD}
+    assert workers.sent == 2 and workers.dead_lettered == 1
+
+async def test_concurrent_claims_do_not_overlap(session_factory):
+    await queue(session_factory, 10)
+    async with session_factory() as first, session_factory() as second:
+        batches = await asyncio.gather(
+            EmailOutboxService.claim(first, 6, lease_seconds=60),
+            EmailOutboxService.claim(second, 6, lease_seconds=60),
+        )
+    ids = [email.id for batch in batches for email in batch]
+    assert len(ids) == len(set(ids)) == 10
+    async with session_factory() as session:
+        # Claimed emails are leased out, so nothing is due until a lease runs out.
+        assert await EmailOutboxService.claim(session, 10, lease_seconds=60) == []
+
+async def test_temporary_failure_is_retried_with_backoff(session_factory):
+    await queue(session_factory, 1)
+    service = EmailService(template_manager=TemplateManager())
+    service.smtp_client = SMTPClient("127.0.0.1", 1, "mailer", "secret", timeout=1)
+    workers = workers_for(session_factory, service, max_attempts=3, backoff_seconds=60)
+    assert await workers.run_once() == 1
+    [email] = await outbox(session_factory)
+    assert email.status == OutboxStatus.PENDING and email.attempts == 1 and email.last_error
+    assert 55 < (email.available_at - email.created_at).total_seconds() < 65
+    assert workers.retried == 1 and await workers.run_once() == 0
+    assert [workers.backoff(attempt) for attempt in (1, 2, 3)] == [60, 120, 240]
+
+async def test_email_is_dead_lettered_after_max_attempts(session_factory):
+    await queue(session_factory, 1)
+    service = EmailService(template_manager=TemplateManager())
+    service.smtp_client = SMTPClient("127.0.0.1", 1, "mailer", "secret", timeout=1)
+    workers = workers_for(session_factory, service, max_attempts=2, backoff_seconds=0)
+    assert await workers.run_once() == 1
+    assert await workers.run_once() == 1
+    [email] = await outbox(session_factory)
+    assert email.status == OutboxStatus.DEAD and email.attempts == 2
+    assert workers.dead_lettered == 1 and await workers.run_once() == 0
+
+async def test_permanent_rejection_is_dead_lettered_at_once(session_factory, mailer, smtp_server):
+    smtp_server.reject_recipients = {"user0@example.com"}
+    await queue(session_factory, 2)
+    workers = workers_for(session_factory, mailer)
+    assert await workers.run_once() == 2
+    statuses = {email.recipient: (email.status, email.attempts) for email in await outbox(session_factory)}
+    assert statuses == {"user0@example.com": (OutboxStatus.DEAD, 1), "user1@example.com": (OutboxStatus.SENT, 1)}
+    async with session_factory() as session:
+        assert await EmailOutboxService.retry_dead(session) == 1
+    assert await workers.run_once() == 1
+
+async def test_purge_deletes_old_sent_emails_only(session_factory, mailer, smtp_server):
+    await queue(session_factory, 3)
+    assert await workers_for(session_factory, mailer).run_once() == 3
+    async with session_factory() as session:
+        old = EmailOutbox.recipient.in_(["user0@example.com", "user1@example.com"])
+        await session.execute(update(EmailOutbox).where(old).values(sent_at=func.now() - text("interval '8 days'")))
+        await session.execute(update(EmailOutbox).where(EmailOutbox.recipient == "user1@example.com").values(status=OutboxStatus.DEAD))
+        await session.commit()
+        assert await EmailOutboxService.purge_sent(session, 7 * 86400) == 1
+    assert sorted(email.recipient for email in await outbox(session_factory)) == ["user1@example.com", "user2@example.com"]
+
+async def test_stats_report_queue_depth(session_factory):
+    await queue(session_factory, 3)
+    async with session_factory() as session:
+        await EmailOutboxService.claim(session, 1, lease_seconds=60)
+        await session.execute(update(EmailOutbox).where(EmailOutbox.recipient == "user2@example.com").values(status=OutboxStatus.DEAD))
+        await session.commit()
+        stats = await EmailOutboxService.stats(session)
+    assert (stats["pending"], stats["due"], stats["dead"]) == (2, 1, 1)
+    assert stats["oldest_pending_seconds"] >= 0
+
+async def test_started_workers_deliver_once_woken(db_session, user, session_factory, mailer, smtp_server):
+    workers = workers_for(session_factory, mailer, poll_seconds=60)
+    workers.start()
+    try:
+        await UserService.create(db_session, SIGNUP)
+        workers.wake()
+        for _ in range(100):
+            if smtp_server.messages:
+                break
+            await asyncio.sleep(0.02)
+    finally:
+        await workers.stop()
+    assert len(smtp_server.messages) == 1
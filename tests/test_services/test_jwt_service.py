@@ -0,0 +1,56 @@
+from datetime import timedelta
+import time
+import jwt
+import pytest
+from app.services import jwt_service
+from app.services.jwt_service import VerifiedTokenCache, create_access_token, decode_token, verified_tokens
+
+@pytest.fixture
+def decode_spy(mocker):
+    verified_tokens.clear()
+    yield mocker.spy(jwt, "decode")
+    verified_tokens.clear()
+
+def test_verified_tokens_skip_reverification(decode_spy):
+    token = create_access_token(data={"sub": "someone", "role": "admin"})
+    assert decode_token(token)["role"] == "ADMIN"
+    assert decode_token(token)["sub"] == "someone"
+    assert decode_spy.call_count == 1
+
+def test_tampered_tokens_are_verified(decode_spy):
+    token = create_access_token(data={"sub": "someone", "role": "admin"})
+    decode_token(token)
+    header, payload, signature = token.split(".")
+    assert decode_token(f"{header}.{payload}.{signature[:-2]}AA") is None
+    assert decode_spy.call_count == 2
+
+def test_invalid_tokens_are_not_cached(decode_spy):
+    assert decode_token("not-a-token") is None
+    assert decode_token("not-a-token") is None
+    assert decode_spy.call_count == 2 and len(verified_tokens) == 0
+
+def test_cached_claims_cannot_be_modified(decode_spy):
+    token = create_access_token(data={"sub": "someone", "role": "manager"})
+    decode_token(token)["role"] = "ADMIN"
+    assert decode_token(token)["role"] == "MANAGER"
+
+def test_tokens_are_served_until_they_expire(decode_spy, monkeypatch):
+    token = create_access_token(data={"sub": "someone", "role": "admin"}, expires_delta=timedelta(minutes=5))
+    claims = decode_token(token)
+    monkeypatch.setattr(jwt_service.time, "time", lambda: claims["exp"])
+    assert verified_tokens.get(token) is None
+
+def test_tokens_without_expiry_are_not_cached():
+    cache = VerifiedTokenCache(max_entries=10)
+    cache.put("token", {"sub": "someone"})
+    assert cache.get("token") is None
+
+def test_cache_evicts_least_recently_used():
+    cache = VerifiedTokenCache(max_entries=2)
+    expires_at = time.time() + 60
+    for token in ("a", "b"):
+        cache.put(token, {"exp": expires_at, "sub": token})
+    cache.get("a")
+    cache.put("c", {"exp": expires_at, "sub": "c"})
+    assert cache.get("b") is None
+    assert cache.get("a")["sub"] == "a" and cache.get("c")["sub"] == "c"
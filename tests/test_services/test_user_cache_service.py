@@ -0,0 +1,121 @@
+import asyncio
+import pytest
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.services.user_cache_service import MEMORY, NONE, MemoryCacheBackend, UserCache, build_user_cache, get_user_cache
+from app.services.user_service import UserService
+from app.utils.password_policy import PasswordHashPolicy, get_password_policy, set_password_policy
+from app.utils.security import hash_password_async
+
+pytestmark = pytest.mark.asyncio
+
+def user_reads(statements):
+    return [statement for statement in statements if "FROM users" in statement]
+
+async def read_fresh(db_session, user_id):
+    # A second session, so nothing comes from db_session's identity map.
+    async with AsyncSession(db_session.bind, expire_on_commit=False) as session:
+        return await UserService.get_by_id(session, user_id)
+
+async def test_get_by_id_is_served_from_cache(db_session, user, query_counter):
+    cache = get_user_cache()
+    assert (await UserService.get_by_id(db_session, user.id)).email == user.email
+    cached = await read_fresh(db_session, user.id)
+    assert cached.email == user.email and cached.nickname == user.nickname
+    assert len(user_reads(query_counter)) == 1
+    assert cache.stats()["hits"] == 1 and cache.stats()["misses"] == 1
+
+async def test_email_and_nickname_lookups_share_the_entry(db_session, user, query_counter):
+    assert (await UserService.get_by_email(db_session, user.email)).id == user.id
+    assert (await UserService.get_by_id(db_session, user.id)).id == user.id
+    assert (await UserService.get_by_email(db_session, user.email)).id == user.id
+    assert (await UserService.get_by_nickname(db_session, user.nickname)).id == user.id
+    assert len(user_reads(query_counter)) == 2
+
+async def test_secrets_are_not_cached(db_session, user):
+    await UserService.get_by_id(db_session, user.id)
+    snapshot = await get_user_cache().backend.get(f"user:id:{user.id}")
+    assert snapshot["email"] == user.email
+    assert "hashed_password" not in snapshot and "verification_token" not in snapshot
+
+async def test_misses_are_cached_until_a_signup(db_session, query_counter):
+    email = "not.yet@example.com"
+    assert await UserService.get_by_email(db_session, email) is None
+    assert await UserService.get_by_email(db_session, email) is None
+    assert len(user_reads(query_counter)) == 1
+    assert get_user_cache().stats()["negative_hits"] == 1
+    user = await UserService.create(db_session, {"email": email, "password": "ValidPassword123!", "role": "AUTHENTICATED"})
+    assert (await UserService.get_by_email(db_session, email)).id == user.id
+
+async def test_update_invalidates(db_session, user):
+    await UserService.get_by_email(db_session, user.email)
+    old_email = user.email
+    await UserService.update(db_session, user.id, {"first_name": "Renamed", "email": "renamed@example.com"})
+    assert (await read_fresh(db_session, user.id)).first_name == "Renamed"
+    assert await UserService.get_by_email(db_session, old_email) is None
+    assert (await UserService.get_by_email(db_session, "renamed@example.com")).id == user.id
+
+async def test_delete_invalidates(db_session, user):
+    await UserService.get_by_email(db_session, user.email)
+    assert await UserService.delete(db_session, user.id)
+    assert await read_fresh(db_session, user.id) is None
+    assert await UserService.get_by_email(db_session, user.email) is None
+
+async def test_failed_login_invalidates(db_session, verified_user):
+    await UserService.get_by_id(db_session, verified_user.id)
+    assert await UserService.login_user(db_session, verified_user.email, "WrongPassword!") is None
+    assert (await read_fresh(db_session, verified_user.id)).failed_login_attempts == 1
+
+async def test_login_rehash_invalidates(db_session, verified_user, mocker):
+    rehash_may_finish = asyncio.Event()
+
+    async def gated_hash(password):
+        await rehash_may_finish.wait()
+        return await hash_password_async(password)
+
+    mocker.patch("app.services.user_service.hash_password_async", side_effect=gated_hash)
+    original_policy = get_password_policy()
+    set_password_policy(PasswordHashPolicy(algorithm="argon2id", argon2_time_cost=1, argon2_memory_cost=1024, argon2_parallelism=1))
+    try:
+        assert await UserService.login_user(db_session, verified_user.email, "MySuperPassword$1234") is not None
+        # Cached while the rehash is still running, then the rehash lands.
+        await read_fresh(db_session, verified_user.id)
+        rehash_may_finish.set()
+        assert all(await asyncio.gather(*UserService._background_tasks))
+    finally:
+        set_password_policy(original_policy)
+    assert (await read_fresh(db_session, verified_user.id)).updated_at == await UserService.get_version(db_session, verified_user.id)
+
+async def test_unlock_invalidates(db_session, locked_user):
+    assert (await UserService.get_by_id(db_session, locked_user.id)).is_locked
+    assert await UserService.unlock_user_account(db_session, locked_user.id)
+    assert not (await read_fresh(db_session, locked_user.id)).is_locked
+
+async def test_email_verification_invalidates(db_session, user):
+    token = "cache-test-token"
+    user.verification_token = token
+    await db_session.commit()
+    await UserService.get_by_id(db_session, user.id)
+    assert await UserService.verify_email_with_token(db_session, user.id, token)
+    assert (await read_fresh(db_session, user.id)).email_verified
+
+async def test_memory_backend_evicts_least_recently_used():
+    backend = MemoryCacheBackend(max_entries=2)
+    await backend.set("a", 1, ttl=60)
+    await backend.set("b", 2, ttl=60)
+    assert await backend.get("a") == 1
+    await backend.set("c", 3, ttl=60)
+    assert await backend.get("b") is None
+    assert await backend.get("a") == 1 and await backend.get("c") == 3
+    assert len(backend) == 2
+
+async def test_memory_backend_expires_entries():
+    backend = MemoryCacheBackend(max_entries=10)
+    await backend.set("a", 1, ttl=0)
+    assert await backend.get("a") is None
+    assert len(backend) == 0
+
+async def test_build_user_cache():
+    assert isinstance(build_user_cache(MEMORY), UserCache)
+    assert build_user_cache(NONE) is None
+    with pytest.raises(ValueError):
+        build_user_cache("redis")
@@ -0,0 +1,54 @@
+import pytest
+from sqlalchemy import text
+from app.services.user_count_service import (
+    CACHED, ESTIMATED, EXACT, CachedUserCount, EstimatedUserCount, ExactUserCount, build_user_count_strategy,
+    get_user_count_strategy, set_user_count_strategy
+)
+from app.services.user_service import UserService
+
+pytestmark = pytest.mark.asyncio
+
+@pytest.fixture
+def cached_strategy():
+    original = get_user_count_strategy()
+    strategy = CachedUserCount(ttl_seconds=3600)
+    set_user_count_strategy(strategy)
+    yield strategy
+    set_user_count_strategy(original)
+
+async def test_exact_count(db_session, users_with_same_role_50_users):
+    assert await ExactUserCount().count(db_session) == 50
+
+async def test_cached_count_is_served_from_memory(db_session, users_with_same_role_50_users, cached_strategy, query_counter):
+    assert await cached_strategy.count(db_session) == 50
+    assert await cached_strategy.count(db_session) == 50
+    assert len([statement for statement in query_counter if "count(" in statement.lower()]) == 1
+
+async def test_cached_count_invalidated_on_create_and_delete(db_session, users_with_same_role_50_users, cached_strategy):
+    assert await cached_strategy.count(db_session) == 50
+    user = await UserService.create(db_session, {"email": "counted@example.com", "password": "ValidPassword123!", "role": "AUTHENTICATED"})
+    assert await cached_strategy.count(db_session) == 51
+    await UserService.delete(db_session, user.id)
+    assert await cached_strategy.count(db_session) == 50
+
+async def test_cached_count_expires(db_session, users_with_same_role_50_users):
+    strategy = CachedUserCount(ttl_seconds=0)
+    assert await strategy.count(db_session) == 50
+    strategy._value = 1
+    assert await strategy.count(db_session) == 50
+
+async def test_estimated_count_falls_back_to_exact_for_small_tables(db_session, users_with_same_role_50_users):
+    assert await EstimatedUserCount(exact_threshold=1000).count(db_session) == 50
+
+async def test_estimated_count_uses_planner_statistics(db_session, users_with_same_role_50_users, query_counter):
+    await db_session.execute(text("ANALYZE users"))
+    query_counter.clear()
+    assert await EstimatedUserCount(exact_threshold=0).count(db_session) == 50
+    assert not any("count(" in statement.lower() for statement in query_counter)
+
+async def test_build_user_count_strategy():
+    assert isinstance(build_user_count_strategy(EXACT), ExactUserCount)
+    assert isinstance(build_user_count_strategy(CACHED), CachedUserCount)
+    assert isinstance(build_user_count_strategy(ESTIMATED), EstimatedUserCount)
+    with pytest.raises(ValueError):
+        build_user_count_strategy("guess")
@@ -1,33 +1,41 @@
 from builtins import range
+import asyncio
+from datetime import datetime, timedelta, timezone
+from uuid import uuid4
 import pytest
-from sqlalchemy import select
+from sqlalchemy import literal_column, select, text
+from sqlalchemy.exc import DBAPIError, IntegrityError
 from app.dependencies import get_settings
-from app.models.user_model import User, UserRole
-from app.services.user_service import UserService
+from app.models.email_outbox_model import EmailOutbox
+from app.models.user_model import SEARCH_DOCUMENT_SQL, User, UserRole
+from app.schemas.user_schemas import UserListFilters
+from app.services.user_service import NicknamesExhaustedError, UserService
+from app.utils.cursor import NEXT, PREV, Cursor, decode_cursor, encode_cursor
 from app.utils.nickname_gen import generate_nickname
+from app.utils.password_policy import PasswordHashPolicy, get_password_policy, set_password_policy
 
 pytestmark = pytest.mark.asyncio
 
 # Test creating a user with valid data
-async def test_create_user_with_valid_data(db_session, email_service):
+async def test_create_user_with_valid_data(db_session):
     user_data = {
         "nickname": generate_nickname(),
         "email": "valid_user@example.com",
         "password": "ValidPassword123!",
         "role": UserRole.ADMIN.name
     }
-    user = await UserService.create(db_session, user_data, email_service)
+    user = await UserService.create(db_session, user_data)
     assert user is not None
     assert user.email == user_data["email"]
 
 # Test creating a user with invalid data
-async def test_create_user_with_invalid_data(db_session, email_service):
+async def test_create_user_with_invalid_data(db_session):
     user_data = {
         "nickname": "",  # Invalid nickname
         "email": "invalidemail",  # Invalid email
         "password": "short",  # Invalid password
     }
-    user = await UserService.create(db_session, user_data, email_service)
+    user = await UserService.create(db_session, user_data)
     assert user is None
 
 # Test fetching a user by ID when the user exists
@@ -37,10 +45,15 @@ async def test_get_by_id_user_exists(db_session, user):
 
 # Test fetching a user by ID when the user does not exist
 async def test_get_by_id_user_does_not_exist(db_session):
-    non_existent_user_id = "non-existent-id"
+    non_existent_user_id = uuid4()
     retrieved_user = await UserService.get_by_id(db_session, non_existent_user_id)
     assert retrieved_user is None
 
+# Database errors propagate rather than reading as "no such user"
+async def test_get_by_id_database_error_is_raised(db_session):
+    with pytest.raises(DBAPIError):
+        await UserService.get_by_id(db_session, "non-existent-id")
+
 # Test fetching a user by nickname when the user exists
 async def test_get_by_nickname_user_exists(db_session, user):
     retrieved_user = await UserService.get_by_nickname(db_session, user.nickname)
@@ -73,6 +86,10 @@ async def test_update_user_invalid_data(db_session, user):
     updated_user = await UserService.update(db_session, user.id, {"email": "invalidemail"})
     assert updated_user is None
 
+async def test_update_user_to_a_taken_email_raises(db_session, user, verified_user):
+    with pytest.raises(IntegrityError):
+        await UserService.update(db_session, user.id, {"email": verified_user.email})
+
 # Test deleting a user who exists
 async def test_delete_user_exists(db_session, user):
     deletion_success = await UserService.delete(db_session, user.id)
@@ -80,7 +97,7 @@ async def test_delete_user_exists(db_session, user):
 
 # Test attempting to delete a user who does not exist
 async def test_delete_user_does_not_exist(db_session):
-    non_existent_user_id = "non-existent-id"
+    non_existent_user_id = uuid4()
     deletion_success = await UserService.delete(db_session, non_existent_user_id)
     assert deletion_success is False
 
@@ -93,24 +110,24 @@ async def test_list_users_with_pagination(db_session, users_with_same_role_50_us
     assert users_page_1[0].id != users_page_2[0].id
 
 # Test registering a user with valid data
-async def test_register_user_with_valid_data(db_session, email_service):
+async def test_register_user_with_valid_data(db_session):
     user_data = {
         "nickname": generate_nickname(),
         "email": "register_valid_user@example.com",
         "password": "RegisterValid123!",
         "role": UserRole.ADMIN
     }
-    user = await UserService.register_user(db_session, user_data, email_service)
+    user = await UserService.register_user(db_session, user_data)
     assert user is not None
     assert user.email == user_data["email"]
 
 # Test attempting to register a user with invalid data
-async def test_register_user_with_invalid_data(db_session, email_service):
+async def test_register_user_with_invalid_data(db_session):
     user_data = {
         "email": "registerinvalidemail",  # Invalid email
         "password": "short",  # Invalid password
     }
-    user = await UserService.register_user(db_session, user_data, email_service)
+    user = await UserService.register_user(db_session, user_data)
     assert user is None
 
 # Test successful user login
@@ -155,12 +172,26 @@ async def test_verify_email_with_token(db_session, user):
     result = await UserService.verify_email_with_token(db_session, user.id, token)
     assert result is True
 
+# The token check and the verification are one UPDATE ... RETURNING
+async def test_verify_email_with_token_is_one_statement(db_session, user, query_counter):
+    user.verification_token = "single_use_token"
+    await db_session.commit()
+    query_counter.clear()
+    assert await UserService.verify_email_with_token(db_session, user.id, "wrong_token") is False
+    assert await UserService.verify_email_with_token(db_session, user.id, "single_use_token") is True
+    assert await UserService.verify_email_with_token(db_session, user.id, "single_use_token") is False
+    assert len(query_counter) == 3 and all(statement.startswith("UPDATE users") for statement in query_counter)
+    assert user.email_verified is True and user.role == UserRole.AUTHENTICATED
+
 # Test unlocking a user's account
 async def test_unlock_user_account(db_session, locked_user):
     unlocked = await UserService.unlock_user_account(db_session, locked_user.id)
     assert unlocked, "The account should be unlocked"
     refreshed_user = await UserService.get_by_id(db_session, locked_user.id)
     assert not refreshed_user.is_locked, "The user should no longer be locked"
+
+async def test_unlock_user_account_not_locked(db_session, user):
+    assert await UserService.unlock_user_account(db_session, user.id) is False
 async def test_change_user_role(db_session, user):
     """
     Tests updating a user's role and ensuring it persists in the database.
@@ -168,7 +199,7 @@ async def test_change_user_role(db_session, user):
     new_role = UserRole.MANAGER
     updated_user = await UserService.update(db_session, user.id, {"role": new_role.name})
     assert updated_user is not None, "User should be successfully updated"
-    assert updated_user.role == new_role.name, f"User role should be updated to {new_role.name}"
+    assert updated_user.role == new_role, f"User role should be updated to {new_role.name}"
 async def test_search_users_by_exact_nickname(db_session, user):
     """
     Tests fetching users by their exact nickname.
@@ -255,4 +286,317 @@ async def test_update_user_profile_success(async_client, user, admin_token, mock
     updated_data = {"bio": "Updated bio", "first_name": "NewName"}
     response = await async_client.put(f"/users/{user.id}/profile", json=updated_data, headers=headers)
     assert response.status_code == 200
-    assert response.json()["bio"] == updated_data["bio"]
\ No newline at end of file
+    assert response.json()["bio"] == updated_data["bio"]
+async def test_login_rehashes_password_when_policy_changes(db_session, verified_user):
+    """
+    Tests that a successful login upgrades a hash created under an older policy in the background.
+    """
+    original_policy = get_password_policy()
+    set_password_policy(PasswordHashPolicy(algorithm="argon2id", argon2_time_cost=1, argon2_memory_cost=1024, argon2_parallelism=1))
+    try:
+        logged_in_user = await UserService.login_user(db_session, verified_user.email, "MySuperPassword$1234")
+        assert logged_in_user is not None
+        await asyncio.gather(*UserService._background_tasks)
+        await db_session.refresh(verified_user, ["hashed_password"])
+        assert verified_user.hashed_password.startswith("$argon2id$")
+        assert await UserService.login_user(db_session, verified_user.email, "MySuperPassword$1234") is not None
+        assert not UserService._background_tasks, "An up-to-date hash should not be rehashed again"
+    finally:
+        set_password_policy(original_policy)
+
+async def test_rehash_password_skips_changed_hash(db_session, verified_user):
+    """
+    Tests that a background rehash does not overwrite a password changed in the meantime.
+    """
+    rehashed = await UserService.rehash_password(db_session.bind, verified_user.id, "stale-hash", "MySuperPassword$1234")
+    assert rehashed is False
+
+async def test_create_user_retries_on_nickname_collision(db_session, verified_user, mocker):
+    """
+    Tests that a batch of taken nicknames is retried with a new batch instead of failing the signup.
+    """
+    batches = iter([[verified_user.nickname], ["fresh_nickname_1"]])
+    mocker.patch("app.services.user_service.generate_nickname_candidates", side_effect=lambda size: next(batches))
+    user_data = {
+        "email": "collision@example.com",
+        "password": "ValidPassword123!",
+        "role": UserRole.AUTHENTICATED.name
+    }
+    user = await UserService.create(db_session, user_data)
+    assert user is not None
+    assert user.nickname == "fresh_nickname_1"
+
+async def test_create_user_raises_when_nicknames_run_out(db_session, verified_user, mocker):
+    """
+    Tests that running out of nicknames is reported apart from a duplicate email.
+    """
+    mocker.patch("app.services.user_service.generate_nickname_candidates", return_value=[verified_user.nickname])
+    user_data = {
+        "email": "no_nickname@example.com",
+        "password": "ValidPassword123!",
+        "role": UserRole.AUTHENTICATED.name
+    }
+    with pytest.raises(NicknamesExhaustedError):
+        await UserService.create(db_session, user_data)
+    assert await UserService.get_by_email(db_session, user_data["email"]) is None
+
+async def test_create_user_picks_free_nickname_from_batch(db_session, verified_user, mocker, query_counter):
+    """
+    Tests that taken candidates are skipped inside a single INSERT.
+    """
+    mocker.patch(
+        "app.services.user_service.generate_nickname_candidates",
+        return_value=[verified_user.nickname, "fresh_nickname_2", "fresh_nickname_3"],
+    )
+    user_data = {
+        "email": "batch@example.com",
+        "password": "ValidPassword123!",
+        "role": UserRole.AUTHENTICATED.name
+    }
+    user = await UserService.create(db_session, user_data)
+    assert user.nickname == "fresh_nickname_2"
+    assert len([statement for statement in query_counter if statement.startswith("INSERT INTO users")]) == 1
+
+async def test_create_user_duplicate_email(db_session, verified_user):
+    user_data = {
+        "email": verified_user.email,
+        "password": "ValidPassword123!",
+        "role": UserRole.AUTHENTICATED.name
+    }
+    assert await UserService.create(db_session, user_data) is None
+
+async def test_create_first_user_is_admin(db_session):
+    """
+    Tests that the first user becomes a verified ADMIN and later users need email verification.
+    """
+    first = await UserService.create(db_session, {"email": "first@example.com", "password": "ValidPassword123!", "role": "AUTHENTICATED"})
+    second = await UserService.create(db_session, {"email": "second@example.com", "password": "ValidPassword123!", "role": "AUTHENTICATED"})
+    assert first.role == UserRole.ADMIN and first.email_verified and first.verification_token is None
+    assert second.role == UserRole.ANONYMOUS and not second.email_verified and second.verification_token
+    queued = (await db_session.execute(select(EmailOutbox))).scalars().all()
+    assert [(email.email_type, email.recipient) for email in queued] == [("email_verification", second.email)]
+    assert second.verification_token in queued[0].context["verification_url"]
+
+async def test_bootstrap_detects_existing_users_without_count(db_session, verified_user, query_counter):
+    """
+    Tests that signups into a non-empty table never become ADMIN and never run COUNT(*).
+    """
+    user = await UserService.create(db_session, {"email": "late@example.com", "password": "ValidPassword123!", "role": "AUTHENTICATED"})
+    assert user.role == UserRole.ANONYMOUS
+    assert UserService._bootstrapped is True
+    assert not any("count(" in statement.lower() for statement in query_counter)
+
+async def test_list_users_by_cursor_walks_forward_and_back(db_session, users_with_same_role_50_users):
+    """
+    Tests that keyset pagination visits every user exactly once in both directions.
+    """
+    seen = []
+    cursor = None
+    while True:
+        users, has_next, has_prev = await UserService.list_users_by_cursor(db_session, limit=15, cursor=cursor)
+        assert has_prev == (cursor is not None)
+        seen.extend(user.id for user in users)
+        if not has_next:
+            break
+        cursor = UserService.cursor_for(users[-1], "created_at", NEXT)
+    assert len(seen) == 50
+    assert len(set(seen)) == 50
+    assert seen == [user.id for user in await UserService.list_users(db_session, skip=0, limit=50)]
+
+    # Page back from the last page.
+    users, has_next, has_prev = await UserService.list_users_by_cursor(db_session, limit=15, cursor=UserService.cursor_for(users[0], "created_at", PREV))
+    assert [user.id for user in users] == seen[30:45]
+    assert has_next is True and has_prev is True
+
+@pytest.fixture
+async def mixed_users(db_session):
+    """
+    Users covering each listing filter: 2 locked, 3 unverified, 4 professional, 1 manager.
+    """
+    specs = (
+        [dict(is_locked=True)] * 2 + [dict(email_verified=False)] * 3 +
+        [dict(is_professional=True)] * 4 + [dict(role=UserRole.MANAGER)]
+    )
+    users = []
+    for index, spec in enumerate(specs):
+        values = dict(
+            nickname=f"mixed_{index}", email=f"mixed_{index}@example.com", hashed_password="x",
+            role=UserRole.AUTHENTICATED, email_verified=True, is_locked=False, is_professional=False,
+        )
+        values.update(spec)
+        user = User(**values)
+        db_session.add(user)
+        users.append(user)
+    await db_session.commit()
+    return users
+
+@pytest.mark.parametrize("filters, expected", [
+    ({"is_locked": True}, 2),
+    ({"email_verified": False}, 3),
+    ({"is_professional": True}, 4),
+    ({"role": UserRole.MANAGER}, 1),
+    ({"role": UserRole.AUTHENTICATED, "is_professional": True}, 4),
+    ({"is_locked": False, "email_verified": True}, 5),
+])
+async def test_list_users_filters(db_session, mixed_users, filters, expected):
+    user_filters = UserListFilters(**filters)
+    users = await UserService.list_users(db_session, 0, 50, user_filters)
+    assert len(users) == expected
+    assert await UserService.count(db_session, user_filters) == expected
+    for user in users:
+        for key, value in filters.items():
+            assert getattr(user, key) == value
+
+async def test_list_users_date_range_filters(db_session, mixed_users):
+    now = datetime.now(timezone.utc)
+    mixed_users[0].last_login_at = now - timedelta(days=2)
+    mixed_users[1].last_login_at = now - timedelta(hours=1)
+    await db_session.commit()
+    recent = await UserService.list_users(db_session, 0, 50, UserListFilters(last_login_after=now - timedelta(days=1)))
+    assert [user.id for user in recent] == [mixed_users[1].id]
+    created = await UserService.list_users(db_session, 0, 50, UserListFilters(created_before=now - timedelta(days=1)))
+    assert created == []
+
+async def test_list_users_sorted_descending_by_cursor(db_session, mixed_users):
+    expected = sorted((user.email for user in mixed_users), reverse=True)
+    users, has_next, _ = await UserService.list_users_by_cursor(db_session, 4, None, None, "-email")
+    seen = [user.email for user in users]
+    while has_next:
+        users, has_next, _ = await UserService.list_users_by_cursor(db_session, 4, UserService.cursor_for(users[-1], "-email", NEXT), None, "-email")
+        seen.extend(user.email for user in users)
+    assert seen == expected
+    offset_page = await UserService.list_users(db_session, 4, 4, None, "-email")
+    assert [user.email for user in offset_page] == expected[4:8]
+
+async def test_list_users_cursor_must_match_sort(db_session, mixed_users):
+    cursor = decode_cursor(encode_cursor(UserService.cursor_for(mixed_users[0], "email", NEXT)))
+    with pytest.raises(ValueError):
+        await UserService.list_users_by_cursor(db_session, 4, cursor, None, "created_at")
+
+@pytest.mark.parametrize("sort, key", [
+    ("created_at", ([1, 2], "00000000-0000-0000-0000-000000000000")),
+    ("created_at", ("yesterday", "00000000-0000-0000-0000-000000000000")),
+    ("created_at", ("2024-01-01T00:00:00+00:00", 7)),
+    ("created_at", ("2024-01-01T00:00:00+00:00", "not-a-uuid")),
+    ("email", (42,)),
+    ("nickname", ({"a": 1},)),
+])
+async def test_list_users_cursor_rejects_mistyped_keys(db_session, sort, key):
+    cursor = decode_cursor(encode_cursor(Cursor(key=key, direction=NEXT, sort=sort)))
+    with pytest.raises(ValueError):
+        await UserService.list_users_by_cursor(db_session, 4, cursor, None, sort)
+
+@pytest.mark.parametrize("filters", [
+    {"is_locked": True},
+    {"email_verified": False},
+    {"is_professional": True},
+    {"role": UserRole.MANAGER},
+    {"role": UserRole.MANAGER, "is_locked": True},
+    {"last_login_after": datetime(2024, 1, 1, tzinfo=timezone.utc)},
+    {"created_after": datetime(2024, 1, 1, tzinfo=timezone.utc), "email_verified": False},
+])
+async def test_list_users_filters_use_indexes(db_session, mixed_users, filters):
+    """
+    Tests that each filter has an index-backed plan (sequential scans disabled to take table size out of the picture).
+    """
+    query = UserService._apply_filters(select(User), UserListFilters(**filters)).order_by(User.created_at, User.id).limit(10)
+    compiled = query.compile(dialect=db_session.bind.dialect, compile_kwargs={"literal_binds": True})
+    await db_session.execute(text("SET LOCAL enable_seqscan = off"))
+    plan = "\n".join(row[0] for row in await db_session.execute(text(f"EXPLAIN {compiled}")))
+    assert "Seq Scan" not in plan, plan
+    assert "Index" in plan, plan
+
+@pytest.fixture
+async def search_users(db_session):
+    specs = [
+        ("brave_otter_1", "ada.lovelace@example.com", "Ada", "Lovelace"),
+        ("calm_heron_2", "grace@navy.example.org", "Grace", "Hopper"),
+        ("bold_lynx_3", "alan@example.com", "Alan", "Turing"),
+        ("quiet_owl_4", "otto_100%@example.com", "Otto", "Percent"),
+    ]
+    users = []
+    for nickname, email, first_name, last_name in specs:
+        user = User(nickname=nickname, email=email, first_name=first_name, last_name=last_name, hashed_password="x",
+                    role=UserRole.AUTHENTICATED, email_verified=True)
+        db_session.add(user)
+        users.append(user)
+    await db_session.commit()
+    return users
+
+@pytest.mark.parametrize("term, expected", [
+    ("LOVE", ["brave_otter_1"]),
+    ("hopp", ["calm_heron_2"]),
+    ("example", ["bold_lynx_3", "brave_otter_1", "calm_heron_2", "quiet_owl_4"]),
+    ("a_a", []),
+    ("100%", ["quiet_owl_4"]),
+    ("nobody", []),
+])
+async def test_search_users(db_session, search_users, term, expected):
+    users = await UserService.search(db_session, term, 10)
+    assert sorted(user.nickname for user in users) == expected
+
+async def test_search_users_lists_prefix_matches_first(db_session, search_users):
+    users = await UserService.search(db_session, "al", 10)
+    assert [user.nickname for user in users][0] == "bold_lynx_3"
+
+async def test_autocomplete_matches_nickname_and_email_prefixes(db_session, search_users):
+    assert await UserService.autocomplete(db_session, "BRAVE", 10) == [(search_users[0].id, "brave_otter_1")]
+    assert await UserService.autocomplete(db_session, "grace@", 10) == [(search_users[1].id, "calm_heron_2")]
+    assert await UserService.autocomplete(db_session, "zz", 10) == []
+
+async def test_autocomplete_is_capped(db_session, mixed_users):
+    suggestions = await UserService.autocomplete(db_session, "mixed_", 5)
+    assert len(suggestions) == 5
+    assert [nickname for _, nickname in suggestions] == sorted(nickname for _, nickname in suggestions)
+
+async def test_autocomplete_uses_prefix_indexes(db_session, search_users):
+    matches = UserService._prefix_query(User.email, "ada", 10)
+    compiled = matches.compile(dialect=db_session.bind.dialect, compile_kwargs={"literal_binds": True})
+    await db_session.execute(text("SET LOCAL enable_seqscan = off"))
+    plan = "\n".join(row[0] for row in await db_session.execute(text(f"EXPLAIN {compiled}")))
+    assert "ix_users_email_prefix" in plan, plan
+
+async def test_search_uses_trigram_index(db_session, search_users):
+    available = (await db_session.execute(text("SELECT 1 FROM pg_available_extensions WHERE name = 'pg_trgm'"))).first()
+    if not available:
+        pytest.skip("pg_trgm extension is not installed on this server")
+    await db_session.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+    await db_session.execute(text(f"CREATE INDEX ix_users_search_trgm ON users USING gin (({SEARCH_DOCUMENT_SQL}) gin_trgm_ops)"))
+    await db_session.execute(text("SET LOCAL enable_seqscan = off"))
+    query = select(User).where(literal_column(SEARCH_DOCUMENT_SQL).like("%lovelace%"))
+    compiled = query.compile(dialect=db_session.bind.dialect, compile_kwargs={"literal_binds": True})
+    plan = "\n".join(row[0] for row in await db_session.execute(text(f"EXPLAIN {compiled}")))
+    assert "ix_users_search_trgm" in plan, plan
+
+async def test_reads_defer_sensitive_columns(db_session, mixed_users, query_counter):
+    await UserService.get_by_id(db_session, mixed_users[0].id)
+    await UserService.list_users(db_session, 0, 5)
+    selects = [statement for statement in query_counter if statement.startswith("SELECT")]
+    assert len(selects) == 2
+    for statement in selects:
+        assert "hashed_password" not in statement and "verification_token" not in statement
+
+async def test_list_users_loads_only_requested_fields(db_session, mixed_users, query_counter):
+    users, _, _ = await UserService.list_users_by_cursor(db_session, 5, None, None, "email", ["nickname"])
+    select_list = query_counter[-1].split("FROM")[0]
+    assert "users.nickname" in select_list and "users.email" in select_list and "users.id" in select_list
+    assert "users.bio" not in select_list and "users.role" not in select_list
+    assert [user.nickname for user in users] == sorted(user.nickname for user in mixed_users)[:5]
+    with pytest.raises(ValueError):
+        await UserService.list_users(db_session, 0, 5, fields=["hashed_passwd"])
+
+async def test_resend_verification_emails_pages_through_unverified_users(db_session, users_with_same_role_50_users, verified_user):
+    """
+    Tests that an email is queued for every unverified user, page by page, and tokenless users get a token first.
+    """
+    assert await UserService.resend_verification_emails(db_session, batch_size=7) == 50
+    queued = (await db_session.execute(select(EmailOutbox))).scalars().all()
+    assert sorted(email.recipient for email in queued) == sorted(user.email for user in users_with_same_role_50_users)
+    first = users_with_same_role_50_users[0]
+    token = (await db_session.execute(select(User.verification_token).where(User.id == first.id))).scalar()
+    context = next(email.context for email in queued if email.recipient == first.email)
+    assert token and context["verification_url"].endswith(f"verify-email/{first.id}/{token}")
+
+async def test_resend_verification_emails_applies_filters(db_session, user, locked_user):
+    assert await UserService.resend_verification_emails(db_session, UserListFilters(is_locked=True)) == 1
+    assert (await db_session.execute(select(EmailOutbox.recipient))).scalars().all() == [locked_user.email]
@@ -0,0 +1,146 @@
+import asyncio
+import pytest
+from app.utils.smtp_connection import SMTPClient, SMTPConnectionError, SMTPError
+from tests.smtp_stand_in import SMTPStandIn, self_signed_contexts
+
+def client_for(server: SMTPStandIn, **kwargs) -> SMTPClient:
+    kwargs.setdefault("timeout", 5)
+    # The stand-in only offers STARTTLS when given a TLS context.
+    kwargs.setdefault("starttls", False)
+    return SMTPClient("127.0.0.1", server.port, "mailer", "secret", **kwargs)
+
+async def test_send_email_authenticates_and_delivers(smtp_server):
+    client = client_for(smtp_server)
+    await client.send_email("Welcome", "<p>Hello</p>", "someone@example.com")
+    await client.close()
+    assert "AUTH" in smtp_server.commands
+    sender, recipients, data = smtp_server.messages[0]
+    assert (sender, recipients) == ("mailer", ["someone@example.com"])
+    assert b"Subject: Welcome" in data and b"<p>Hello</p>" in data
+
+async def test_connections_are_reused(smtp_server):
+    client = client_for(smtp_server)
+    for i in range(5):
+        await client.send_email("Hi", "<p>Hi</p>", f"user{i}@example.com")
+    await client.close()
+    assert len(smtp_server.messages) == 5
+    assert smtp_server.connections == client.connections_opened == 1
+
+async def test_concurrent_sends_are_bounded_by_pool_size(smtp_server):
+    client = client_for(smtp_server, pool_size=2)
+    await asyncio.gather(*(client.send_email("Hi", "<p>Hi</p>", f"user{i}@example.com") for i in range(10)))
+    await client.close()
+    assert len(smtp_server.messages) == 10
+    assert smtp_server.connections <= 2
+
+async def test_commands_are_pipelined(smtp_server):
+    # The stand-in only answers MAIL FROM once DATA has arrived; a lock-step client would time out.
+    smtp_server.require_pipelining = True
+    client = client_for(smtp_server, timeout=1)
+    messages = [client.build_message("Hi", "<p>Hi</p>", f"user{i}@example.com") for i in range(3)]
+    assert await client.send_messages(messages) == [None, None, None]
+    await client.close()
+    assert [recipients for _, recipients, _ in smtp_server.messages] == [[f"user{i}@example.com"] for i in range(3)]
+
+async def test_rejected_recipient_does_not_spoil_the_connection(smtp_server):
+    smtp_server.reject_recipients = {"nobody@example.com"}
+    client = client_for(smtp_server)
+    messages = [client.build_message("Hi", "<p>Hi</p>", address) for address in
+                ("a@example.com", "nobody@example.com", "b@example.com")]
+    first, rejected, last = await client.send_messages(messages)
+    await client.close()
+    assert first is None and last is None
+    assert isinstance(rejected, SMTPError) and rejected.code == 550 and not rejected.temporary
+    assert [recipients for _, recipients, _ in smtp_server.messages] == [["a@example.com"], ["b@example.com"]]
+    assert "RSET" in smtp_server.commands and smtp_server.connections == 1
+
+async def test_send_email_raises_when_rejected(smtp_server):
+    smtp_server.reject_recipients = {"nobody@example.com"}
+    client = client_for(smtp_server)
+    with pytest.raises(SMTPError):
+        await client.send_email("Hi", "<p>Hi</p>", "nobody@example.com")
+    await client.close()
+
+async def test_dropped_connection_is_retried_on_a_new_one(smtp_server):
+    smtp_server.drop_after = 2
+    client = client_for(smtp_server)
+    messages = [client.build_message("Hi", "<p>Hi</p>", f"user{i}@example.com") for i in range(5)]
+    assert await client.send_messages(messages) == [None] * 5
+    await client.close()
+    assert len(smtp_server.messages) == 5
+    assert smtp_server.connections == 3
+
+async def test_idle_connection_is_health_checked_and_replaced(smtp_server):
+    client = client_for(smtp_server, health_check_seconds=0)
+    await client.send_email("Hi", "<p>Hi</p>", "a@example.com")
+    await smtp_server.drop_connections()
+    await client.send_email("Hi", "<p>Hi</p>", "b@example.com")
+    await client.close()
+    assert len(smtp_server.messages) == 2
+    assert smtp_server.connections == client.connections_opened == 2
+
+async def test_healthy_idle_connection_answers_noop(smtp_server):
+    client = client_for(smtp_server, health_check_seconds=0)
+    await client.send_email("Hi", "<p>Hi</p>", "a@example.com")
+    await client.send_email("Hi", "<p>Hi</p>", "b@example.com")
+    await client.close()
+    assert "NOOP" in smtp_server.commands and smtp_server.connections == 1
+
+async def test_unreachable_server_fails_every_message():
+    client = SMTPClient("127.0.0.1", 1, "mailer", "secret", timeout=1)
+    results = await client.send_messages([client.build_message("Hi", "<p>Hi</p>", "a@example.com")] * 2)
+    assert all(isinstance(error, SMTPConnectionError) for error in results)
+
+async def test_bad_credentials_are_reported(smtp_server):
+    client = SMTPClient("127.0.0.1", smtp_server.port, "mailer", "wrong", starttls=False, timeout=5)
+    with pytest.raises(SMTPError) as error:
+        await client.send_email("Hi", "<p>Hi</p>", "a@example.com")
+    assert error.value.code == 535 and not smtp_server.messages
+
+async def test_starttls_upgrades_the_connection():
+    server_context, client_context = self_signed_contexts()
+    server = await SMTPStandIn(tls_context=server_context).start()
+    try:
+        client = client_for(server, starttls=True, ssl_context=client_context)
+        await client.send_email("Hi", "<p>Hi</p>", "a@example.com")
+        await client.close()
+    finally:
+        await server.stop()
+    assert server.commands[:4] == ["EHLO", "STARTTLS", "EHLO", "AUTH"]
+    assert len(server.messages) == 1
+
+async def test_starttls_not_offered_fails_before_auth(smtp_server):
+    client = client_for(smtp_server, starttls=True)
+    with pytest.raises(SMTPError) as error:
+        await client.send_email("Hi", "<p>Hi</p>", "a@example.com")
+    assert "STARTTLS" in str(error.value)
+    assert "AUTH" not in smtp_server.commands and not smtp_server.messages
+
+async def test_auth_login_is_used_without_plain(smtp_server):
+    smtp_server.auth_mechanisms = ["LOGIN"]
+    client = client_for(smtp_server)
+    await client.send_email("Hi", "<p>Hi</p>", "a@example.com")
+    await client.close()
+    assert len(smtp_server.messages) == 1
+
+async def test_unsupported_auth_mechanisms_are_reported(smtp_server):
+    smtp_server.auth_mechanisms = ["CRAM-MD5"]
+    client = client_for(smtp_server)
+    with pytest.raises(SMTPError) as error:
+        await client.send_email("Hi", "<p>Hi</p>", "a@example.com")
+    assert error.value.code == 504 and "CRAM-MD5" in str(error.value)
+    assert "AUTH" not in smtp_server.commands
+
+async def test_leading_dots_survive_transfer(smtp_server):
+    client = client_for(smtp_server)
+    body = b"Subject: dots\r\n\r\n.\r\n..two\r\nend"
+    assert await client.send_messages([("mailer", ["a@example.com"], body)]) == [None]
+    await client.close()
+    assert smtp_server.messages[0][2] == b"Subject: dots\r\n\r\n.\r\n..two\r\nend\r\n"
+
+async def test_close_quits_idle_connections(smtp_server):
+    client = client_for(smtp_server)
+    await client.send_email("Hi", "<p>Hi</p>", "a@example.com")
+    await client.close()
+    await asyncio.sleep(0.05)
+    assert smtp_server.commands[-1] == "QUIT"
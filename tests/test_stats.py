@@ -0,0 +1,13 @@
+from app.utils.stats import latency_percentiles, percentile
+
+def test_percentile_nearest_rank():
+    values = [5, 1, 4, 2, 3]
+    assert percentile(values, 0) == 1
+    assert percentile(values, 50) == 3
+    assert percentile(values, 100) == 5
+    assert percentile([], 99) == 0.0
+
+def test_latency_percentiles_in_milliseconds():
+    stats = latency_percentiles([0.002, 0.001, 0.003])
+    assert stats == {"samples": 3, "p50_ms": 2.0, "p95_ms": 3.0, "p99_ms": 3.0, "max_ms": 3.0}
+    assert latency_percentiles([]) == {"samples": 0}
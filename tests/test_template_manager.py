@@ -0,0 +1,80 @@
+import os
+import shutil
+import threading
+import markdown2
+import pytest
+from app.utils.template_manager import EMAIL_STYLES, TemplateManager
+
+CONTEXT = {"name": "Test User", "verification_url": "http://example.com/verify?token=abc123", "email": "test@example.com"}
+
+@pytest.fixture
+def manager(tmp_path):
+    manager = TemplateManager()
+    shutil.copytree(manager.templates_dir, tmp_path, dirs_exist_ok=True)
+    manager.templates_dir = tmp_path
+    return manager
+
+def render_whole_document(manager, template_name, **context):
+    # The straightforward rendering: convert header, body and footer as one document, then style it.
+    read = lambda name: (manager.templates_dir / name).read_text(encoding="utf-8")
+    html = markdown2.markdown(f"{read('header.md')}\n{read(template_name + '.md').format(**context)}\n{read('footer.md')}")
+    html = f'<div style="{EMAIL_STYLES["body"]}">{html}</div>'
+    for tag, style in EMAIL_STYLES.items():
+        if tag != "body":
+            html = html.replace(f"<{tag}>", f'<{tag} style="{style}">')
+    return html
+
+@pytest.mark.parametrize("template_name", ["email_verification", "test_email"])
+def test_render_matches_whole_document_rendering(manager, template_name):
+    assert manager.render_template(template_name, **CONTEXT) == render_whole_document(manager, template_name, **CONTEXT)
+
+def test_only_the_body_is_converted_after_the_first_render(manager, mocker):
+    convert = mocker.spy(markdown2, "markdown")
+    read = mocker.spy(manager, "_read_template")
+    manager.render_template("email_verification", **CONTEXT)
+    assert convert.call_count == 3
+    manager.render_template("email_verification", **{**CONTEXT, "name": "Someone Else"})
+    assert convert.call_count == 4
+    assert "Someone Else" in convert.call_args.args[0] and read.call_count == 2
+
+def test_changed_templates_are_reloaded(manager):
+    assert "Thank you for registering" in manager.render_template("email_verification", **CONTEXT)
+    for name, text in (("email_verification.md", "Hi {name}, welcome back."), ("footer.md", "New footer")):
+        path = manager.templates_dir / name
+        stat = path.stat()
+        path.write_text(text, encoding="utf-8")
+        os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+    html = manager.render_template("email_verification", **CONTEXT)
+    assert "Hi Test User, welcome back." in html and "New footer" in html
+    assert "Thank you for registering" not in html
+
+@pytest.mark.asyncio
+async def test_async_render_runs_off_the_event_loop(manager, mocker):
+    threads = []
+    render = manager.render_template
+
+    def record_thread(*args, **kwargs):
+        threads.append(threading.current_thread())
+        return render(*args, **kwargs)
+
+    mocker.patch.object(manager, "render_template", side_effect=record_thread)
+    html = await manager.render_template_async("email_verification", **CONTEXT)
+    assert html == render("email_verification", **CONTEXT)
+    assert threads and threads[0] is not threading.main_thread()
+
+def test_render_many_matches_render_template(manager, mocker):
+    contexts = [{**CONTEXT, "name": f"User {i}"} for i in range(50)]
+    manager.render_template("email_verification", **CONTEXT)
+    convert = mocker.spy(markdown2, "markdown")
+    rendered = manager.render_many("email_verification", contexts)
+    assert convert.call_count == 1, "The template is converted once, not once per recipient"
+    assert rendered == [manager.render_template("email_verification", **context) for context in contexts]
+
+def test_render_many_inserts_values_as_text(manager):
+    [html] = manager.render_many("email_verification", [{**CONTEXT, "name": "<b>*Mallory*</b>"}])
+    assert "&lt;b&gt;*Mallory*&lt;/b&gt;" in html and "<b>" not in html
+
+def test_render_many_falls_back_when_placeholders_do_not_survive_conversion(manager):
+    # Converted on its own, "{first_name_}" turns into "{first<em>name</em>}".
+    (manager.templates_dir / "greeting.md").write_text("Hi {first_name_}\n", encoding="utf-8")
+    assert manager.render_many("greeting", [{"first_name_": "Ann"}]) == [manager.render_template("greeting", first_name_="Ann")]